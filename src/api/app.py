@@ -14,8 +14,14 @@ from config import *
 from models import WebSocketConnectionManager
 from logger import initialize_logging, restore_streams
 from browser import _initialize_page_logic, _close_page_logic, load_excluded_models, _handle_initial_model_state_and_storage
+from browser.page_state import page_state
 from asyncio import Queue, Lock
 from . import auth_utils
+from .dispatch_client import dispatch_configured, dispatch_pull_loop
+from worker.idempotency import IdempotencyMiddleware, IdempotencyStore
+from worker.registry_client import RegistryClient
+from worker.response_cache import ResponseCache, ResponseCacheMiddleware
+from worker.resumable import ResumableStreamMiddleware
 playwright_manager: Optional[AsyncPlaywright] = None
 browser_instance: Optional[AsyncBrowser] = None
 page_instance = None
@@ -32,8 +38,14 @@ excluded_model_ids = set()
 request_queue = None
 processing_lock = None
 worker_task = None
+dispatch_task = None
+registry_task = None
 page_params_cache = {}
 params_cache_lock = None
+conversation_state = {}
+generate_content_template = None
+generate_content_template_pending = None
+last_direct_rpc_req_id = None
 log_ws_manager = None
 STREAM_QUEUE = None
 STREAM_PROCESS = None
@@ -128,8 +140,10 @@ async def _initialize_browser_and_page():
         server.page_instance, server.is_page_ready = await _initialize_page_logic(server.browser_instance)
         if server.is_page_ready:
             await _handle_initial_model_state_and_storage(server.page_instance)
+            page_state.transition('ready')
             server.logger.info('Page initialized successfully.')
         else:
+            page_state.transition('error', error='Page initialization failed.')
             server.logger.error('Page initialization failed.')
     if not server.model_list_fetch_event.is_set():
         server.model_list_fetch_event.set()
@@ -141,6 +155,16 @@ async def _shutdown_resources():
     if server.STREAM_PROCESS:
         server.STREAM_PROCESS.terminate()
         logger.info('STREAM proxy terminated.')
+    if server.dispatch_task and (not server.dispatch_task.done()):
+        server.dispatch_task.cancel()
+        logger.info('Dispatch pull loop stopped.')
+    if server.registry_task and (not server.registry_task.done()):
+        server.registry_task.cancel()
+        try:
+            await asyncio.wait_for(server.registry_task, timeout=5.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        logger.info('Worker registry client stopped.')
     if server.worker_task and (not server.worker_task.done()):
         server.worker_task.cancel()
         try:
@@ -157,6 +181,20 @@ async def _shutdown_resources():
         await server.playwright_manager.stop()
         logger.info('Playwright stopped.')
 
+def _create_registry_client() -> RegistryClient:
+    """远程 Worker: 向 MANAGER_REGISTRY_URL 注册本 Worker，心跳携带队列长度与当前模型"""
+    import server
+    import socket
+
+    def status():
+        queue = server.request_queue
+        return {'queue_length': queue.qsize() if queue is not None else 0, 'current_model': server.current_ai_studio_model_id}
+    port = int(os.environ.get('SERVER_PORT_INFO', '2048'))
+    worker_id = os.environ.get('WORKER_ID') or f'{socket.gethostname()}-{port}'
+    profile = os.path.basename(os.environ.get('ACTIVE_AUTH_JSON_PATH', ''))
+    server.logger.info(f'--- 多主机模式: Worker {worker_id} 向 {MANAGER_REGISTRY_URL} 注册 ---')
+    return RegistryClient(MANAGER_REGISTRY_URL, WORKER_REGISTRY_SECRET, worker_id, port, host=WORKER_PUBLIC_HOST, profile=profile, interval=WORKER_HEARTBEAT_INTERVAL, status=status)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI application life cycle management"""
@@ -177,6 +215,10 @@ async def lifespan(app: FastAPI):
         if server.is_page_ready or launch_mode == 'direct_debug_no_browser':
             server.worker_task = asyncio.create_task(queue_worker())
             logger.info('Request processing worker started.')
+            if dispatch_configured():
+                server.dispatch_task = asyncio.create_task(dispatch_pull_loop())
+            if MANAGER_REGISTRY_URL and WORKER_REGISTRY_SECRET:
+                server.registry_task = asyncio.create_task(_create_registry_client().run())
         else:
             raise RuntimeError('Failed to initialize browser/page, worker not started.')
         logger.info('Server startup complete.')
@@ -241,6 +283,27 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    if IDEMPOTENCY_ENABLED:
+        # 在鉴权之内: 未通过鉴权的请求不会占用幂等键
+        app.state.idempotency_store = IdempotencyStore(
+            ttl=IDEMPOTENCY_TTL_SECONDS,
+            max_bytes=IDEMPOTENCY_MAX_MB * 1024 * 1024,
+            detach_grace=IDEMPOTENCY_DETACH_GRACE_SECONDS,
+        )
+        app.add_middleware(IdempotencyMiddleware, store=app.state.idempotency_store)
+    if RESPONSE_CACHE_ENABLED:
+        app.state.response_cache = ResponseCache(
+            ttl=RESPONSE_CACHE_TTL_SECONDS, max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024
+        )
+        app.add_middleware(ResponseCacheMiddleware, cache=app.state.response_cache)
+    if STREAM_RESUME_ENABLED:
+        # 断线续传: 客户端断开后延迟停止生成，重连携带 Last-Event-ID 从下一个事件继续
+        app.state.stream_log = IdempotencyStore(
+            ttl=STREAM_RESUME_WINDOW_SECONDS,
+            max_bytes=STREAM_RESUME_MAX_MB * 1024 * 1024,
+            detach_grace=STREAM_RESUME_GRACE_SECONDS,
+        )
+        app.add_middleware(ResumableStreamMiddleware, store=app.state.stream_log)
     app.add_middleware(APIKeyAuthMiddleware)
     from .routes import get_api_info, health_check, list_models, chat_completions, cancel_request, get_queue_status, websocket_log_endpoint, get_api_keys, add_api_key, test_api_key, delete_api_key, generate_speech, generate_image, generate_video, generate_nano_content
     from fastapi.responses import FileResponse
@@ -0,0 +1,83 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from models import Message
+
+# 页面实际生成的回复文本，按请求 id 暂存，请求完成后写入对话状态
+_generated_replies: Dict[str, str] = {}
+
+
+def _canonical_message(message: Message) -> Dict[str, Any]:
+    data = message.model_dump(exclude_none=True)
+    content = data.get('content')
+    if isinstance(content, str):
+        data['content'] = content.strip()
+    return data
+
+
+def compute_conversation_hash(messages: List[Message], tools: Optional[list] = None) -> str:
+    payload = {
+        'messages': [_canonical_message(m) for m in messages],
+        'tools': tools or [],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def compute_reply_hash(content: Any) -> Optional[str]:
+    if not isinstance(content, str):
+        return None
+    return hashlib.sha256(content.strip().encode('utf-8')).hexdigest()
+
+
+MAX_PENDING_REPLIES = 16
+
+
+def note_generated_reply(req_id: str, text: Optional[str]) -> None:
+    # 流式生成器可能在请求结束后才写入 (如提前断开)，只保留最近的若干条
+    while len(_generated_replies) >= MAX_PENDING_REPLIES:
+        _generated_replies.pop(next(iter(_generated_replies)))
+    _generated_replies[req_id] = text or ''
+
+
+def take_generated_reply(req_id: str) -> Optional[str]:
+    return _generated_replies.pop(req_id, None)
+
+
+def find_continuation_messages(messages: List[Message], tools: Optional[list], model: Optional[str], state: Dict[str, Any]) -> Optional[List[Message]]:
+    """返回可以直接在当前页面对话中续写的新消息，不匹配时返回 None (需完整重放)"""
+    prefix_count = state.get('message_count')
+    if not state.get('prefix_hash') or not prefix_count:
+        return None
+    if state.get('model') != model or not state.get('reply_hash'):
+        return None
+    if len(messages) < prefix_count + 2:
+        return None
+    if compute_conversation_hash(messages[:prefix_count], tools) != state['prefix_hash']:
+        return None
+    tail = messages[prefix_count:]
+    assistant_msg, new_turns = tail[0], tail[1:]
+    if assistant_msg.role != 'assistant' or assistant_msg.tool_calls:
+        return None
+    # 客户端的助手消息必须与页面生成的回复一致 (被编辑/重新生成或来自其他客户端时页面历史不同)
+    if compute_reply_hash(assistant_msg.content) != state['reply_hash']:
+        return None
+    if any(m.role != 'user' for m in new_turns):
+        return None
+    return list(new_turns)
+
+
+def record_conversation_state(state: Dict[str, Any], messages: List[Message], tools: Optional[list], model: Optional[str], model_id: Optional[str], page_url: Optional[str], turn_count: Optional[int], reply_text: Optional[str]) -> None:
+    state.clear()
+    if not page_url or not turn_count or reply_text is None:
+        return
+    state.update({
+        'prefix_hash': compute_conversation_hash(messages, tools),
+        'message_count': len(messages),
+        'reply_hash': compute_reply_hash(reply_text),
+        'model': model,
+        'model_id': model_id,
+        'page_url': page_url,
+        'turn_count': turn_count,
+    })
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+
+import aiohttp
+
+from . import auth_utils
+from worker.dispatch import DISPATCH_SECRET_HEADER, dispatch_secret, restore_api_key
+
+# 长轮询等待时间 (秒)；网关在此期间没有可领取的任务时返回 204
+DISPATCH_LONG_POLL_SECONDS = 25
+IDLE_CHECK_INTERVAL = 0.2
+RETRY_MIN_SECONDS = 1
+RETRY_MAX_SECONDS = 10
+
+
+def dispatch_configured() -> bool:
+    return bool(os.environ.get('GATEWAY_DISPATCH_URL') and os.environ.get('WORKER_ID'))
+
+
+def _auth_headers(worker_id: str) -> dict:
+    """领取和上传任务时携带本 Worker 的分发密钥: 本机 Worker 由 Manager 传入，远程 Worker 由共享密钥派生"""
+    secret = os.environ.get('WORKER_DISPATCH_SECRET')
+    if not secret and os.environ.get('WORKER_REGISTRY_SECRET'):
+        secret = dispatch_secret(os.environ['WORKER_REGISTRY_SECRET'], worker_id)
+    return {DISPATCH_SECRET_HEADER: secret} if secret else {}
+
+
+def _worker_idle(server) -> bool:
+    """页面空闲: 本地队列为空且没有正在处理的请求"""
+    queue, lock = server.request_queue, server.processing_lock
+    return queue is not None and lock is not None and queue.qsize() == 0 and not lock.locked()
+
+
+async def _poll_job(session: aiohttp.ClientSession, gateway_url: str, worker_id: str):
+    timeout = aiohttp.ClientTimeout(total=DISPATCH_LONG_POLL_SECONDS + 10)
+    async with session.get(
+        f'{gateway_url}/internal/dispatch/next',
+        params={'worker_id': worker_id, 'wait': str(DISPATCH_LONG_POLL_SECONDS)},
+        headers=_auth_headers(worker_id),
+        timeout=timeout,
+    ) as response:
+        if response.status == 204:
+            return None
+        if response.status != 200:
+            raise RuntimeError(f'/internal/dispatch/next returned {response.status}')
+        job_id = response.headers['X-Dispatch-Job']
+        headers = json.loads(response.headers.get('X-Dispatch-Headers') or '{}')
+        return job_id, await response.read(), headers
+
+
+async def _upload_result(session, result_url: str, worker_id: str, status: int, content_type: str, data) -> int:
+    headers = {
+        'X-Dispatch-Worker': worker_id,
+        'X-Dispatch-Status': str(status),
+        'X-Dispatch-Content-Type': content_type,
+        **_auth_headers(worker_id),
+    }
+    async with session.post(result_url, data=data, headers=headers, timeout=aiohttp.ClientTimeout(total=None)) as upload:
+        return upload.status
+
+
+async def _run_job(session, gateway_url: str, worker_id: str, own_url: str, job_id: str, body: bytes, headers: dict, logger) -> None:
+    """通过本机的 /v1/chat/completions 处理任务 (与直接请求走同一条处理路径)，并把响应流式上传回网关。
+    网关提前结束上传 (客户端断开) 时关闭本地请求，由断连检测中止生成。
+    """
+    result_url = f'{gateway_url}/internal/dispatch/{job_id}/result'
+    headers = {'Content-Type': 'application/json', **restore_api_key(headers, auth_utils.API_KEYS)}
+    try:
+        async with session.post(
+            own_url, data=body, headers=headers, timeout=aiohttp.ClientTimeout(total=None, sock_read=600)
+        ) as response:
+
+            async def relay():
+                async for data in response.content.iter_any():
+                    yield data
+
+            status = await _upload_result(session, result_url, worker_id, response.status, response.content_type, relay())
+            if status != 200:
+                logger.info(f'[{job_id}] 网关已放弃该任务 (HTTP {status})，停止处理')
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f'[{job_id}] 处理拉取的任务失败: {e}')
+        try:
+            await _upload_result(session, result_url, worker_id, 502, 'text/plain', str(e).encode())
+        except Exception:
+            pass
+
+
+async def dispatch_pull_loop():
+    """拉取模式: 页面空闲时向网关中心队列长轮询领取下一个请求，一次只处理一个"""
+    import server
+    logger = server.logger
+    gateway_url = os.environ['GATEWAY_DISPATCH_URL'].rstrip('/')
+    worker_id = os.environ['WORKER_ID']
+    own_url = f"http://127.0.0.1:{os.environ.get('SERVER_PORT_INFO', '2048')}/v1/chat/completions"
+    logger.info(f'--- 拉取模式已启用，从 {gateway_url} 领取任务 (Worker {worker_id}) ---')
+    delay = RETRY_MIN_SECONDS
+    async with aiohttp.ClientSession() as session:
+        while True:
+            if not server.is_page_ready or not _worker_idle(server):
+                await asyncio.sleep(IDLE_CHECK_INTERVAL)
+                continue
+            try:
+                job = await _poll_job(session, gateway_url, worker_id)
+                delay = RETRY_MIN_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'领取任务失败: {e}，{delay} 秒后重试')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+                continue
+            if job is not None:
+                job_id, body, headers = job
+                logger.info(f'[{job_id}] 从网关领取任务')
+                await _run_job(session, gateway_url, worker_id, own_url, job_id, body, headers, logger)
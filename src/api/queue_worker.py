@@ -2,6 +2,77 @@ import asyncio
 import time
 from fastapi import HTTPException
 
+async def _resolve_conversation_continuation(req_id, request_data, page_controller, logger):
+    import server
+    from config import ENABLE_CONVERSATION_CONTINUATION
+    from api.conversation import find_continuation_messages
+    state = server.conversation_state
+    if not ENABLE_CONVERSATION_CONTINUATION or not state:
+        return None
+    new_messages = find_continuation_messages(request_data.messages, request_data.tools, request_data.model, state)
+    if new_messages is None:
+        logger.info(f'[{req_id}] (Worker) 消息前缀与页面当前对话不匹配，执行完整重放。')
+        return None
+    if server.current_ai_studio_model_id != state.get('model_id'):
+        logger.info(f'[{req_id}] (Worker) 页面模型已变化，执行完整重放。')
+        return None
+    page_url = page_controller.page.url
+    turn_count = await page_controller.get_chat_turn_count()
+    if page_url != state.get('page_url') or turn_count != state.get('turn_count'):
+        logger.info(f"[{req_id}] (Worker) 页面对话状态校验失败 (URL: {page_url}, 轮次: {turn_count}/{state.get('turn_count')})，执行完整重放。")
+        return None
+    return new_messages
+
+async def _record_conversation_state(req_id, request_data, reply_text, logger):
+    import server
+    from config import ENABLE_CONVERSATION_CONTINUATION
+    from api.conversation import record_conversation_state
+    from browser.page_controller import PageController
+    page = server.page_instance
+    if not ENABLE_CONVERSATION_CONTINUATION or not page or page.is_closed():
+        return
+    turn_count = await PageController(page, logger, req_id).get_chat_turn_count()
+    record_conversation_state(server.conversation_state, request_data.messages, request_data.tools, request_data.model, server.current_ai_studio_model_id, page.url, turn_count, reply_text)
+    logger.info(f'[{req_id}] (Worker) 已记录当前对话状态 ({len(request_data.messages)} 条消息, {turn_count} 个轮次)。')
+
+def _schedule_background_reset(req_id, logger):
+    import server
+    from config import EAGER_PAGE_RESET_ENABLED
+    from browser.page_state import page_state
+    page = server.page_instance
+    if not page or page.is_closed() or not server.is_page_ready:
+        return
+    if server.conversation_state:
+        page_state.transition('dirty', req_id)
+        logger.info(f'[{req_id}] (Worker) 页面保留当前对话以供续写，跳过后台重置。')
+        return
+    if not EAGER_PAGE_RESET_ENABLED:
+        page_state.transition('dirty', req_id)
+        return
+    from browser.page_controller import PageController
+
+    async def reset():
+        controller = PageController(page, logger, f'{req_id}-reset')
+        await controller.clear_chat_history(lambda stage='': False)
+    page_state.schedule_reset(req_id, reset)
+
+def _model_switch_pending(request_data):
+    import server
+    from config import MODEL_NAME
+    requested_model = request_data.model
+    if not requested_model or requested_model == MODEL_NAME:
+        return False
+    requested_model_id = requested_model.split('/')[-1]
+    if requested_model_id == server.current_ai_studio_model_id:
+        return False
+    return any(m.get('id') == requested_model_id for m in server.parsed_model_list)
+
+def _direct_rpc_available():
+    import os
+    import server
+    from config import ENABLE_DIRECT_RPC
+    return ENABLE_DIRECT_RPC and bool(server.generate_content_template) and os.environ.get('STREAM_PORT') != '0'
+
 async def queue_worker():
     from server import logger, request_queue, processing_lock, model_switching_lock, params_cache_lock
     logger.info('--- 队列 Worker 已启动 ---')
@@ -30,6 +101,7 @@ async def queue_worker():
         result_future = None
         req_id = 'UNKNOWN'
         completion_event = None
+        page_dispatched = False
         try:
             queue_size = request_queue.qsize()
             if queue_size > 0:
@@ -122,28 +194,55 @@ async def queue_worker():
                 elif result_future.done():
                     logger.info(f'[{req_id}] (Worker) Future 在处理前已完成/取消。跳过。')
                 else:
+                    continuation_messages = None
+                    defer_chat_clear = False
+                    request_succeeded = False
+                    page_dispatched = True
                     try:
+                        import server
                         from server import page_instance, is_page_ready
+                        from browser.page_state import page_state
                         if page_instance and (not page_instance.is_closed()) and is_page_ready:
                             from browser.page_controller import PageController
                             from api.request_processor import _setup_disconnect_monitoring
+                            page_reset_done = await page_state.wait_for_reset(req_id)
+                            page_state.transition('busy', req_id)
                             _, _, temp_check_disco = await _setup_disconnect_monitoring(req_id, http_request, result_future, page_instance)
                             page_controller = PageController(page_instance, logger, req_id)
-                            logger.info(f'[{req_id}] (Worker) 在处理新请求前执行聊天历史清空...')
-                            await page_controller.clear_chat_history(temp_check_disco)
-                            logger.info(f'[{req_id}] (Worker) ✅ 聊天历史清空完成并验证成功。')
+                            continuation_messages = await _resolve_conversation_continuation(req_id, request_data, page_controller, logger)
+                            server.conversation_state.clear()
+                            if continuation_messages:
+                                logger.info(f'[{req_id}] (Worker) ⚡ 请求延续页面当前对话，跳过聊天历史清空。')
+                            elif page_reset_done and await page_controller.is_chat_clean():
+                                logger.info(f'[{req_id}] (Worker) ⚡ 页面已在空闲时完成重置，跳过聊天历史清空。')
+                            elif _model_switch_pending(request_data):
+                                logger.info(f'[{req_id}] (Worker) 请求需要切换模型，聊天历史清空与模型切换合并执行。')
+                            elif _direct_rpc_available():
+                                defer_chat_clear = True
+                                logger.info(f'[{req_id}] (Worker) 直连 RPC 模式可用，聊天历史清空推迟到回退 UI 流程时执行。')
+                            else:
+                                logger.info(f'[{req_id}] (Worker) 在处理新请求前执行聊天历史清空...')
+                                await page_controller.clear_chat_history(temp_check_disco)
+                                logger.info(f'[{req_id}] (Worker) ✅ 聊天历史清空完成并验证成功。')
                         else:
+                            server.conversation_state.clear()
                             logger.warning(f'[{req_id}] (Worker) 页面未就绪，跳过前置清空操作。')
                     except Exception as clear_err:
                         logger.error(f'[{req_id}] (Worker) 在处理前清空聊天历史时发生错误: {clear_err}', exc_info=True)
+                        page_state.transition('error', req_id, str(clear_err))
                         if not result_future.done():
                             result_future.set_exception(HTTPException(status_code=500, detail=f'[{req_id}] 聊天历史清空失败，无法继续处理请求'))
                         request_queue.task_done()
                         continue
                     
                     try:
+                        import server
+                        from config import MODEL_NAME
                         from api import _process_request_refactored
-                        returned_value = await _process_request_refactored(req_id, request_data, http_request, result_future)
+                        from api.utils import record_model_usage
+                        usage_model = request_data.model if request_data.model and request_data.model != MODEL_NAME else server.current_ai_studio_model_id
+                        record_model_usage(usage_model, [msg.model_dump() for msg in request_data.messages])
+                        returned_value = await _process_request_refactored(req_id, request_data, http_request, result_future, continuation_messages, defer_chat_clear)
                         completion_event, submit_btn_loc, client_disco_checker = (None, None, None)
                         current_request_was_streaming = False
                         
@@ -246,6 +345,7 @@ async def queue_worker():
                                     logger.info(f'[{req_id}] 客户端在流式响应后按钮状态处理时断开连接。')
                             elif completion_event and current_request_was_streaming:
                                 logger.warning(f'[{req_id}] (Worker) 流式请求但 submit_btn_loc 或 client_disco_checker 未提供。跳过按钮禁用等待。')
+                            request_succeeded = (not client_disconnected_early) and result_future.done() and (not result_future.cancelled()) and result_future.exception() is None
                         
                         except asyncio.TimeoutError:
                             logger.warning(f'[{req_id}] (Worker) ⚠️ 等待处理完成超时。')
@@ -266,6 +366,14 @@ async def queue_worker():
                         logger.error(f'[{req_id}] (Worker) _process_request_refactored execution error: {process_err}')
                         if not result_future.done():
                             result_future.set_exception(HTTPException(status_code=500, detail=f'[{req_id}] Request processing error: {process_err}'))
+                    from api.conversation import take_generated_reply
+                    reply_text = take_generated_reply(req_id)
+                    if request_succeeded and server.last_direct_rpc_req_id != req_id:
+                        try:
+                            await _record_conversation_state(req_id, request_data, reply_text, logger)
+                        except Exception as state_err:
+                            server.conversation_state.clear()
+                            logger.warning(f'[{req_id}] (Worker) 记录对话状态失败: {state_err}')
             
             logger.info(f'[{req_id}] (Worker) 释放处理锁。')
             
@@ -275,6 +383,9 @@ async def queue_worker():
             except Exception as clear_err:
                 logger.error(f'[{req_id}] (Worker) 清空操作时发生错误: {clear_err}', exc_info=True)
             
+            if page_dispatched:
+                _schedule_background_reset(req_id, logger)
+            
             was_last_request_streaming = is_streaming_request
             last_request_completion_time = time.time()
         
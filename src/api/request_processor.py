@@ -5,18 +5,20 @@ import random
 import re
 import secrets
 import time
-from typing import Optional, Tuple, Callable, AsyncGenerator
+from typing import List, Optional, Tuple, Callable, AsyncGenerator
 from asyncio import Event, Future
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from playwright.async_api import Page as AsyncPage, Locator, Error as PlaywrightAsyncError, expect as expect_async
 from config import *
 from config.timeouts import STREAM_CHUNK_SIZE
-from models import ChatCompletionRequest, ClientDisconnectedError
+from models import ChatCompletionRequest, ClientDisconnectedError, Message
 from browser import switch_ai_studio_model, save_error_snapshot
-from .utils import validate_chat_request, prepare_combined_prompt, generate_sse_chunk, generate_sse_stop_chunk, use_stream_response, calculate_usage_stats, request_manager, calculate_stream_max_retries
+from .utils import validate_chat_request, prepare_combined_prompt, clear_stream_queue, generate_sse_chunk, generate_sse_stop_chunk, use_stream_response, calculate_usage_stats, request_manager, calculate_stream_max_retries
 from .abort_detector import AbortSignalHandler
+from .conversation import note_generated_reply
 from browser.page_controller import PageController
+from browser import direct_rpc
 
 TOOL_CALL_INSTRUCTION = """When you need to call a tool, you MUST use EXACTLY this format (one per tool call):
 
@@ -289,13 +291,18 @@ async def _handle_parameter_cache(req_id: str, context: dict) -> None:
             page_params_cache.clear()
             page_params_cache['last_known_model_id_for_params'] = current_ai_studio_model_id
 
-async def _prepare_and_validate_request(req_id: str, request: ChatCompletionRequest, check_client_disconnected: Callable) -> Tuple[str, str, list]:
+async def _prepare_and_validate_request(req_id: str, request: ChatCompletionRequest, check_client_disconnected: Callable, continuation_messages: Optional[List[Message]] = None) -> Tuple[str, str, list]:
     from server import logger
     try:
         validate_chat_request(request.messages, req_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f'[{req_id}] 无效请求: {e}')
-    system_prompt, prepared_prompt, final_image_list = prepare_combined_prompt(request.messages, req_id)
+    if continuation_messages:
+        prompt_messages = [m for m in request.messages if m.role == 'system'] + continuation_messages
+        logger.info(f'[{req_id}] ⚡ 续写当前对话，仅提交 {len(continuation_messages)} 条新消息 (共 {len(request.messages)} 条)')
+    else:
+        prompt_messages = request.messages
+    system_prompt, prepared_prompt, final_image_list = prepare_combined_prompt(prompt_messages, req_id)
     check_client_disconnected('After Prompt Prep')
     if final_image_list:
         logger.info(f'[{req_id}] 🖼️ 准备上传 {len(final_image_list)} 张图片')
@@ -514,6 +521,7 @@ async def _handle_auxiliary_stream_response(req_id: str, request: ChatCompletion
                     except Exception as e_clean_skip:
                         logger.error(f"[{req_id}] 清理 'Skip' 按钮监控任务时出错: {e_clean_skip}")
                     try:
+                        note_generated_reply(req_id, full_body_content)
                         usage_stats = calculate_usage_stats([msg.model_dump() for msg in request.messages], full_body_content, full_reasoning_content)
                         logger.info(f'[{req_id}] 计算的token使用统计: {usage_stats}')
                         final_chunk = {'id': chat_completion_id, 'object': 'chat.completion.chunk', 'model': model_name_for_stream, 'created': created_timestamp, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop', 'native_finish_reason': 'stop'}], 'usage': usage_stats}
@@ -608,6 +616,7 @@ async def _handle_auxiliary_stream_response(req_id: str, request: ChatCompletion
                 finish_reason_val = 'tool_calls'
         if reasoning_content:
             message_payload['reasoning_content'] = reasoning_content
+        note_generated_reply(req_id, content)
         usage_stats = calculate_usage_stats([msg.model_dump() for msg in request.messages], content or '', reasoning_content)
         response_payload = {'id': f'{CHAT_COMPLETION_ID_PREFIX}{req_id}-{int(time.time())}', 'object': 'chat.completion', 'created': int(time.time()), 'model': model_name_for_json, 'choices': [{'index': 0, 'message': message_payload, 'finish_reason': finish_reason_val, 'native_finish_reason': finish_reason_val}], 'usage': usage_stats}
         if not result_future.done():
@@ -671,6 +680,7 @@ async def _handle_playwright_response(req_id: str, request: ChatCompletionReques
                     if line_idx < len(lines) - 1:
                         yield generate_sse_chunk('\n', req_id, current_ai_studio_model_id or MODEL_NAME)
                         # await asyncio.sleep(0.01)
+                note_generated_reply(req_id, final_content)
                 usage_stats = calculate_usage_stats([msg.model_dump() for msg in request.messages], final_content, '')
                 logger.info(f'[{req_id}] Playwright非流式计算的token使用统计: {usage_stats}')
                 text_tool_calls, remaining_text = _extract_tool_calls_from_text(final_content, logger, req_id)
@@ -722,6 +732,7 @@ async def _handle_playwright_response(req_id: str, request: ChatCompletionReques
     else:
         page_controller = PageController(page, logger, req_id)
         final_content = await page_controller.get_response(check_client_disconnected)
+        note_generated_reply(req_id, final_content)
         usage_stats = calculate_usage_stats([msg.model_dump() for msg in request.messages], final_content, '')
         logger.info(f'[{req_id}] Playwright非流式计算的token使用统计: {usage_stats}')
         response_payload = {'id': f'{CHAT_COMPLETION_ID_PREFIX}{req_id}-{int(time.time())}', 'object': 'chat.completion', 'created': int(time.time()), 'model': current_ai_studio_model_id or MODEL_NAME, 'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': final_content}, 'finish_reason': 'stop'}], 'usage': usage_stats}
@@ -764,7 +775,41 @@ async def _cleanup_request_resources(req_id: str, disconnect_check_task: Optiona
         logger.warning(f'[{req_id}] 流式请求异常，确保完成事件已设置。')
         completion_event.set()
 
-async def _process_request_refactored(req_id: str, request: ChatCompletionRequest, http_request: Request, result_future: Future) -> Optional[Tuple[Event, Locator, Callable[[str], bool]]]:
+async def _try_direct_rpc_request(req_id: str, request: ChatCompletionRequest, context: dict, page: AsyncPage, result_future: Future, submit_button_locator: Locator, check_client_disconnected: Callable, disconnect_check_task: Optional[asyncio.Task]) -> Tuple[bool, Optional[Tuple[Event, Locator, Callable]]]:
+    import server
+    logger = context['logger']
+    template = server.generate_content_template
+    if not ENABLE_DIRECT_RPC or not template or os.environ.get('STREAM_PORT') == '0':
+        return (False, None)
+    model_id = context['model_id_to_use'] or context['current_ai_studio_model_id']
+    system_prompt = '\n\n'.join((m.content.strip() for m in request.messages if m.role == 'system' and isinstance(m.content, str)))
+    final_system_prompt = _merge_tools_to_system_prompt(system_prompt, request.tools, logger, req_id)
+    system_hash = PageController._hash_system_instructions(final_system_prompt) if final_system_prompt else None
+    params_key = direct_rpc.compute_params_key(request.model_dump(exclude_none=True))
+    if not direct_rpc.template_matches(template, model_id, system_hash, params_key):
+        logger.info(f'[{req_id}] 直连 RPC 模板与本次请求的模型/系统指令/参数不匹配，使用 UI 流程。')
+        return (False, None)
+    contents = direct_rpc.build_contents(request.messages)
+    if contents is None:
+        logger.info(f'[{req_id}] 请求包含图片、工具消息或不以用户消息结尾，使用 UI 流程。')
+        return (False, None)
+    check_client_disconnected('直连 RPC 请求前')
+    try:
+        status = await direct_rpc.issue_generate_content(page, template, direct_rpc.build_payload(template['body'], model_id, contents))
+    except Exception as e:
+        logger.warning(f'[{req_id}] 直连 RPC 请求失败，回退到 UI 流程: {e}')
+        return (False, None)
+    if status != 200:
+        logger.warning(f'[{req_id}] 直连 RPC 返回状态 {status}，回退到 UI 流程。')
+        await clear_stream_queue()
+        return (False, None)
+    logger.info(f'[{req_id}] ⚡ 已通过直连 RPC 发送 GenerateContent ({len(contents)} 条 contents)')
+    context['current_ai_studio_model_id'] = model_id
+    server.last_direct_rpc_req_id = req_id
+    result = await _handle_auxiliary_stream_response(req_id, request, context, result_future, submit_button_locator, check_client_disconnected, disconnect_check_task)
+    return (True, result)
+
+async def _process_request_refactored(req_id: str, request: ChatCompletionRequest, http_request: Request, result_future: Future, continuation_messages: Optional[List[Message]] = None, defer_chat_clear: bool = False) -> Optional[Tuple[Event, Locator, Callable[[str], bool]]]:
     import server
     if not hasattr(server, 'current_http_requests'):
         server.current_http_requests = {}
@@ -786,9 +831,16 @@ async def _process_request_refactored(req_id: str, request: ChatCompletionReques
     try:
         await _validate_page_status(req_id, context, check_client_disconnected)
         page_controller = PageController(page, context['logger'], req_id)
+        if defer_chat_clear:
+            handled, direct_result = await _try_direct_rpc_request(req_id, request, context, page, result_future, submit_button_locator, check_client_disconnected, disconnect_check_task)
+            if handled:
+                if direct_result:
+                    completion_event, _, _ = direct_result
+                return direct_result
+            await page_controller.clear_chat_history(check_client_disconnected)
 
         model_switch_task = asyncio.create_task(_handle_model_switching(req_id, context, check_client_disconnected))
-        prep_task = asyncio.create_task(_prepare_and_validate_request(req_id, request, check_client_disconnected))
+        prep_task = asyncio.create_task(_prepare_and_validate_request(req_id, request, check_client_disconnected, continuation_messages))
         
         context = await model_switch_task
         system_prompt, prepared_prompt, image_list = await prep_task
@@ -798,7 +850,9 @@ async def _process_request_refactored(req_id: str, request: ChatCompletionReques
         
         # 合并tools到system prompt
         final_system_prompt = _merge_tools_to_system_prompt(system_prompt, request.tools, context['logger'], req_id)
-        await page_controller.set_system_instructions(final_system_prompt, check_client_disconnected)
+        await page_controller.set_system_instructions(final_system_prompt, check_client_disconnected, context.get('current_ai_studio_model_id'))
+        if ENABLE_DIRECT_RPC:
+            direct_rpc.arm_template_capture(context.get('current_ai_studio_model_id'), PageController._hash_system_instructions(final_system_prompt) if final_system_prompt else None, direct_rpc.compute_params_key(request.model_dump(exclude_none=True)))
         check_client_disconnected('提交提示前最终检查')
         await page_controller.submit_prompt(prepared_prompt, image_list, check_client_disconnected)
         response_result = await _handle_response_processing(req_id, request, page, context, result_future, submit_button_locator, check_client_disconnected, disconnect_check_task)
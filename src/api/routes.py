@@ -21,6 +21,12 @@ from models import (
     WebSocketConnectionManager,
 )
 from .dependencies import *
+from browser.resource_policy import resource_policy
+from browser.asset_cache import asset_cache
+from browser.page_controller import get_chat_reset_stats
+from browser.page_state import page_state
+from browser.model_management import get_model_switch_stats
+from .utils import get_model_usage
 
 
 async def get_api_info(
@@ -61,9 +67,11 @@ async def get_api_info(
 
 
 async def health_check(
+    request: Request,
     server_state: Dict[str, Any] = Depends(get_server_state),
     worker_task=Depends(get_worker_task),
     request_queue: Queue = Depends(get_request_queue),
+    current_ai_studio_model_id: str = Depends(get_current_ai_studio_model_id),
 ):
     is_worker_running = bool(worker_task and (not worker_task.done()))
     launch_mode = os.environ.get("LAUNCH_MODE", "unknown")
@@ -100,6 +108,16 @@ async def health_check(
             "queueLength": q_size,
             "launchMode": launch_mode,
             "browserAndPageCritical": browser_page_critical,
+            "resourcePolicy": resource_policy.get_stats(),
+            "assetCache": asset_cache.get_stats(),
+            "chatReset": get_chat_reset_stats(),
+            "pageState": page_state.to_dict(),
+            "modelSwitch": get_model_switch_stats(),
+            "currentModel": current_ai_studio_model_id,
+            "usage": get_model_usage(),
+            "responseCache": request.app.state.response_cache.to_dict()
+            if hasattr(request.app.state, "response_cache")
+            else None,
         },
     }
     if status_val == "OK":
@@ -321,6 +321,21 @@ def estimate_tokens(text: str) -> int:
     english_tokens = non_chinese_chars / 4.0
     return max(1, int(chinese_tokens + english_tokens))
 
+# 每个模型的累计用量 (请求数与估算的输入 token 数)，经 /health 上报给 Manager 做配额预测
+_model_usage: Dict[str, Dict[str, int]] = {}
+
+def record_model_usage(model: str, messages: List[dict]) -> None:
+    model_id = (model or '').split('/')[-1]
+    if not model_id:
+        return
+    prompt_text = ''.join((f"{message.get('role', '')}: {message.get('content', '')}\n" for message in messages))
+    counters = _model_usage.setdefault(model_id, {'requests': 0, 'tokens': 0})
+    counters['requests'] += 1
+    counters['tokens'] += estimate_tokens(prompt_text)
+
+def get_model_usage() -> Dict[str, Dict[str, int]]:
+    return {model: dict(counters) for model, counters in _model_usage.items()}
+
 def calculate_usage_stats(messages: List[dict], response_content: str, reasoning_content: str=None) -> dict:
     prompt_text = ''
     for message in messages:
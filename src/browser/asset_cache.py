@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from playwright.async_api import BrowserContext as AsyncBrowserContext
+
+from config import ASSET_CACHE_ENABLED, ASSET_CACHE_DIR, ASSET_CACHE_MAX_MB, ASSET_CACHE_URL_PATTERN
+
+logger = logging.getLogger('AIStudioProxyServer')
+
+_SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie', 'date', 'age'}
+_MIN_CACHEABLE_MAX_AGE = 86400
+
+
+def _cache_lifetime(headers: Dict[str, str]) -> Tuple[bool, Optional[int]]:
+    """返回 (是否可缓存, 有效期秒数)；immutable 资源的有效期为 None，表示不过期"""
+    cache_control = headers.get('cache-control', '').lower()
+    if 'no-store' in cache_control or 'private' in cache_control:
+        return (False, None)
+    if 'immutable' in cache_control:
+        return (True, None)
+    match = re.search(r'max-age=(\d+)', cache_control)
+    if match and int(match.group(1)) >= _MIN_CACHEABLE_MAX_AGE:
+        return (True, int(match.group(1)))
+    return (False, None)
+
+
+class AssetCache:
+    """按 URL 哈希存储静态资源的磁盘缓存，多个 Worker 共享同一目录，按访问时间 LRU 淘汰"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, url_pattern: str):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.url_pattern = re.compile(url_pattern)
+        self._bytes_since_scan = 0
+        self.stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'stored': 0, 'uncacheable': 0, 'evictions': 0, 'bytes_served': 0}
+        self.navigation_stats: Dict[str, Dict[str, float]] = {
+            'warm': {'count': 0, 'total_ms': 0.0},
+            'cold': {'count': 0, 'total_ms': 0.0},
+        }
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return (f'{base}.bin', f'{base}.json')
+
+    def load(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or meta.get('size') != len(body):
+            return None
+        # 非 immutable 的条目按存储时的 max-age 过期，过期后视为未命中并重新获取
+        expires_at = meta.get('expires_at', 0)
+        if expires_at is not None and time.time() >= expires_at:
+            return None
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return (meta, body)
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes, max_age: Optional[int] = None) -> None:
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        stored_at = time.time()
+        meta = {
+            'url': url,
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in _SKIPPED_HEADERS},
+            'size': len(body),
+            'stored_at': stored_at,
+            'expires_at': None if max_age is None else stored_at + max_age,
+        }
+        suffix = f'.{os.getpid()}.tmp'
+        with open(body_path + suffix, 'wb') as f:
+            f.write(body)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+        self.stats['stored'] += 1
+        self._bytes_since_scan += len(body)
+        if self._bytes_since_scan >= self.max_bytes // 10:
+            self._bytes_since_scan = 0
+            self.evict()
+
+    def evict(self) -> int:
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.bin'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for target in (path, path[:-4] + '.json'):
+                try:
+                    os.remove(target)
+                except OSError:
+                    pass
+            total -= size
+            evicted += 1
+        if evicted:
+            self.stats['evictions'] += evicted
+            logger.info(f'静态资源缓存淘汰 {evicted} 个条目 (当前 {total / 1024 / 1024:.1f} MB)')
+        return evicted
+
+    async def handle_route(self, route) -> None:
+        request = route.request
+        if request.method != 'GET':
+            await route.continue_()
+            return
+        url = request.url
+        cached = await asyncio.to_thread(self.load, url)
+        if cached:
+            meta, body = cached
+            self.stats['hits'] += 1
+            self.stats['bytes_served'] += len(body)
+            await route.fulfill(status=meta['status'], headers=meta['headers'], body=body)
+            return
+        self.stats['misses'] += 1
+        try:
+            response = await route.fetch()
+        except Exception as e:
+            logger.debug(f'静态资源获取失败，交由浏览器处理: {url} ({e})')
+            await route.continue_()
+            return
+        body = await response.body()
+        headers = response.headers
+        cacheable, max_age = _cache_lifetime(headers)
+        if response.status == 200 and cacheable:
+            try:
+                await asyncio.to_thread(self.store, url, response.status, headers, body, max_age)
+            except OSError as e:
+                logger.debug(f'写入静态资源缓存失败: {e}')
+        else:
+            self.stats['uncacheable'] += 1
+        await route.fulfill(response=response, body=body)
+
+    async def install(self, context: AsyncBrowserContext) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        await context.route(self.url_pattern, self.handle_route)
+        logger.info(f'✅ 已启用静态资源缓存: {self.cache_dir} (上限 {self.max_bytes // 1024 // 1024} MB)')
+
+    def snapshot(self) -> Tuple[int, int]:
+        return (self.stats['hits'], self.stats['stored'])
+
+    def record_navigation(self, snapshot: Tuple[int, int], duration: float) -> None:
+        hits = self.stats['hits'] - snapshot[0]
+        stored = self.stats['stored'] - snapshot[1]
+        if not hits and not stored:
+            return
+        bucket = self.navigation_stats['cold' if stored else 'warm']
+        bucket['count'] += 1
+        bucket['total_ms'] += duration * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        navigation = {
+            name: {
+                'count': int(bucket['count']),
+                'avg_ms': round(bucket['total_ms'] / bucket['count'], 1) if bucket['count'] else None,
+            }
+            for name, bucket in self.navigation_stats.items()
+        }
+        return {'enabled': ASSET_CACHE_ENABLED, **self.stats, 'navigation': navigation}
+
+
+asset_cache = AssetCache(ASSET_CACHE_DIR, ASSET_CACHE_MAX_MB * 1024 * 1024, ASSET_CACHE_URL_PATTERN)
@@ -0,0 +1,116 @@
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from models import Message
+
+logger = logging.getLogger('AIStudioProxyServer')
+
+GENERATE_CONTENT_URL_CONTAINS = 'MakerSuiteService/GenerateContent'
+DIRECT_RPC_PARAM_KEYS = ('temperature', 'max_output_tokens', 'top_p', 'stop', 'reasoning_effort', 'tools')
+_DROPPED_HEADERS = {'content-length', 'cookie', 'host', 'origin', 'referer', 'authorization', 'connection', 'accept-encoding'}
+
+# 在页面内发起 GenerateContent 请求，复用页面 Cookie，并按页面的方式计算 SAPISIDHASH
+_ISSUE_FETCH_SCRIPT = """
+async ({ url, headers, body, withAuth }) => {
+    const finalHeaders = Object.assign({}, headers);
+    if (withAuth) {
+        const match = document.cookie.match(/(?:^|;\\s*)SAPISID=([^;]+)/);
+        if (match) {
+            const ts = Math.floor(Date.now() / 1000);
+            const digest = await crypto.subtle.digest('SHA-1', new TextEncoder().encode(`${ts} ${match[1]} ${location.origin}`));
+            const hex = Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+            finalHeaders['authorization'] = `SAPISIDHASH ${ts}_${hex}`;
+        }
+    }
+    const response = await fetch(url, { method: 'POST', headers: finalHeaders, body, credentials: 'include' });
+    window.__aistudioProxyDirectRpc = response.text().catch(() => '');
+    return response.status;
+}
+"""
+
+
+def compute_params_key(request_params: Dict[str, Any]) -> str:
+    relevant = {k: request_params.get(k) for k in DIRECT_RPC_PARAM_KEYS if request_params.get(k) is not None}
+    return json.dumps(relevant, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def arm_template_capture(model_id: Optional[str], system_hash: Optional[str], params_key: str) -> None:
+    import server
+    server.generate_content_template_pending = {'model_id': model_id, 'system_hash': system_hash, 'params_key': params_key}
+
+
+async def capture_generate_content_request(request: Any) -> None:
+    import server
+    pending = getattr(server, 'generate_content_template_pending', None)
+    if not pending or GENERATE_CONTENT_URL_CONTAINS not in request.url or request.method != 'POST':
+        return
+    server.generate_content_template_pending = None
+    try:
+        body = json.loads(request.post_data or '')
+        if not isinstance(body, list) or len(body) < 2 or not str(body[0]).startswith('models/'):
+            logger.warning('GenerateContent 请求体结构与预期不符，未捕获模板。')
+            return
+        raw_headers = await request.all_headers()
+        headers = {k: v for k, v in raw_headers.items() if not k.startswith(':') and k.lower() not in _DROPPED_HEADERS}
+        server.generate_content_template = {
+            'url': request.url,
+            'headers': headers,
+            'body': body,
+            'with_auth': 'authorization' in {k.lower() for k in raw_headers},
+            'captured_at': time.time(),
+            **pending,
+        }
+        logger.info(f"已捕获 GenerateContent 请求模板 (模型: {pending.get('model_id')})，直连 RPC 模式可用。")
+    except Exception as e:
+        logger.warning(f'捕获 GenerateContent 请求模板失败: {e}')
+
+
+def template_matches(template: Optional[Dict[str, Any]], model_id: Optional[str], system_hash: Optional[str], params_key: str) -> bool:
+    if not template:
+        return False
+    return template.get('model_id') == model_id and template.get('system_hash') == system_hash and template.get('params_key') == params_key
+
+
+def build_contents(messages: List[Message]) -> Optional[List[Any]]:
+    """将 OpenAI 消息转换为 GenerateContent 的 contents，遇到图片或工具消息时返回 None"""
+    role_map = {'user': 'user', 'assistant': 'model'}
+    contents = []
+    for msg in messages:
+        if msg.role == 'system':
+            continue
+        role = role_map.get(msg.role)
+        if role is None or msg.tool_calls:
+            return None
+        content = msg.content or ''
+        if isinstance(content, list):
+            texts = []
+            for item in content:
+                if item.type != 'text':
+                    return None
+                texts.append(item.text or '')
+            content = '\n'.join(texts)
+        content = content.strip()
+        if not content:
+            continue
+        contents.append([[[None, content]], role])
+    if not contents or contents[-1][1] != 'user':
+        return None
+    return contents
+
+
+def build_payload(template_body: List[Any], model_id: str, contents: List[Any]) -> List[Any]:
+    body = list(template_body)
+    body[0] = f'models/{model_id}'
+    body[1] = contents
+    return body
+
+
+async def issue_generate_content(page: Any, template: Dict[str, Any], body: List[Any]) -> int:
+    return await page.evaluate(_ISSUE_FETCH_SCRIPT, {
+        'url': template['url'],
+        'headers': template['headers'],
+        'body': json.dumps(body, ensure_ascii=False, separators=(',', ':')),
+        'withAuth': template.get('with_auth', True),
+    })
@@ -13,27 +13,50 @@ logger = logging.getLogger('AIStudioProxyServer')
 async def _setup_network_interception_and_scripts(context: AsyncBrowserContext):
     try:
         from config.settings import ENABLE_SCRIPT_INJECTION
+        from .resource_policy import resource_policy
+        from .asset_cache import asset_cache
+        await _setup_model_list_interception(context, ENABLE_SCRIPT_INJECTION)
+        if ASSET_CACHE_ENABLED:
+            await asset_cache.install(context)
+        await resource_policy.install(context)
+        if LEAN_RENDERING_ENABLED:
+            from . import lean_rendering
+            await lean_rendering.install(context)
         if not ENABLE_SCRIPT_INJECTION:
             logger.info('脚本注入功能已禁用')
             return
-        await _setup_model_list_interception(context)
         await _add_init_scripts_to_context(context)
     except Exception as e:
         logger.error(f'设置网络拦截和脚本注入时发生错误: {e}')
 
-async def _setup_model_list_interception(context: AsyncBrowserContext):
+class _RoutedModelListResponse:
+
+    def __init__(self, url: str, status: int, body: bytes):
+        self.url = url
+        self.status = status
+        self.ok = 200 <= status < 300
+        self._body = body
+
+    async def json(self) -> Any:
+        text = self._body.decode('utf-8')
+        if text.startswith(")]}'\n"):
+            text = text[5:]
+        return json.loads(text)
+
+async def _setup_model_list_interception(context: AsyncBrowserContext, inject_models: bool = True):
     try:
+        from .operations import _handle_model_list_response
+
         async def handle_model_list_route(route):
             request = route.request
-            if 'alkalimakersuite' in request.url and 'ListModels' in request.url:
-                logger.info(f'🔍 拦截到模型列表请求: {request.url}')
-                response = await route.fetch()
-                original_body = await response.body()
-                modified_body = await _modify_model_list_response(original_body, request.url)
-                await route.fulfill(response=response, body=modified_body)
-            else:
-                await route.continue_()
-        await context.route('**/*', handle_model_list_route)
+            logger.info(f'🔍 拦截到模型列表请求: {request.url}')
+            response = await route.fetch()
+            body = await response.body()
+            if inject_models:
+                body = await _modify_model_list_response(body, request.url)
+            await route.fulfill(response=response, body=body)
+            await _handle_model_list_response(_RoutedModelListResponse(request.url, response.status, body))
+        await context.route(f'**/*{MODELS_ENDPOINT_URL_CONTAINS}*', handle_model_list_route)
         logger.info('✅ 已设置模型列表网络拦截')
     except Exception as e:
         logger.error(f'设置模型列表网络拦截时发生错误: {e}')
@@ -216,6 +239,9 @@ async def _initialize_page_logic(browser: AsyncBrowser):
         fixed_width = 1920
         fixed_height = 1080
         context_options: Dict[str, Any] = {'viewport': {'width': fixed_width, 'height': fixed_height}, 'screen': {'width': fixed_width, 'height': fixed_height}, 'device_scale_factor': 1, 'is_mobile': False, 'has_touch': False}
+        if LEAN_RENDERING_ENABLED:
+            from .lean_rendering import apply_lean_context_options
+            apply_lean_context_options(context_options)
         if storage_state_path_to_use:
             context_options['storage_state'] = storage_state_path_to_use
         import server
@@ -231,7 +257,7 @@ async def _initialize_page_logic(browser: AsyncBrowser):
         target_full_url = f'{target_url_base}prompts/new_chat'
         login_url_pattern = 'accounts.google.com'
         current_url = ''
-        from .operations import _handle_model_list_response
+        from .direct_rpc import capture_generate_content_request
         for p_iter in pages:
             try:
                 page_url_to_check = p_iter.url
@@ -240,8 +266,8 @@ async def _initialize_page_logic(browser: AsyncBrowser):
                     current_url = page_url_to_check
                     logger.info(f'   找到已打开的 AI Studio 页面: {current_url}')
                     if found_page:
-                        logger.info(f'   为已存在的页面 {found_page.url} 添加模型列表响应监听器。')
-                        found_page.on('response', _handle_model_list_response)
+                        if ENABLE_DIRECT_RPC:
+                            found_page.on('request', capture_generate_content_request)
                     break
             except PlaywrightAsyncError as pw_err_url:
                 logger.warning(f'   检查页面 URL 时出现 Playwright 错误: {pw_err_url}')
@@ -252,8 +278,8 @@ async def _initialize_page_logic(browser: AsyncBrowser):
         if not found_page:
             logger.info(f'🌐 打开新页面并导航: {target_full_url}...')
             found_page = await temp_context.new_page()
-            if found_page:
-                found_page.on('response', _handle_model_list_response)
+            if found_page and ENABLE_DIRECT_RPC:
+                found_page.on('request', capture_generate_content_request)
             try:
                 await found_page.goto(target_full_url, wait_until='domcontentloaded', timeout=90000)
                 current_url = found_page.url
@@ -382,6 +408,8 @@ async def _close_page_logic():
             logger.error(f'   ⚠️ 关闭页面时出现意外错误: {other_err} (类型: {type(other_err).__name__})', exc_info=True)
     server.page_instance = None
     server.is_page_ready = False
+    from .page_state import page_state
+    page_state.transition('initializing')
     logger.info('页面逻辑状态已重置。')
     return (None, False)
 
@@ -0,0 +1,65 @@
+import json
+import logging
+from typing import Any, Dict
+
+from playwright.async_api import BrowserContext as AsyncBrowserContext
+
+from config import LEAN_VIEWPORT_WIDTH, LEAN_VIEWPORT_HEIGHT, LEAN_HISTORY_KEEP_TURNS
+
+logger = logging.getLogger('AIStudioProxyServer')
+
+LEAN_STYLE_ELEMENT_ID = '__aistudioProxyLeanStyle'
+
+# 降低合成/重绘开销的 Firefox 首选项，仅在精简渲染模式下追加到启动参数
+LEAN_FIREFOX_PREFS: Dict[str, Any] = {
+    'ui.prefersReducedMotion': 1,
+    'image.animation_mode': 'none',
+    'layout.frame_rate': 15,
+    'gfx.canvas.accelerated': False,
+    'layout.css.scroll-behavior.enabled': False,
+    'general.smoothScroll': False,
+}
+
+
+def build_lean_css(keep_turns: int) -> str:
+    rules = [
+        '*, *::before, *::after { animation: none !important; transition: none !important; scroll-behavior: auto !important; }',
+        'ms-chat-turn pre, ms-chat-turn ms-code-block { content-visibility: auto; contain-intrinsic-size: auto 200px; }',
+    ]
+    # 折叠较早的对话轮次：元素保留在 DOM 中 (轮次计数不受影响)，只是跳过布局和绘制
+    if keep_turns > 0:
+        rules.append(
+            f'ms-chat-turn:not(:nth-last-of-type(-n+{keep_turns})) '
+            '{ content-visibility: hidden; contain-intrinsic-size: auto 48px; }'
+        )
+    return '\n'.join(rules)
+
+
+def build_lean_init_script(keep_turns: int) -> str:
+    css = json.dumps(build_lean_css(keep_turns))
+    return f"""
+(() => {{
+  const apply = () => {{
+    if (document.getElementById('{LEAN_STYLE_ELEMENT_ID}')) return;
+    const style = document.createElement('style');
+    style.id = '{LEAN_STYLE_ELEMENT_ID}';
+    style.textContent = {css};
+    (document.head || document.documentElement).appendChild(style);
+  }};
+  if (document.documentElement) apply();
+  else document.addEventListener('DOMContentLoaded', apply, {{ once: true }});
+}})();
+"""
+
+
+def apply_lean_context_options(context_options: Dict[str, Any], width: int=LEAN_VIEWPORT_WIDTH, height: int=LEAN_VIEWPORT_HEIGHT) -> Dict[str, Any]:
+    context_options['viewport'] = {'width': width, 'height': height}
+    context_options['screen'] = {'width': width, 'height': height}
+    context_options['reduced_motion'] = 'reduce'
+    return context_options
+
+
+async def install(context: AsyncBrowserContext, keep_turns: int=LEAN_HISTORY_KEEP_TURNS) -> None:
+    await context.add_init_script(build_lean_init_script(keep_turns))
+    logger.info(f'✅ 已启用精简渲染模式 (视口 {LEAN_VIEWPORT_WIDTH}x{LEAN_VIEWPORT_HEIGHT}，保留最近 {keep_turns} 个对话轮次的渲染)')
+
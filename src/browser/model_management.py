@@ -16,6 +16,7 @@ from models import ClientDisconnectedError
 logger = logging.getLogger("AIStudioProxyServer")
 
 from .operations import get_model_name_from_page_parallel
+from .asset_cache import asset_cache
 from debug.dom_snapshot import dump_page
 
 
@@ -165,6 +166,100 @@ async def _verify_and_apply_ui_state(page: AsyncPage, req_id: str = "unknown") -
         return False
 
 
+# 模型切换统计 (in_app: 应用内路由切换, navigation: 整页导航)
+_model_switch_stats = {"in_app": 0, "navigation": 0, "no_op": 0, "in_app_fallbacks": 0}
+
+
+def get_model_switch_stats() -> dict:
+    return {"in_app_enabled": MODEL_SWITCH_IN_APP_ENABLED, **_model_switch_stats}
+
+
+async def _page_displays_model(
+    page: AsyncPage, model_id: str, req_id: str, log_mismatch: bool = True
+) -> Optional[bool]:
+    """检查页面显示的模型名称是否与目标模型一致；无法确定期望显示名称时返回 None"""
+    import server
+
+    expected_display_name = None
+    for m_obj in getattr(server, "parsed_model_list", []) or []:
+        if m_obj.get("id") == model_id:
+            expected_display_name = m_obj.get("display_name")
+            break
+    if not expected_display_name:
+        return None
+    try:
+        from config.selectors import MODEL_SELECTORS_LIST
+
+        actual_display_name = await get_model_name_from_page_parallel(
+            page,
+            MODEL_SELECTORS_LIST,
+            timeout=2000,
+            req_id=req_id,
+            expected_model_name=expected_display_name,
+        )
+    except Exception as e_disp:
+        logger.warning(
+            f"[{req_id}] 读取页面显示的当前模型名称时出错: {e_disp}。将无法验证页面显示。"
+        )
+        return False
+    if not actual_display_name:
+        if log_mismatch:
+            logger.error(f"[{req_id}] ❌ 无法从页面获取模型名称")
+        return False
+    if actual_display_name.lower() == expected_display_name.strip().lower():
+        logger.info(
+            f"[{req_id}] ✅ 页面显示模型 ('{actual_display_name}') 与期望 ('{expected_display_name}') 一致。"
+        )
+        return True
+    if log_mismatch:
+        logger.error(
+            f"[{req_id}] ❌ 页面显示模型 ('{actual_display_name}') 与期望 ('{expected_display_name}') 不一致。"
+        )
+    return False
+
+
+async def _stored_prompt_model(page: AsyncPage, req_id: str) -> Optional[str]:
+    prefs_str = await page.evaluate(
+        "() => localStorage.getItem('aiStudioUserPreference')"
+    )
+    if not prefs_str:
+        return None
+    try:
+        return json.loads(prefs_str).get("promptModel")
+    except json.JSONDecodeError:
+        logger.warning(
+            f"[{req_id}] 无法解析刷新后的 aiStudioUserPreference JSON 字符串。"
+        )
+        return None
+
+
+async def _switch_model_in_app(page: AsyncPage, model_id: str, req_id: str) -> bool:
+    """localStorage 已写入目标模型后，通过应用内路由新建对话使其生效，避免整页导航。
+    与整页导航一样，生效后重新应用 UI 状态并确认 localStorage 中的模型未被应用改写。
+    """
+    from .page_controller import PageController
+
+    if not await PageController(page, logger, req_id)._soft_reset_chat():
+        return False
+    if not await _page_displays_model(page, model_id, req_id, log_mismatch=False):
+        logger.info(f"[{req_id}] 应用内新建对话后模型未生效，回退到整页导航。")
+        return False
+    if not await _verify_and_apply_ui_state(page, req_id):
+        logger.warning(f"[{req_id}] ⚠️ UI状态最终验证失败，但继续执行模型切换流程")
+    if await _stored_prompt_model(page, req_id) != f"models/{model_id}":
+        logger.info(f"[{req_id}] 应用内新建对话后 localStorage 中的模型被改写，回退到整页导航。")
+        return False
+    return True
+
+
+async def _ensure_fresh_chat(page: AsyncPage, req_id: str) -> None:
+    from .page_controller import PageController
+
+    controller = PageController(page, logger, req_id)
+    if not await controller.is_chat_clean():
+        await controller.clear_chat_history(lambda stage="": False)
+
+
 async def switch_ai_studio_model(page: AsyncPage, model_id: str, req_id: str) -> bool:
     logger.info(f"[{req_id}] 🔄 开始切换模型到: {model_id}")
     original_prefs_str: Optional[str] = None
@@ -192,14 +287,8 @@ async def switch_ai_studio_model(page: AsyncPage, model_id: str, req_id: str) ->
         full_model_path = f"models/{model_id}"
         if current_prefs_for_modification.get("promptModel") == full_model_path:
             logger.info(f"[{req_id}] 🆗 模型已是 {model_id}，无需切换")
-            if page.url != new_chat_url:
-                logger.info(f"[{req_id}] 🌐 导航到 new_chat")
-                await page.goto(
-                    new_chat_url, wait_until="domcontentloaded", timeout=30000
-                )
-                await expect_async(page.locator(INPUT_SELECTOR)).to_be_visible(
-                    timeout=30000
-                )
+            _model_switch_stats["no_op"] += 1
+            await _ensure_fresh_chat(page, req_id)
             await dump_page(page, f"chat_model_switch_{model_id}_{req_id}", logger)
             return True
         logger.info(f"[{req_id}] 📝 更新 localStorage: {full_model_path}")
@@ -217,8 +306,19 @@ async def switch_ai_studio_model(page: AsyncPage, model_id: str, req_id: str) ->
             "(prefsStr) => localStorage.setItem('aiStudioUserPreference', prefsStr)",
             json.dumps(current_prefs_for_modification),
         )
+        if MODEL_SWITCH_IN_APP_ENABLED:
+            if await _switch_model_in_app(page, model_id, req_id):
+                _model_switch_stats["in_app"] += 1
+                logger.info(f"[{req_id}] ⚡ 模型已通过应用内路由切换为 {model_id} (无整页导航)")
+                await dump_page(page, f"chat_model_switch_{model_id}_{req_id}", logger)
+                return True
+            _model_switch_stats["in_app_fallbacks"] += 1
         logger.info(f"[{req_id}] 🌐 导航应用新模型...")
+        _model_switch_stats["navigation"] += 1
+        nav_snapshot = asset_cache.snapshot()
+        nav_start = time.monotonic()
         await page.goto(new_chat_url, wait_until="domcontentloaded", timeout=30000)
+        asset_cache.record_navigation(nav_snapshot, time.monotonic() - nav_start)
         input_field = page.locator(INPUT_SELECTOR)
         await expect_async(input_field).to_be_visible(timeout=30000)
         final_ui_state_success = await _verify_and_apply_ui_state(page, req_id)
@@ -226,74 +326,20 @@ async def switch_ai_studio_model(page: AsyncPage, model_id: str, req_id: str) ->
             logger.info(f"[{req_id}] ✅ UI状态最终验证成功")
         else:
             logger.warning(f"[{req_id}] ⚠️ UI状态最终验证失败，但继续执行模型切换流程")
-        final_prefs_str = await page.evaluate(
-            "() => localStorage.getItem('aiStudioUserPreference')"
-        )
-        final_prompt_model_in_storage: Optional[str] = None
-        if final_prefs_str:
-            try:
-                final_prefs_obj = json.loads(final_prefs_str)
-                final_prompt_model_in_storage = final_prefs_obj.get("promptModel")
-            except json.JSONDecodeError:
-                logger.warning(
-                    f"[{req_id}] 无法解析刷新后的 aiStudioUserPreference JSON 字符串。"
-                )
+        final_prompt_model_in_storage = await _stored_prompt_model(page, req_id)
         if final_prompt_model_in_storage == full_model_path:
             logger.info(
                 f"[{req_id}] ✅ AI Studio localStorage 中模型已成功设置为: {full_model_path}"
             )
-            page_display_match = False
-            expected_display_name_for_target_id = None
-            actual_displayed_model_name_on_page = "无法读取"
             import server
 
             parsed_model_list = getattr(server, "parsed_model_list", [])
-            if parsed_model_list:
-                for m_obj in parsed_model_list:
-                    if m_obj.get("id") == model_id:
-                        expected_display_name_for_target_id = m_obj.get("display_name")
-                        break
-            if not expected_display_name_for_target_id:
+            page_display_match = await _page_displays_model(page, model_id, req_id)
+            if page_display_match is None:
                 logger.warning(
                     f"[{req_id}] 无法在parsed_model_list中找到目标ID '{model_id}' 的显示名称，跳过页面显示名称验证。这可能不准确。"
                 )
                 page_display_match = True
-            else:
-                try:
-                    from config.selectors import MODEL_SELECTORS_LIST
-
-                    actual_displayed_model_name_on_page = (
-                        await get_model_name_from_page_parallel(
-                            page,
-                            MODEL_SELECTORS_LIST,
-                            timeout=2000,
-                            req_id=req_id,
-                            expected_model_name=expected_display_name_for_target_id,
-                        )
-                    )
-
-                    if actual_displayed_model_name_on_page:
-                        normalized_actual_display = (
-                            actual_displayed_model_name_on_page.lower()
-                        )
-                        normalized_expected_display = (
-                            expected_display_name_for_target_id.strip().lower()
-                        )
-                        if normalized_actual_display == normalized_expected_display:
-                            page_display_match = True
-                            logger.info(
-                                f"[{req_id}] ✅ 页面显示模型 ('{actual_displayed_model_name_on_page}') 与期望 ('{expected_display_name_for_target_id}') 一致。"
-                            )
-                        else:
-                            logger.error(
-                                f"[{req_id}] ❌ 页面显示模型 ('{actual_displayed_model_name_on_page}') 与期望 ('{expected_display_name_for_target_id}') 不一致。"
-                            )
-                    else:
-                        logger.error(f"[{req_id}] ❌ 无法从页面获取模型名称")
-                except Exception as e_disp:
-                    logger.warning(
-                        f"[{req_id}] 读取页面显示的当前模型名称时出错: {e_disp}。将无法验证页面显示。"
-                    )
             if page_display_match:
                 await dump_page(page, f"chat_model_switch_{model_id}_{req_id}", logger)
                 return True
@@ -1,9 +1,11 @@
 import asyncio
 from typing import Callable, List, Dict, Any, Optional
 import base64
+import hashlib
 import tempfile
 import re
 import os
+import time
 from playwright.async_api import (
     Page as AsyncPage,
     expect as expect_async,
@@ -24,6 +26,7 @@ from config import (
     PROMPT_TEXTAREA_SELECTORS,
     RESPONSE_CONTAINER_SELECTOR,
     RESPONSE_TEXT_SELECTOR,
+    CHAT_TURN_SELECTOR,
     EDIT_MESSAGE_BUTTON_SELECTOR,
     USE_URL_CONTEXT_SELECTOR,
     UPLOAD_BUTTON_SELECTOR,
@@ -54,6 +57,13 @@ from config import (
     THINKING_LEVEL_OPTIONS,
     DEFAULT_THINKING_LEVEL,
     ADVANCED_SETTINGS_EXPANDER_SELECTOR,
+    SYSTEM_INSTRUCTIONS_CACHE_ENABLED,
+    SYSTEM_INSTRUCTIONS_FAST_FILL_THRESHOLD,
+    PROMPT_FILE_UPLOAD_THRESHOLD,
+    PROMPT_FILE_UPLOAD_INSTRUCTION,
+    SOFT_CHAT_RESET_ENABLED,
+    NEW_CHAT_LINK_SELECTORS,
+    AI_STUDIO_URL_PATTERN,
 )
 from config.timeouts import (
     MAX_RETRIES,
@@ -78,6 +88,7 @@ from config.timeouts import (
     DELAY_BETWEEN_RETRIES,
     MAX_WAIT_UPLOAD_VERIFY,
     NEW_CHAT_URL,
+    SOFT_CHAT_RESET_VERIFY_TIMEOUT_MS,
 )
 from models import ClientDisconnectedError, ElementClickError
 from .operations import (
@@ -87,9 +98,41 @@ from .operations import (
     click_element,
 )
 from .thinking_normalizer import parse_reasoning_param, describe_config
+from .asset_cache import asset_cache
 from .selector_utils import wait_for_any_selector, get_first_visible_locator
 from debug.dom_snapshot import dump_page
 
+# 当前已应用的系统指令标记保存在页面 window 上，整页导航后自动失效
+SYSTEM_INSTRUCTIONS_MARKER_KEY = "__aistudioProxySystemInstructions"
+
+# 清空聊天的耗时统计 (soft: 客户端路由软重置, navigation: 整页导航)，PageController 按请求创建，统计保存在模块级
+_chat_reset_stats: Dict[str, Dict[str, float]] = {
+    "soft": {"count": 0, "total_ms": 0.0},
+    "navigation": {"count": 0, "total_ms": 0.0},
+}
+_soft_reset_failures = 0
+
+
+def _record_chat_reset(kind: str, duration: float) -> None:
+    bucket = _chat_reset_stats[kind]
+    bucket["count"] += 1
+    bucket["total_ms"] += duration * 1000
+
+
+def get_chat_reset_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        kind: {
+            "count": int(bucket["count"]),
+            "avg_ms": round(bucket["total_ms"] / bucket["count"], 1)
+            if bucket["count"]
+            else None,
+        }
+        for kind, bucket in _chat_reset_stats.items()
+    }
+    stats["soft_enabled"] = SOFT_CHAT_RESET_ENABLED
+    stats["soft_failures"] = _soft_reset_failures
+    return stats
+
 
 class PageController:
     def __init__(self, page: AsyncPage, logger, req_id: str):
@@ -212,10 +255,74 @@ class PageController:
         await asyncio.gather(*tasks)
         await dump_page(self.page, f"chat_params_ready_{self.req_id}", self.logger)
 
+    @staticmethod
+    def _hash_system_instructions(system_prompt: str) -> str:
+        return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+
+    async def get_applied_system_instructions(self) -> Optional[Dict[str, Any]]:
+        try:
+            marker = await self.page.evaluate(
+                "(key) => window[key] || null", SYSTEM_INSTRUCTIONS_MARKER_KEY
+            )
+        except Exception as e:
+            self.logger.debug(f"[{self.req_id}] 读取系统指令标记失败: {e}")
+            return None
+        return marker if isinstance(marker, dict) else None
+
+    async def _mark_system_instructions_applied(
+        self, prompt_hash: Optional[str], model_id: Optional[str]
+    ):
+        try:
+            await self.page.evaluate(
+                "([key, marker]) => { if (marker) { window[key] = marker; } else { delete window[key]; } }",
+                [
+                    SYSTEM_INSTRUCTIONS_MARKER_KEY,
+                    {"hash": prompt_hash, "model": model_id} if prompt_hash else None,
+                ],
+            )
+        except Exception as e:
+            self.logger.debug(f"[{self.req_id}] 写入系统指令标记失败: {e}")
+
+    async def invalidate_system_instructions_cache(self):
+        await self._mark_system_instructions_applied(None, None)
+
+    async def _fast_fill_textarea(self, selector: str, value: str) -> int:
+        return await self.page.evaluate(
+            """([selector, value]) => {
+                const el = document.querySelector(selector);
+                if (!el) return -1;
+                const setter = Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set;
+                setter.call(el, value);
+                el.dispatchEvent(new Event('input', { bubbles: true }));
+                el.dispatchEvent(new Event('change', { bubbles: true }));
+                return el.value.length;
+            }""",
+            [selector, value],
+        )
+
     async def set_system_instructions(
-        self, system_prompt: str, check_client_disconnected: Callable
+        self,
+        system_prompt: str,
+        check_client_disconnected: Callable,
+        model_id: Optional[str] = None,
     ):
-        if not system_prompt:
+        prompt_hash = (
+            self._hash_system_instructions(system_prompt) if system_prompt else None
+        )
+        if SYSTEM_INSTRUCTIONS_CACHE_ENABLED:
+            applied = await self.get_applied_system_instructions()
+            applied_hash = applied.get("hash") if applied else None
+            if applied_hash == prompt_hash and (
+                applied is None or applied.get("model") == model_id
+            ):
+                if prompt_hash:
+                    self.logger.info(
+                        f"[{self.req_id}] ⚡ 系统指令未变化 (hash: {prompt_hash[:12]})，跳过设置。"
+                    )
+                return
+            if not system_prompt and not applied_hash:
+                return
+        elif not system_prompt:
             return
         self.logger.info(
             f"[{self.req_id}] 正在设置系统指令 (长度: {len(system_prompt)} chars)..."
@@ -237,16 +344,37 @@ class PageController:
             await expect_async(sys_prompt_textarea).to_be_editable(
                 timeout=TIMEOUT_ELEMENT_VISIBLE
             )
-            await sys_prompt_textarea.fill(system_prompt)
+            filled_fast = False
+            if len(system_prompt) >= SYSTEM_INSTRUCTIONS_FAST_FILL_THRESHOLD:
+                try:
+                    filled_length = await self._fast_fill_textarea(
+                        SYSTEM_INSTRUCTIONS_TEXTAREA_SELECTOR, system_prompt
+                    )
+                    filled_fast = filled_length == len(system_prompt)
+                    if not filled_fast:
+                        self.logger.warning(
+                            f"[{self.req_id}] 系统指令快速填充校验失败 (期望: {len(system_prompt)}, 实际: {filled_length})，回退到 fill。"
+                        )
+                except Exception as fast_err:
+                    self.logger.warning(
+                        f"[{self.req_id}] 系统指令快速填充失败，回退到 fill: {fast_err}"
+                    )
+            if not filled_fast:
+                await sys_prompt_textarea.fill(system_prompt)
             await asyncio.sleep(DELAY_AFTER_FILL)
             filled_value = await sys_prompt_textarea.input_value(
                 timeout=TIMEOUT_INPUT_VALUE
             )
             if len(filled_value) >= len(system_prompt) * 0.9:
                 self.logger.info(
-                    f"[{self.req_id}] ✅ 系统指令已填充 (验证长度: {len(filled_value)} chars)"
+                    f"[{self.req_id}] ✅ 系统指令已填充 (验证长度: {len(filled_value)} chars, 快速路径: {filled_fast})"
                 )
+                if filled_value == system_prompt:
+                    await self._mark_system_instructions_applied(prompt_hash, model_id)
+                else:
+                    await self.invalidate_system_instructions_cache()
             else:
+                await self.invalidate_system_instructions_cache()
                 self.logger.warning(
                     f"[{self.req_id}] ⚠️ 系统指令填充可能不完整 (期望: {len(system_prompt)}, 实际: {len(filled_value)})"
                 )
@@ -279,6 +407,7 @@ class PageController:
             err_msg = str(e)
             if len(err_msg) > 200:
                 err_msg = err_msg[:200] + "...[truncated]"
+            await self.invalidate_system_instructions_cache()
             await dump_page(
                 self.page, f"chat_system_instructions_error_{self.req_id}", self.logger
             )
@@ -1244,9 +1373,69 @@ class PageController:
         else:
             await save_error_snapshot(f"top_p_set_fail_{self.req_id}")
 
-    async def clear_chat_history(self, check_client_disconnected: Callable):
-        self.logger.info(f"[{self.req_id}] 开始清空聊天记录 (通过导航)...")
+    async def is_chat_clean(self) -> bool:
+        if "/prompts/new_chat" not in self.page.url:
+            return False
+        return await self.get_chat_turn_count() == 0
+
+    async def get_chat_turn_count(self) -> int:
+        try:
+            return await self.page.evaluate(
+                "(selector) => document.querySelectorAll(selector).length",
+                CHAT_TURN_SELECTOR,
+            )
+        except Exception as e:
+            self.logger.debug(f"[{self.req_id}] 获取聊天轮次数量失败: {e}")
+            return 0
+
+    async def _soft_reset_chat(self) -> bool:
+        """通过应用内路由切换到新对话 (不重新加载文档)，验证失败时返回 False"""
+        try:
+            if AI_STUDIO_URL_PATTERN not in self.page.url:
+                return False
+            method = await self.page.evaluate(
+                """(selectors) => {
+                    for (const selector of selectors) {
+                        const el = document.querySelector(selector);
+                        if (el && el.offsetParent !== null) {
+                            el.click();
+                            return 'link';
+                        }
+                    }
+                    history.pushState(null, '', '/prompts/new_chat');
+                    window.dispatchEvent(new PopStateEvent('popstate', { state: null }));
+                    return 'history';
+                }""",
+                NEW_CHAT_LINK_SELECTORS,
+            )
+            await self.page.wait_for_function(
+                """([turnSelector, textareaSelector]) =>
+                    location.pathname.endsWith('/prompts/new_chat')
+                    && document.querySelectorAll(turnSelector).length === 0
+                    && !!document.querySelector(textareaSelector)""",
+                arg=[CHAT_TURN_SELECTOR, PROMPT_TEXTAREA_SELECTOR],
+                timeout=SOFT_CHAT_RESET_VERIFY_TIMEOUT_MS,
+            )
+            self.logger.info(f"[{self.req_id}] ⚡ 聊天已通过应用内路由软重置 ({method})。")
+            return True
+        except Exception as e:
+            self.logger.warning(f"[{self.req_id}] 软重置聊天失败，回退到整页导航: {e}")
+            return False
+
+    async def clear_chat_history(self, check_client_disconnected: Callable, allow_soft: bool = True):
+        """清空聊天记录。allow_soft=False 时总是整页导航 (软重置不保证中止进行中的生成请求)"""
+        global _soft_reset_failures
         await self._check_disconnect(check_client_disconnected, "Start Clear Chat")
+        await self.invalidate_system_instructions_cache()
+        if SOFT_CHAT_RESET_ENABLED and allow_soft:
+            self.logger.info(f"[{self.req_id}] 开始清空聊天记录 (应用内路由)...")
+            reset_start = time.monotonic()
+            if await self._soft_reset_chat():
+                _record_chat_reset("soft", time.monotonic() - reset_start)
+                await self._check_disconnect(check_client_disconnected, "清空聊天 - 软重置后")
+                return
+            _soft_reset_failures += 1
+        self.logger.info(f"[{self.req_id}] 开始清空聊天记录 (通过导航)...")
         new_chat_url = NEW_CHAT_URL
         max_retries = MAX_RETRIES
         for attempt in range(max_retries):
@@ -1254,13 +1443,19 @@ class PageController:
                 self.logger.info(
                     f"[{self.req_id}] (尝试 {attempt + 1}/{max_retries}) 导航到: {new_chat_url}"
                 )
+                nav_snapshot = asset_cache.snapshot()
+                nav_start = time.monotonic()
                 await self.page.goto(
                     new_chat_url, timeout=15000, wait_until="domcontentloaded"
                 )
+                asset_cache.record_navigation(
+                    nav_snapshot, time.monotonic() - nav_start
+                )
                 await self._check_disconnect(
                     check_client_disconnected, "清空聊天 - 导航后"
                 )
                 await self._verify_chat_cleared(check_client_disconnected)
+                _record_chat_reset("navigation", time.monotonic() - nav_start)
                 await dump_page(self.page, f"chat_cleared_{self.req_id}", self.logger)
                 self.logger.info(f"[{self.req_id}] 聊天记录已成功清空并验证。")
                 return
@@ -1466,10 +1661,23 @@ class PageController:
                 self.logger.warning(f"[{self.req_id}] 批量上传失败: {batch_err}，尝试逐个上传...")
             """
 
+            return await self._upload_files_via_file_input(
+                temp_files, check_client_disconnected, "图片"
+            )
+
+        except Exception as e:
+            self.logger.error(f"[{self.req_id}] 文件上传失败: {e}")
+            asyncio.create_task(self._cleanup_temp_files(temp_files))
+            return False
+
+    async def _upload_files_via_file_input(
+        self, temp_files: List[str], check_client_disconnected: Callable, label: str
+    ) -> bool:
+        try:
             uploaded_count = 0
             for idx, tf_path in enumerate(temp_files):
                 await self._check_disconnect(
-                    check_client_disconnected, f"上传图片 {idx + 1}/{len(temp_files)}"
+                    check_client_disconnected, f"上传{label} {idx + 1}/{len(temp_files)}"
                 )
 
                 menu_opened = await self._robust_click_insert_assets(
@@ -1491,31 +1699,31 @@ class PageController:
 
                 if not file_input:
                     self.logger.warning(
-                        f"[{self.req_id}] 第{idx + 1}张图片：未找到文件输入框"
+                        f"[{self.req_id}] 第{idx + 1}个{label}：未找到文件输入框"
                     )
                     continue
 
                 try:
                     self.logger.info(
-                        f"[{self.req_id}] 上传图片 {idx + 1}/{len(temp_files)}..."
+                        f"[{self.req_id}] 上传{label} {idx + 1}/{len(temp_files)}..."
                     )
                     await file_input.set_input_files(tf_path)
                     uploaded_count += 1
                     await asyncio.sleep(SLEEP_IMAGE_UPLOAD)
                 except Exception as single_err:
                     self.logger.warning(
-                        f"[{self.req_id}] 单张上传失败 {idx + 1}: {single_err}"
+                        f"[{self.req_id}] 单个{label}上传失败 {idx + 1}: {single_err}"
                     )
 
             asyncio.create_task(self._cleanup_temp_files(temp_files))
 
             if uploaded_count > 0:
                 self.logger.info(
-                    f"[{self.req_id}] ✅ 逐个上传完成 {uploaded_count}/{len(temp_files)} 张"
+                    f"[{self.req_id}] ✅ 逐个上传完成 {uploaded_count}/{len(temp_files)} 个{label}"
                 )
                 await dump_page(
                     self.page,
-                    f"chat_images_uploaded_{uploaded_count}_{self.req_id}",
+                    f"chat_files_uploaded_{uploaded_count}_{self.req_id}",
                     self.logger,
                 )
                 return True
@@ -1526,6 +1734,32 @@ class PageController:
             asyncio.create_task(self._cleanup_temp_files(temp_files))
             return False
 
+    async def _upload_prompt_as_file(
+        self, prompt: str, check_client_disconnected: Callable
+    ) -> bool:
+        self.logger.info(
+            f"[{self.req_id}] 提示过长 ({len(prompt)} chars)，改为以文本文件附件上传..."
+        )
+        # 文件包含完整对话内容: 先检查断连再创建，创建后的清理由上传流程统一安排
+        await self._check_disconnect(check_client_disconnected, "上传提示文件前")
+        tf = tempfile.NamedTemporaryFile(
+            mode="w",
+            encoding="utf-8",
+            delete=False,
+            suffix=".txt",
+            prefix=f"prompt_{self.req_id}_",
+        )
+        try:
+            tf.write(prompt)
+        except BaseException:
+            tf.close()
+            os.remove(tf.name)
+            raise
+        tf.close()
+        return await self._upload_files_via_file_input(
+            [tf.name], check_client_disconnected, "提示文件"
+        )
+
     async def _cleanup_temp_files(self, file_paths: List[str]):
         await asyncio.sleep(SLEEP_CLEANUP)
         for path in file_paths:
@@ -1640,6 +1874,7 @@ class PageController:
         self, prompt: str, image_list: List, check_client_disconnected: Callable
     ):
         self.logger.info(f"[{self.req_id}] 📤 提交提示 ({len(prompt)} chars)...")
+        original_prompt_length = len(prompt)
         prompt_textarea_locator, matched_selector = await get_first_visible_locator(
             self.page, PROMPT_TEXTAREA_SELECTORS, timeout=15000
         )
@@ -1707,6 +1942,19 @@ class PageController:
                             f"[{self.req_id}] 图片上传整体流程异常: {upload_err}。继续提交文字。"
                         )
 
+            fill_start = time.monotonic()
+            fill_path = "文本框"
+            if (
+                PROMPT_FILE_UPLOAD_THRESHOLD > 0
+                and len(prompt) >= PROMPT_FILE_UPLOAD_THRESHOLD
+            ):
+                if await self._upload_prompt_as_file(prompt, check_client_disconnected):
+                    fill_path = "文件附件"
+                    prompt = PROMPT_FILE_UPLOAD_INSTRUCTION
+                else:
+                    self.logger.warning(
+                        f"[{self.req_id}] 提示文件上传失败，回退到文本框填充。"
+                    )
             self.logger.info(f"[{self.req_id}] 正在填充文字内容...")
             await prompt_textarea_locator.evaluate(
                 '(element, text) => { element.value = text; element.dispatchEvent(new Event("input", { bubbles: true })); }',
@@ -1731,6 +1979,9 @@ class PageController:
                 self.logger.warning(
                     f"[{self.req_id}]  等待发送按钮启用超时: {e_pw_enabled}，尝试继续提交..."
                 )
+            self.logger.info(
+                f"[{self.req_id}] ⏱️ 提示填充至可提交耗时 {time.monotonic() - fill_start:.2f}s (路径: {fill_path}, 原始长度: {original_prompt_length} chars)"
+            )
             await self._check_disconnect(check_client_disconnected, "发送按钮启用后")
             await asyncio.sleep(SLEEP_TICK)
             submitted_successfully = await self._try_shortcut_submit(
@@ -1999,7 +2250,8 @@ class PageController:
     async def stop_generation(self, check_client_disconnected: Callable):
         self.logger.info(f"[{self.req_id}] 通过导航到新聊天来停止生成...")
         try:
-            await self.clear_chat_history(check_client_disconnected)
+            # 整页导航会中止进行中的 GenerateContent，避免残留的流数据进入下一个请求
+            await self.clear_chat_history(check_client_disconnected, allow_soft=False)
             self.logger.info(f"[{self.req_id}] 成功导航到新聊天以停止生成。")
         except Exception as e:
             self.logger.error(f"[{self.req_id}] 通过导航到新聊天停止生成失败: {e}")
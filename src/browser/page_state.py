@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger('AIStudioProxyServer')
+
+# 页面就绪状态机:
+#   initializing -> ready                  页面初始化完成
+#   ready/dirty/error -> busy              请求开始占用页面
+#   busy -> dirty                          请求结束，页面仍保留上一轮对话
+#   dirty -> resetting -> ready | error    空闲时后台重置并验证
+PAGE_STATES = ('initializing', 'ready', 'busy', 'dirty', 'resetting', 'error')
+
+
+class PageReadiness:
+
+    def __init__(self):
+        self.state = 'initializing'
+        self.since = time.time()
+        self.req_id: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._reset_task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, float] = {
+            'background_resets': 0,
+            'background_failures': 0,
+            'background_total_ms': 0.0,
+            'dispatch_waits': 0,
+            'dispatch_wait_total_ms': 0.0,
+        }
+
+    def transition(self, state: str, req_id: Optional[str]=None, error: Optional[str]=None) -> None:
+        if state not in PAGE_STATES:
+            raise ValueError(f'未知的页面状态: {state}')
+        if state != self.state:
+            logger.debug(f'[{req_id or self.req_id or "-"}] 页面状态: {self.state} -> {state}')
+            self.state = state
+            self.since = time.time()
+        self.req_id = req_id
+        self.last_error = error
+
+    def schedule_reset(self, req_id: str, reset: Callable[[], Awaitable[None]]) -> None:
+        if self._reset_task and not self._reset_task.done():
+            return
+        self.transition('resetting', req_id)
+        self._reset_task = asyncio.create_task(self._run_reset(req_id, reset))
+
+    async def _run_reset(self, req_id: str, reset: Callable[[], Awaitable[None]]) -> None:
+        started = time.monotonic()
+        try:
+            await reset()
+        except asyncio.CancelledError:
+            self.transition('dirty', req_id, 'reset cancelled')
+            raise
+        except Exception as e:
+            self.stats['background_failures'] += 1
+            self.transition('error', req_id, str(e))
+            logger.warning(f'[{req_id}] 后台页面重置失败，下一个请求将同步清空: {e}')
+            return
+        self.stats['background_resets'] += 1
+        self.stats['background_total_ms'] += (time.monotonic() - started) * 1000
+        self.transition('ready', req_id)
+        logger.info(f'[{req_id}] ✅ 后台页面重置完成 ({(time.monotonic() - started) * 1000:.0f} ms)')
+
+    async def wait_for_reset(self, req_id: str) -> bool:
+        """下一个请求分发前调用: 若后台重置仍在进行则等待其完成，返回页面是否已就绪"""
+        task = self._reset_task
+        if task and not task.done():
+            started = time.monotonic()
+            logger.info(f'[{req_id}] 等待后台页面重置完成...')
+            try:
+                await asyncio.shield(task)
+            except Exception:
+                pass
+            self.stats['dispatch_waits'] += 1
+            self.stats['dispatch_wait_total_ms'] += (time.monotonic() - started) * 1000
+        return self.state == 'ready'
+
+    def to_dict(self) -> Dict[str, Any]:
+        resets = self.stats['background_resets']
+        waits = self.stats['dispatch_waits']
+        return {
+            'state': self.state,
+            'since': self.since,
+            'req_id': self.req_id,
+            'last_error': self.last_error,
+            'background_resets': int(resets),
+            'background_failures': int(self.stats['background_failures']),
+            'background_avg_ms': round(self.stats['background_total_ms'] / resets, 1) if resets else None,
+            'dispatch_waits': int(waits),
+            'dispatch_wait_avg_ms': round(self.stats['dispatch_wait_total_ms'] / waits, 1) if waits else None,
+        }
+
+
+page_state = PageReadiness()
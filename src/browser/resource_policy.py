@@ -0,0 +1,96 @@
+import base64
+import logging
+import re
+from typing import Any, Dict
+
+from playwright.async_api import BrowserContext as AsyncBrowserContext
+
+from config import RESOURCE_BLOCKING_POLICY
+
+logger = logging.getLogger('AIStudioProxyServer')
+
+_TRANSPARENT_GIF = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+# 注意: jserror 上报会被流式代理用于检测额度限制，不能归入 analytics
+RESOURCE_CATEGORIES: Dict[str, Dict[str, Any]] = {
+    'analytics': {
+        'pattern': re.compile(r'^https?://(([^/]+\.)?(google-analytics\.com|googletagmanager\.com|doubleclick\.net)/|play\.google\.com/log)'),
+        'stub': {'status': 204, 'body': b'', 'content_type': 'text/plain'},
+        'estimated_bytes': 2 * 1024,
+    },
+    'fonts': {
+        'pattern': re.compile(r'^https?://fonts\.(gstatic|googleapis)\.com/'),
+        'stub': {'status': 200, 'body': b'', 'content_type': 'text/css'},
+        'estimated_bytes': 40 * 1024,
+    },
+    'avatars': {
+        'pattern': re.compile(r'^https?://lh\d+\.googleusercontent\.com/'),
+        'stub': {'status': 200, 'body': _TRANSPARENT_GIF, 'content_type': 'image/gif'},
+        'estimated_bytes': 6 * 1024,
+    },
+}
+RESOURCE_ACTIONS = ('allow', 'abort', 'stub')
+
+
+def parse_resource_policy(policy: str) -> Dict[str, str]:
+    actions = {name: 'allow' for name in RESOURCE_CATEGORIES}
+    for item in (policy or '').split(','):
+        if not item.strip():
+            continue
+        name, _, action = item.partition('=')
+        name, action = name.strip().lower(), action.strip().lower()
+        if name not in RESOURCE_CATEGORIES or action not in RESOURCE_ACTIONS:
+            logger.warning(f"忽略无效的资源拦截策略项: '{item.strip()}'")
+            continue
+        actions[name] = action
+    return actions
+
+
+class ResourcePolicy:
+
+    def __init__(self, policy: str = ''):
+        self.actions = parse_resource_policy(policy)
+        self.stats: Dict[str, Dict[str, int]] = {
+            name: {'requests': 0, 'upload_bytes': 0, 'estimated_download_bytes': 0}
+            for name in RESOURCE_CATEGORIES
+        }
+
+    def _record(self, category: str, request: Any) -> None:
+        stats = self.stats[category]
+        stats['requests'] += 1
+        try:
+            stats['upload_bytes'] += len(request.post_data_buffer or b'')
+        except Exception:
+            pass
+        stats['estimated_download_bytes'] += RESOURCE_CATEGORIES[category]['estimated_bytes']
+
+    def _make_handler(self, category: str):
+        action = self.actions[category]
+        stub = RESOURCE_CATEGORIES[category]['stub']
+
+        async def handle(route):
+            self._record(category, route.request)
+            try:
+                if action == 'stub':
+                    await route.fulfill(status=stub['status'], body=stub['body'], content_type=stub['content_type'])
+                else:
+                    await route.abort('blockedbyclient')
+            except Exception as e:
+                logger.debug(f'资源拦截处理失败 ({category}): {e}')
+        return handle
+
+    async def install(self, context: AsyncBrowserContext) -> None:
+        enabled = {name: action for name, action in self.actions.items() if action != 'allow'}
+        for name in enabled:
+            await context.route(RESOURCE_CATEGORIES[name]['pattern'], self._make_handler(name))
+        if enabled:
+            logger.info(f'✅ 已启用资源拦截策略: {enabled}')
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            name: {'action': self.actions[name], **counters}
+            for name, counters in self.stats.items()
+        }
+
+
+resource_policy = ResourcePolicy(RESOURCE_BLOCKING_POLICY)
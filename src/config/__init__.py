@@ -2,4 +2,4 @@ from .constants import *
 from .timeouts import *
 from .selectors import *
 from .settings import *
-__all__ = ['MODEL_NAME', 'CHAT_COMPLETION_ID_PREFIX', 'DEFAULT_FALLBACK_MODEL_ID', 'DEFAULT_TEMPERATURE', 'DEFAULT_MAX_OUTPUT_TOKENS', 'DEFAULT_TOP_P', 'DEFAULT_STOP_SEQUENCES', 'AI_STUDIO_URL_PATTERN', 'MODELS_ENDPOINT_URL_CONTAINS', 'USER_INPUT_START_MARKER_SERVER', 'USER_INPUT_END_MARKER_SERVER', 'EXCLUDED_MODELS_FILENAME', 'STREAM_TIMEOUT_LOG_STATE', 'RESPONSE_COMPLETION_TIMEOUT', 'INITIAL_WAIT_MS_BEFORE_POLLING', 'POLLING_INTERVAL', 'POLLING_INTERVAL_STREAM', 'SILENCE_TIMEOUT_MS', 'POST_SPINNER_CHECK_DELAY_MS', 'FINAL_STATE_CHECK_TIMEOUT_MS', 'POST_COMPLETION_BUFFER', 'CLEAR_CHAT_VERIFY_TIMEOUT_MS', 'CLEAR_CHAT_VERIFY_INTERVAL_MS', 'CLICK_TIMEOUT_MS', 'CLIPBOARD_READ_TIMEOUT_MS', 'WAIT_FOR_ELEMENT_TIMEOUT_MS', 'PSEUDO_STREAM_DELAY', 'PROMPT_TEXTAREA_SELECTOR', 'PROMPT_TEXTAREA_SELECTORS', 'INPUT_SELECTOR', 'INPUT_SELECTOR2', 'SUBMIT_BUTTON_SELECTOR', 'SUBMIT_BUTTON_SELECTORS', 'INSERT_BUTTON_SELECTOR', 'INSERT_BUTTON_SELECTORS', 'UPLOAD_BUTTON_SELECTOR', 'UPLOAD_BUTTON_SELECTORS', 'HIDDEN_FILE_INPUT_SELECTOR', 'HIDDEN_FILE_INPUT_SELECTORS', 'RESPONSE_CONTAINER_SELECTOR', 'RESPONSE_TEXT_SELECTOR', 'LOADING_SPINNER_SELECTOR', 'LOADING_SPINNER_SELECTORS', 'OVERLAY_SELECTOR', 'ERROR_TOAST_SELECTOR', 'EDIT_MESSAGE_BUTTON_SELECTOR', 'MESSAGE_TEXTAREA_SELECTOR', 'FINISH_EDIT_BUTTON_SELECTOR', 'MORE_OPTIONS_BUTTON_SELECTOR', 'COPY_MARKDOWN_BUTTON_SELECTOR', 'COPY_MARKDOWN_BUTTON_SELECTOR_ALT', 'MAX_OUTPUT_TOKENS_SELECTOR', 'STOP_SEQUENCE_INPUT_SELECTOR', 'MAT_CHIP_REMOVE_BUTTON_SELECTOR', 'TOP_P_INPUT_SELECTOR', 'TEMPERATURE_INPUT_SELECTOR', 'USE_URL_CONTEXT_SELECTOR', 'DEBUG_LOGS_ENABLED', 'TRACE_LOGS_ENABLED', 'AUTO_SAVE_AUTH', 'AUTH_SAVE_TIMEOUT', 'AUTO_CONFIRM_LOGIN', 'AUTH_PROFILES_DIR', 'ACTIVE_AUTH_DIR', 'SAVED_AUTH_DIR', 'LOG_DIR', 'APP_LOG_FILE_PATH', 'NO_PROXY_ENV', 'ENABLE_SCRIPT_INJECTION', 'USERSCRIPT_PATH', 'get_environment_variable', 'get_boolean_env', 'get_int_env']
\ No newline at end of file
+__all__ = ['MODEL_NAME', 'CHAT_COMPLETION_ID_PREFIX', 'DEFAULT_FALLBACK_MODEL_ID', 'DEFAULT_TEMPERATURE', 'DEFAULT_MAX_OUTPUT_TOKENS', 'DEFAULT_TOP_P', 'DEFAULT_STOP_SEQUENCES', 'SYSTEM_INSTRUCTIONS_CACHE_ENABLED', 'SYSTEM_INSTRUCTIONS_FAST_FILL_THRESHOLD', 'ENABLE_CONVERSATION_CONTINUATION', 'PROMPT_FILE_UPLOAD_THRESHOLD', 'PROMPT_FILE_UPLOAD_INSTRUCTION', 'ENABLE_DIRECT_RPC', 'SOFT_CHAT_RESET_ENABLED', 'EAGER_PAGE_RESET_ENABLED', 'MODEL_SWITCH_IN_APP_ENABLED', 'RESOURCE_BLOCKING_POLICY', 'AI_STUDIO_URL_PATTERN', 'MODELS_ENDPOINT_URL_CONTAINS', 'USER_INPUT_START_MARKER_SERVER', 'USER_INPUT_END_MARKER_SERVER', 'EXCLUDED_MODELS_FILENAME', 'STREAM_TIMEOUT_LOG_STATE', 'RESPONSE_COMPLETION_TIMEOUT', 'INITIAL_WAIT_MS_BEFORE_POLLING', 'POLLING_INTERVAL', 'POLLING_INTERVAL_STREAM', 'SILENCE_TIMEOUT_MS', 'POST_SPINNER_CHECK_DELAY_MS', 'FINAL_STATE_CHECK_TIMEOUT_MS', 'POST_COMPLETION_BUFFER', 'CLEAR_CHAT_VERIFY_TIMEOUT_MS', 'CLEAR_CHAT_VERIFY_INTERVAL_MS', 'SOFT_CHAT_RESET_VERIFY_TIMEOUT_MS', 'CLICK_TIMEOUT_MS', 'CLIPBOARD_READ_TIMEOUT_MS', 'WAIT_FOR_ELEMENT_TIMEOUT_MS', 'PSEUDO_STREAM_DELAY', 'PROMPT_TEXTAREA_SELECTOR', 'PROMPT_TEXTAREA_SELECTORS', 'INPUT_SELECTOR', 'INPUT_SELECTOR2', 'SUBMIT_BUTTON_SELECTOR', 'SUBMIT_BUTTON_SELECTORS', 'INSERT_BUTTON_SELECTOR', 'INSERT_BUTTON_SELECTORS', 'UPLOAD_BUTTON_SELECTOR', 'UPLOAD_BUTTON_SELECTORS', 'HIDDEN_FILE_INPUT_SELECTOR', 'HIDDEN_FILE_INPUT_SELECTORS', 'RESPONSE_CONTAINER_SELECTOR', 'CHAT_TURN_SELECTOR', 'NEW_CHAT_LINK_SELECTORS', 'RESPONSE_TEXT_SELECTOR', 'LOADING_SPINNER_SELECTOR', 'LOADING_SPINNER_SELECTORS', 'OVERLAY_SELECTOR', 'ERROR_TOAST_SELECTOR', 'EDIT_MESSAGE_BUTTON_SELECTOR', 'MESSAGE_TEXTAREA_SELECTOR', 'FINISH_EDIT_BUTTON_SELECTOR', 'MORE_OPTIONS_BUTTON_SELECTOR', 'COPY_MARKDOWN_BUTTON_SELECTOR', 'COPY_MARKDOWN_BUTTON_SELECTOR_ALT', 'MAX_OUTPUT_TOKENS_SELECTOR', 'STOP_SEQUENCE_INPUT_SELECTOR', 'MAT_CHIP_REMOVE_BUTTON_SELECTOR', 'TOP_P_INPUT_SELECTOR', 'TEMPERATURE_INPUT_SELECTOR', 'USE_URL_CONTEXT_SELECTOR', 'DEBUG_LOGS_ENABLED', 'TRACE_LOGS_ENABLED', 'AUTO_SAVE_AUTH', 'AUTH_SAVE_TIMEOUT', 'AUTO_CONFIRM_LOGIN', 'AUTH_PROFILES_DIR', 'ACTIVE_AUTH_DIR', 'SAVED_AUTH_DIR', 'LOG_DIR', 'APP_LOG_FILE_PATH', 'NO_PROXY_ENV', 'ENABLE_SCRIPT_INJECTION', 'USERSCRIPT_PATH', 'ASSET_CACHE_ENABLED', 'ASSET_CACHE_DIR', 'ASSET_CACHE_MAX_MB', 'ASSET_CACHE_URL_PATTERN', 'LEAN_RENDERING_ENABLED', 'LEAN_VIEWPORT_WIDTH', 'LEAN_VIEWPORT_HEIGHT', 'LEAN_HISTORY_KEEP_TURNS', 'MODEL_AFFINITY_ENABLED', 'MODEL_AFFINITY_TOLERANCE', 'GATEWAY_BALANCING_STRATEGY', 'GATEWAY_MAX_ATTEMPTS', 'GATEWAY_FIRST_BYTE_TIMEOUT', 'GATEWAY_FAILOVER_BUDGET', 'GATEWAY_BREAKER_FAILURES', 'GATEWAY_BREAKER_RESET_SECONDS', 'GATEWAY_MODELS_CACHE_SECONDS', 'GATEWAY_DISPATCH_MODE', 'GATEWAY_PROCESSES', 'GATEWAY_WORKER_TRANSPORT', 'WORKER_SOCKET_DIR', 'GATEWAY_CONNECTION_LIMIT', 'GATEWAY_CONNECTIONS_PER_WORKER', 'WORKER_REGISTRY_SECRET', 'WORKER_HEARTBEAT_INTERVAL', 'WORKER_HEARTBEAT_TIMEOUT', 'MANAGER_REGISTRY_URL', 'WORKER_PUBLIC_HOST', 'IDEMPOTENCY_ENABLED', 'IDEMPOTENCY_TTL_SECONDS', 'IDEMPOTENCY_MAX_MB', 'IDEMPOTENCY_DETACH_GRACE_SECONDS', 'STREAM_RESUME_ENABLED', 'STREAM_RESUME_WINDOW_SECONDS', 'STREAM_RESUME_MAX_MB', 'STREAM_RESUME_GRACE_SECONDS', 'RESPONSE_CACHE_ENABLED', 'RESPONSE_CACHE_TTL_SECONDS', 'RESPONSE_CACHE_MAX_MB', 'QUOTA_STEER_PERCENT', 'QUOTA_PROBE_ENABLED', 'QUOTA_PROBE_INITIAL_SECONDS', 'QUOTA_PROBE_MAX_SECONDS', 'get_environment_variable', 'get_boolean_env', 'get_int_env']
\ No newline at end of file
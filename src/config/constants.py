@@ -20,6 +20,32 @@ ENABLE_THINKING_BUDGET = os.environ.get('ENABLE_THINKING_BUDGET', 'false').lower
 DEFAULT_THINKING_BUDGET = int(os.environ.get('DEFAULT_THINKING_BUDGET', '8192'))
 ENABLE_GOOGLE_SEARCH = os.environ.get('ENABLE_GOOGLE_SEARCH', 'false').lower() in ('true', '1', 'yes')
 
+# 系统指令缓存
+SYSTEM_INSTRUCTIONS_CACHE_ENABLED = os.environ.get('SYSTEM_INSTRUCTIONS_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+SYSTEM_INSTRUCTIONS_FAST_FILL_THRESHOLD = int(os.environ.get('SYSTEM_INSTRUCTIONS_FAST_FILL_THRESHOLD', '2000'))
+
+# 对话续写 (消息前缀匹配时跳过清空聊天，仅提交新的用户消息)
+ENABLE_CONVERSATION_CONTINUATION = os.environ.get('ENABLE_CONVERSATION_CONTINUATION', 'true').lower() in ('true', '1', 'yes')
+
+# 超长提示改为文本文件附件上传 (字符数阈值，0 为禁用)
+PROMPT_FILE_UPLOAD_THRESHOLD = int(os.environ.get('PROMPT_FILE_UPLOAD_THRESHOLD', '100000'))
+PROMPT_FILE_UPLOAD_INSTRUCTION = os.environ.get('PROMPT_FILE_UPLOAD_INSTRUCTION', '完整的对话记录在附件文本文件中，"用户:" 和 "助手:" 分别标记双方的发言。请以助手身份直接回复其中最后一条用户消息。')
+
+# 直连 RPC 模式 (在页面内直接调用 GenerateContent，UI 自动化作为回退)
+ENABLE_DIRECT_RPC = os.environ.get('ENABLE_DIRECT_RPC', 'false').lower() in ('true', '1', 'yes')
+
+# 软重置聊天 (客户端路由切换到新对话，失败时回退整页导航)
+SOFT_CHAT_RESET_ENABLED = os.environ.get('SOFT_CHAT_RESET_ENABLED', 'true').lower() in ('true', '1', 'yes')
+
+# 请求完成后在空闲时后台重置页面 (下一个请求仅在重置未完成时等待)
+EAGER_PAGE_RESET_ENABLED = os.environ.get('EAGER_PAGE_RESET_ENABLED', 'true').lower() in ('true', '1', 'yes')
+
+# 模型切换优先通过应用内路由新建对话生效，验证失败时回退整页导航
+MODEL_SWITCH_IN_APP_ENABLED = os.environ.get('MODEL_SWITCH_IN_APP_ENABLED', 'true').lower() in ('true', '1', 'yes')
+
+# 资源拦截策略 (类别=动作，动作可选 allow/abort/stub，类别: analytics, fonts, avatars)；默认为空，全部放行
+RESOURCE_BLOCKING_POLICY = os.environ.get('RESOURCE_BLOCKING_POLICY', '')
+
 # 停止序列
 try:
     DEFAULT_STOP_SEQUENCES = json.loads(os.environ.get('DEFAULT_STOP_SEQUENCES', '["用户:"]'))
@@ -46,6 +46,7 @@ SKIP_PREFERENCE_VOTE_BUTTON_SELECTOR = (
     'button[data-test-id="skip-button"][aria-label="Skip preference vote"]'
 )
 RESPONSE_CONTAINER_SELECTOR = "ms-chat-turn .chat-turn-container.model"
+CHAT_TURN_SELECTOR = "ms-chat-turn"
 RESPONSE_TEXT_SELECTOR = "ms-cmark-node.cmark-node"
 
 # 加载状态
@@ -56,6 +57,12 @@ LOADING_SPINNER_SELECTORS = [
 ]
 LOADING_SPINNER_SELECTOR = LOADING_SPINNER_SELECTORS[0]
 
+# 新建对话 (客户端路由软重置)
+NEW_CHAT_LINK_SELECTORS = [
+    'a[href$="/prompts/new_chat"]',
+    'button[aria-label="New chat"]',
+]
+
 # 对话框/遮罩层
 OVERLAY_SELECTOR = ".mat-mdc-dialog-inner-container"
 ZERO_STATE_SELECTOR = "ms-zero-state"
@@ -42,4 +42,63 @@ def get_int_env(key: str, default: int=0) -> int:
 # 代理和脚本注入
 NO_PROXY_ENV = os.environ.get('NO_PROXY')
 ENABLE_SCRIPT_INJECTION = get_boolean_env('ENABLE_SCRIPT_INJECTION', True)
-USERSCRIPT_PATH = get_environment_variable('USERSCRIPT_PATH', 'browser/more_models.js')
\ No newline at end of file
+USERSCRIPT_PATH = get_environment_variable('USERSCRIPT_PATH', 'browser/more_models.js')
+# 静态资源磁盘缓存 (多个 Worker 共享，默认关闭)
+ASSET_CACHE_ENABLED = get_boolean_env('ASSET_CACHE_ENABLED', False)
+ASSET_CACHE_DIR = get_environment_variable('ASSET_CACHE_DIR', os.path.join(DATA_DIR, 'asset_cache'))
+ASSET_CACHE_MAX_MB = get_int_env('ASSET_CACHE_MAX_MB', 512)
+ASSET_CACHE_URL_PATTERN = get_environment_variable('ASSET_CACHE_URL_PATTERN', r'^https://(www|ssl|fonts)\.gstatic\.com/')
+# 精简渲染模式 (禁用动画、缩小视口、折叠历史对话渲染)
+LEAN_RENDERING_ENABLED = get_boolean_env('LEAN_RENDERING_ENABLED', False)
+LEAN_VIEWPORT_WIDTH = get_int_env('LEAN_VIEWPORT_WIDTH', 1280)
+LEAN_VIEWPORT_HEIGHT = get_int_env('LEAN_VIEWPORT_HEIGHT', 720)
+LEAN_HISTORY_KEEP_TURNS = get_int_env('LEAN_HISTORY_KEEP_TURNS', 4)
+# 多 Worker 模型亲和路由: 已加载目标模型的 Worker 在负载不超过最低负载 + 容差时优先
+MODEL_AFFINITY_ENABLED = get_boolean_env('MODEL_AFFINITY_ENABLED', True)
+MODEL_AFFINITY_TOLERANCE = get_int_env('MODEL_AFFINITY_TOLERANCE', 1)
+# 网关均衡策略: least_latency / p2c / least_outstanding / round_robin
+GATEWAY_BALANCING_STRATEGY = get_environment_variable('GATEWAY_BALANCING_STRATEGY', 'least_latency')
+# 网关故障转移: 首字节前失败时换 Worker 重试；连续失败的 Worker 被熔断
+GATEWAY_MAX_ATTEMPTS = get_int_env('GATEWAY_MAX_ATTEMPTS', 3)
+GATEWAY_FIRST_BYTE_TIMEOUT = get_int_env('GATEWAY_FIRST_BYTE_TIMEOUT', 120)
+GATEWAY_FAILOVER_BUDGET = get_int_env('GATEWAY_FAILOVER_BUDGET', 180)
+GATEWAY_BREAKER_FAILURES = get_int_env('GATEWAY_BREAKER_FAILURES', 3)
+GATEWAY_BREAKER_RESET_SECONDS = get_int_env('GATEWAY_BREAKER_RESET_SECONDS', 15)
+# 网关 /v1/models 全局模型目录的缓存时间 (秒)，过期后先返回旧数据并在后台刷新
+GATEWAY_MODELS_CACHE_SECONDS = get_int_env('GATEWAY_MODELS_CACHE_SECONDS', 300)
+# 网关分发模式: push 由网关立即选择 Worker 转发；pull 请求进入网关中心队列，由空闲 Worker 长轮询领取
+GATEWAY_DISPATCH_MODE = get_environment_variable('GATEWAY_DISPATCH_MODE', 'push').lower()
+# 网关进程数: 大于 1 时多个进程通过 SO_REUSEPORT 监听同一端口，并通过共享内存共享路由状态
+GATEWAY_PROCESSES = get_int_env('GATEWAY_PROCESSES', 1)
+# 网关与 Worker 之间的传输方式: tcp 走本机回环 TCP；uds 让 Worker 额外监听 Unix 域套接字，网关通过套接字转发 (Windows 下回退到 TCP)
+GATEWAY_WORKER_TRANSPORT = get_environment_variable('GATEWAY_WORKER_TRANSPORT', 'tcp').lower()
+WORKER_SOCKET_DIR = get_environment_variable('WORKER_SOCKET_DIR', os.path.join(DATA_DIR, 'sockets'))
+# 网关到 Worker 的连接池上限: 总连接数，以及每个 Worker 的连接数
+GATEWAY_CONNECTION_LIMIT = get_int_env('GATEWAY_CONNECTION_LIMIT', 100)
+GATEWAY_CONNECTIONS_PER_WORKER = get_int_env('GATEWAY_CONNECTIONS_PER_WORKER', 20)
+# 多主机 Worker: 远程 Worker 携带共享密钥向 Manager 注册并定期发送心跳，超过超时时间 (秒) 未收到心跳视为崩溃；密钥为空时不接受远程注册
+WORKER_REGISTRY_SECRET = get_environment_variable('WORKER_REGISTRY_SECRET', '')
+WORKER_HEARTBEAT_INTERVAL = get_int_env('WORKER_HEARTBEAT_INTERVAL', 10)
+WORKER_HEARTBEAT_TIMEOUT = get_int_env('WORKER_HEARTBEAT_TIMEOUT', 35)
+# 远程 Worker 侧: 注册的 Manager 地址，以及网关访问本 Worker 使用的主机名 (留空时由 Manager 取连接来源地址)
+MANAGER_REGISTRY_URL = get_environment_variable('MANAGER_REGISTRY_URL', '')
+WORKER_PUBLIC_HOST = get_environment_variable('WORKER_PUBLIC_HOST', '')
+# 幂等键 (Idempotency-Key 请求头): 已完成响应的保留时间 (秒) 与保存上限 (MB)；所有客户端断开后执行继续保留的时间 (秒)，期间重试仍可接上
+IDEMPOTENCY_ENABLED = get_boolean_env('IDEMPOTENCY_ENABLED', True)
+IDEMPOTENCY_TTL_SECONDS = get_int_env('IDEMPOTENCY_TTL_SECONDS', 3600)
+IDEMPOTENCY_MAX_MB = get_int_env('IDEMPOTENCY_MAX_MB', 256)
+IDEMPOTENCY_DETACH_GRACE_SECONDS = get_int_env('IDEMPOTENCY_DETACH_GRACE_SECONDS', 30)
+# 流式响应断线续传 (Last-Event-ID): 事件日志在流结束后保留的时间 (秒) 与内存上限 (MB)；所有客户端断开后延迟停止生成的宽限时间 (秒)
+STREAM_RESUME_ENABLED = get_boolean_env('STREAM_RESUME_ENABLED', True)
+STREAM_RESUME_WINDOW_SECONDS = get_int_env('STREAM_RESUME_WINDOW_SECONDS', 120)
+STREAM_RESUME_MAX_MB = get_int_env('STREAM_RESUME_MAX_MB', 64)
+STREAM_RESUME_GRACE_SECONDS = get_int_env('STREAM_RESUME_GRACE_SECONDS', 15)
+# 精确匹配响应缓存 (默认关闭): 只缓存显式 temperature=0 的聊天请求，按规范化的请求内容哈希
+RESPONSE_CACHE_ENABLED = get_boolean_env('RESPONSE_CACHE_ENABLED', False)
+RESPONSE_CACHE_TTL_SECONDS = get_int_env('RESPONSE_CACHE_TTL_SECONDS', 3600)
+RESPONSE_CACHE_MAX_MB = get_int_env('RESPONSE_CACHE_MAX_MB', 128)
+# 账号配额预测: 用量达到已学习限额的该百分比时优先分流到其他 Worker；被限流的模型按退避间隔探测恢复 (探测默认关闭)
+QUOTA_STEER_PERCENT = get_int_env('QUOTA_STEER_PERCENT', 90)
+QUOTA_PROBE_ENABLED = get_boolean_env('QUOTA_PROBE_ENABLED', False)
+QUOTA_PROBE_INITIAL_SECONDS = get_int_env('QUOTA_PROBE_INITIAL_SECONDS', 300)
+QUOTA_PROBE_MAX_SECONDS = get_int_env('QUOTA_PROBE_MAX_SECONDS', 3600)
@@ -64,4 +64,5 @@ STREAM_CHUNK_SIZE = 50
 # 其他
 RECOVERY_HOURS = 6.0
 KEEPALIVE_TIMEOUT = 30
-NEW_CHAT_URL = 'https://aistudio.google.com/prompts/new_chat'
\ No newline at end of file
+NEW_CHAT_URL = 'https://aistudio.google.com/prompts/new_chat'
+SOFT_CHAT_RESET_VERIFY_TIMEOUT_MS = int(os.environ.get('SOFT_CHAT_RESET_VERIFY_TIMEOUT_MS', '3000'))
@@ -1,88 +1,359 @@
 import asyncio
 import json
 import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
 import time
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Optional
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncGenerator, AsyncIterator, Callable, Collection, Dict, List, Optional, Tuple
 
 import aiohttp
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
-
+from starlette.requests import ClientDisconnect
+
+from config.settings import (
+    GATEWAY_BALANCING_STRATEGY,
+    GATEWAY_BREAKER_FAILURES,
+    GATEWAY_BREAKER_RESET_SECONDS,
+    GATEWAY_CONNECTION_LIMIT,
+    GATEWAY_CONNECTIONS_PER_WORKER,
+    GATEWAY_DISPATCH_MODE,
+    GATEWAY_FAILOVER_BUDGET,
+    GATEWAY_FIRST_BYTE_TIMEOUT,
+    GATEWAY_MAX_ATTEMPTS,
+    GATEWAY_MODELS_CACHE_SECONDS,
+    GATEWAY_PROCESSES,
+    IDEMPOTENCY_DETACH_GRACE_SECONDS,
+    IDEMPOTENCY_ENABLED,
+    IDEMPOTENCY_MAX_MB,
+    IDEMPOTENCY_TTL_SECONDS,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_MB,
+    RESPONSE_CACHE_TTL_SECONDS,
+    STREAM_RESUME_ENABLED,
+    STREAM_RESUME_GRACE_SECONDS,
+    STREAM_RESUME_MAX_MB,
+    STREAM_RESUME_WINDOW_SECONDS,
+    WORKER_REGISTRY_SECRET,
+)
+from worker.dispatch import (
+    DISPATCH_SECRET_HEADER,
+    DispatchJob,
+    DispatchQueue,
+    dispatch_headers,
+    verify_dispatch_secret,
+)
+from worker.idempotency import IdempotencyMiddleware, IdempotencyStore
+from worker.model_catalog import ModelCatalog, etag_matches, merge_model_lists
+from worker.rate_limit import RateLimitDetector, is_rate_limited_response
+from worker.request_fields import extract_routing_fields
+from worker.response_cache import ResponseCache, ResponseCacheMiddleware
+from worker.resumable import ResumableStreamMiddleware
+from worker.routing import (
+    CircuitBreaker,
+    WorkerLoad,
+    get_balancing_strategy,
+    normalize_model_id,
+    select_worker,
+)
+from worker.shared_state import MAX_GATEWAY_PROCESSES, SharedRoutingState
 
 logger = logging.getLogger("Gateway")
 
 MANAGER_URL = "http://127.0.0.1:9000"
-RATE_LIMIT_KEYWORDS = [b"exceeded quota", b"out of free generations", b"rate limit"]
 
 _session: Optional[aiohttp.ClientSession] = None
+# 登记了 Unix 域套接字的 Worker 各自使用一个会话 (UnixConnector 只能连接一个路径)，按套接字路径缓存
+_unix_sessions: Dict[str, aiohttp.ClientSession] = {}
 _worker_cache = {"workers": [], "last_update": 0, "index": 0}
-CACHE_TTL = 5
+# Worker 注册表由后台任务订阅 Manager 的 SSE 事件维护，请求路径上不做任何 I/O；
+# Manager 不可用时保留最后一次的数据继续服务，并按退避间隔重连 (期间尝试轮询一次)
+_registry_state = {"source": "none", "connected": False, "events": 0, "last_error": None}
+REGISTRY_EVENTS_SOCK_READ = 20
+REGISTRY_RETRY_MIN = 1
+REGISTRY_RETRY_MAX = 10
+# 网关本地视图: 每个 Worker 的负载与耗时统计，以及最近一次分发给它的模型 (Worker 会切换到该模型)
+_worker_loads: Dict[str, WorkerLoad] = {}
+_worker_models: Dict[str, str] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_balancing_strategy = get_balancing_strategy(GATEWAY_BALANCING_STRATEGY)
+_balancing_rng = random.Random()
+# 拉取模式的中心任务队列 (GATEWAY_DISPATCH_MODE=pull)
+_dispatch_queue = DispatchQueue()
+# 分发端点的主密钥: 由 Manager 启动网关时传入 (与各 Worker 的派生密钥对应)，远程部署时使用共享密钥
+_dispatch_key = os.environ.get("GATEWAY_DISPATCH_KEY") or WORKER_REGISTRY_SECRET
+# 多进程模式下由主进程创建、所有网关进程共享的轮询游标/在途请求数/熔断器/限流标记；单进程时为 None
+_shared_state: Optional[SharedRoutingState] = None
+# 本进程发现的限流先写入共享标记，让其他进程在 Manager 广播到达前就避开该 Worker
+SHARED_RATE_LIMIT_HOLD = 60
 
 
 async def get_session() -> aiohttp.ClientSession:
     global _session
     if _session is None or _session.closed:
         connector = aiohttp.TCPConnector(
-            limit=100, limit_per_host=20, keepalive_timeout=30
+            limit=GATEWAY_CONNECTION_LIMIT,
+            limit_per_host=GATEWAY_CONNECTIONS_PER_WORKER,
+            keepalive_timeout=30,
         )
         _session = aiohttp.ClientSession(connector=connector)
     return _session
 
 
+def _worker_base_url(worker: dict) -> str:
+    host = worker.get("host") or "127.0.0.1"
+    if ":" in host:
+        host = f"[{host}]"
+    return f"http://{host}:{worker['port']}"
+
+
+async def get_worker_session(worker: dict) -> Tuple[aiohttp.ClientSession, str]:
+    """返回访问该 Worker 的会话和 URL 前缀: 本机 Worker 登记了 Unix 域套接字 (且套接字存在) 时经套接字转发，
+    否则按登记的地址走 TCP (远程 Worker 为其注册的主机名)
+    """
+    socket_path = None if worker.get("remote") else worker.get("socket")
+    if not socket_path or not os.path.exists(socket_path):
+        return await get_session(), _worker_base_url(worker)
+    session = _unix_sessions.get(socket_path)
+    if session is None or session.closed:
+        connector = aiohttp.UnixConnector(
+            path=socket_path, limit=GATEWAY_CONNECTIONS_PER_WORKER, keepalive_timeout=30
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _unix_sessions[socket_path] = session
+    return session, "http://localhost"
+
+
 async def close_session() -> None:
     global _session
     if _session and not _session.closed:
         await _session.close()
     _session = None
+    for session in list(_unix_sessions.values()):
+        if not session.closed:
+            await session.close()
+    _unix_sessions.clear()
 
 
-async def refresh_workers() -> None:
+def _apply_worker_snapshot(workers: List[dict]) -> None:
     cache = _worker_cache
-    if time.time() - cache["last_update"] < CACHE_TTL and cache["workers"]:
-        return
+    cache["workers"] = [worker for worker in workers if worker.get("status") == "running"]
+    cache["last_update"] = time.time()
+    running_ids = {worker.get("id") for worker in cache["workers"]}
+    for worker_id in list(_worker_models):
+        if worker_id not in running_ids:
+            _worker_models.pop(worker_id, None)
+    for worker_id in list(_worker_loads):
+        if worker_id not in running_ids and not _worker_loads[worker_id].inflight:
+            _worker_loads.pop(worker_id, None)
+    for worker_id in list(_breakers):
+        if worker_id not in running_ids:
+            _breakers.pop(worker_id, None)
+    for worker in cache["workers"]:
+        _update_queue_depth(worker)
+
+
+def _apply_worker_event(worker: dict) -> None:
+    """增量更新单个 Worker: 仍在运行则原位替换 (保持轮转顺序)，否则移除"""
+    cache = _worker_cache
+    worker_id = worker.get("id")
+    workers = [item for item in cache["workers"] if item.get("id") != worker_id]
+    if worker.get("status") == "running":
+        positions = [index for index, item in enumerate(cache["workers"]) if item.get("id") == worker_id]
+        workers.insert(positions[0] if positions else len(workers), worker)
+        _update_queue_depth(worker)
+    else:
+        _worker_models.pop(worker_id, None)
+    cache["workers"] = workers
+    cache["last_update"] = time.time()
 
+
+def _update_queue_depth(worker: dict) -> None:
+    _worker_load(worker.get("id", "")).queue_depth = int(worker.get("queue_length") or 0)
+
+
+def _handle_registry_message(event: str, data: str) -> None:
+    payload = json.loads(data)
+    if event == "snapshot":
+        _apply_worker_snapshot(payload.get("workers", []))
+    elif payload.get("worker"):
+        _apply_worker_event(payload["worker"])
+    _registry_state["events"] += 1
+
+
+async def refresh_workers() -> bool:
+    """从 Manager 拉取一次完整的 Worker 列表，失败时保留现有数据"""
     try:
         session = await get_session()
         timeout = aiohttp.ClientTimeout(total=5)
         async with session.get(
             f"{MANAGER_URL}/api/workers", timeout=timeout
         ) as response:
-            workers = await response.json()
-            cache["workers"] = [
-                worker for worker in workers if worker.get("status") == "running"
-            ]
-            cache["last_update"] = time.time()
+            _apply_worker_snapshot(await response.json())
+            return True
     except Exception as exc:
         logger.warning(f"Refresh workers failed: {exc}")
+        return False
 
 
-def get_next_worker(model: str = "") -> Optional[dict]:
-    cache = _worker_cache
-    workers = cache["workers"]
+async def _consume_worker_events() -> None:
+    session = await get_session()
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=REGISTRY_EVENTS_SOCK_READ)
+    async with session.get(
+        f"{MANAGER_URL}/api/workers/events", timeout=timeout
+    ) as response:
+        if response.status != 200:
+            raise RuntimeError(f"/api/workers/events returned {response.status}")
+        _registry_state.update(source="push", connected=True, last_error=None)
+        logger.info("Subscribed to worker registry events")
+        event, data_lines = "message", []
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").rstrip("\r\n")
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].strip())
+            elif not line and data_lines:
+                _handle_registry_message(event, "\n".join(data_lines))
+                event, data_lines = "message", []
+    raise ConnectionError("worker registry event stream closed")
+
+
+async def watch_worker_registry() -> None:
+    delay = REGISTRY_RETRY_MIN
+    while True:
+        try:
+            await _consume_worker_events()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if _registry_state["connected"]:
+                delay = REGISTRY_RETRY_MIN
+            _registry_state.update(connected=False, last_error=str(exc))
+            logger.warning(f"Worker registry subscription lost: {exc}, retry in {delay}s")
+        # 事件流不可用时 (Manager 重启或旧版本 Manager) 退化为轮询
+        if await refresh_workers():
+            _registry_state["source"] = "poll"
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, REGISTRY_RETRY_MAX)
+
+
+def _worker_load(worker_id: str) -> WorkerLoad:
+    load = _worker_loads.get(worker_id)
+    if load is None:
+        load = _worker_loads[worker_id] = WorkerLoad()
+    return load
+
+
+def _load_of(worker: dict) -> WorkerLoad:
+    worker_id = worker.get("id", "")
+    load = _worker_load(worker_id)
+    if _shared_state is not None:
+        load.remote_inflight = max(0, _shared_state.inflight(worker_id) - load.inflight)
+    return load
+
+
+def _breaker(worker_id: str) -> CircuitBreaker:
+    breaker = _breakers.get(worker_id)
+    if breaker is None:
+        breaker = _breakers[worker_id] = CircuitBreaker(
+            GATEWAY_BREAKER_FAILURES, GATEWAY_BREAKER_RESET_SECONDS
+        )
+    return breaker
+
+
+def _synced_breaker(worker_id: str):
+    """熔断器的操作上下文: 多进程时在共享锁内载入并写回共享状态"""
+    breaker = _breaker(worker_id)
+    if _shared_state is None:
+        return nullcontext(breaker)
+    return _shared_state.breaker(worker_id, breaker)
+
+
+def _next_cursor() -> int:
+    if _shared_state is not None:
+        return _shared_state.next_cursor()
+    cursor = _worker_cache["index"]
+    _worker_cache["index"] += 1
+    return cursor
+
+
+def _worker_eligible(worker: dict, model: str, now: float, current_time: float) -> bool:
+    """熔断未打开，且目标模型未被标记限流"""
+    worker_id = worker.get("id", "")
+    with _synced_breaker(worker_id) as breaker:
+        if not breaker.available(now):
+            return False
+    limits = worker.get("rate_limited_models", {})
+    if model and model in limits and limits[model] > current_time:
+        return False
+    if model and _shared_state is not None and _shared_state.is_rate_limited(worker_id, model, current_time):
+        return False
+    return True
+
+
+def get_next_worker(model: str = "", exclude: Collection[str] = ()) -> Optional[dict]:
+    workers = _worker_cache["workers"]
     if not workers:
         return None
 
-    candidates = workers
-    if model:
-        current_time = time.time()
-        candidates = []
-        for worker in workers:
-            limits = worker.get("rate_limited_models", {})
-            if model in limits and limits[model] > current_time:
-                continue
-            candidates.append(worker)
+    current_time = time.time()
+    now = time.monotonic()
+    candidates = [
+        worker
+        for worker in workers
+        if worker.get("id", "") not in exclude and _worker_eligible(worker, model, now, current_time)
+    ]
 
     if not candidates:
         return None
-
-    worker = candidates[cache["index"] % len(candidates)]
-    cache["index"] += 1
+    # Manager 预测接近配额上限的 Worker 仅在没有其他选择时使用
+    target = normalize_model_id(model)
+    if target:
+        fresh = [w for w in candidates if target not in w.get("near_limit_models", ())]
+        candidates = fresh or candidates
+
+    start = _next_cursor() % len(candidates)
+    worker = select_worker(
+        candidates[start:] + candidates[:start],
+        model,
+        load=lambda item: _load_of(item).outstanding,
+        current_model=lambda item: _worker_models.get(item.get("id", ""))
+        or item.get("current_model"),
+        pick=lambda pool: _balancing_strategy(pool, _load_of, _balancing_rng),
+    )
+    if worker and model:
+        _worker_models[worker.get("id", "")] = normalize_model_id(model)
     return worker
 
 
+def _acquire_worker(worker_id: str) -> float:
+    if _shared_state is not None:
+        _shared_state.add_inflight(worker_id, 1)
+    return _worker_load(worker_id).begin(time.monotonic())
+
+
+def _release_worker(
+    worker_id: str, started: float, first_byte: Optional[float] = None, ok: bool = False
+) -> None:
+    if _shared_state is not None:
+        _shared_state.add_inflight(worker_id, -1)
+    _worker_load(worker_id).finish(started, first_byte, time.monotonic(), ok)
+
+
+def _note_rate_limit(worker_id: str, model: str) -> None:
+    if _shared_state is not None:
+        _shared_state.mark_rate_limited(worker_id, model, time.time() + SHARED_RATE_LIMIT_HOLD)
+    asyncio.create_task(report_rate_limit(worker_id, model))
+
+
 async def report_rate_limit(worker_id: str, model: str) -> None:
     try:
         session = await get_session()
@@ -96,16 +367,51 @@ async def report_rate_limit(worker_id: str, model: str) -> None:
         logger.warning(f"Report rate limit failed for worker {worker_id}: {exc}")
 
 
-def check_rate_limit_in_response(content: bytes) -> bool:
-    content_lower = content.lower()
-    return any(keyword in content_lower for keyword in RATE_LIMIT_KEYWORDS)
+async def _fetch_worker_models(worker: dict) -> List[dict]:
+    session, base_url = await get_worker_session(worker)
+    url = f"{base_url}/v1/models"
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+        if response.status != 200:
+            raise RuntimeError(f"worker {worker.get('id')} returned {response.status}")
+        payload = await response.json()
+    return payload.get("data") or []
+
+
+async def fetch_fleet_models() -> List[dict]:
+    """并发查询所有运行中的 Worker，合并出全局模型目录；部分 Worker 失败时使用其余结果"""
+    workers = list(_worker_cache["workers"])
+    if not workers:
+        raise LookupError("No workers available")
+    results = await asyncio.gather(
+        *(_fetch_worker_models(worker) for worker in workers),
+        return_exceptions=True,
+    )
+    model_lists = [result for result in results if isinstance(result, list)]
+    for worker, result in zip(workers, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Fetch models from worker {worker.get('id')} failed: {result}")
+    if not model_lists:
+        raise RuntimeError("No worker returned a model list")
+    return merge_model_lists(model_lists)
+
+
+# 全局模型目录: /v1/models 直接由缓存应答，不经过 Worker 或浏览器
+_model_catalog = ModelCatalog(fetch_fleet_models, ttl=GATEWAY_MODELS_CACHE_SECONDS)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await refresh_workers()
+    registry_task = asyncio.create_task(watch_worker_registry())
+    if _worker_cache["workers"]:
+        _model_catalog.refresh_in_background()
     logger.info("Gateway started")
     yield
+    registry_task.cancel()
+    try:
+        await registry_task
+    except asyncio.CancelledError:
+        pass
     await close_session()
 
 
@@ -125,6 +431,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 带 Idempotency-Key 的重复请求在网关层合并 (每个网关进程各自维护)
+_idempotency_store = IdempotencyStore(
+    ttl=IDEMPOTENCY_TTL_SECONDS,
+    max_bytes=IDEMPOTENCY_MAX_MB * 1024 * 1024,
+    detach_grace=IDEMPOTENCY_DETACH_GRACE_SECONDS,
+)
+if IDEMPOTENCY_ENABLED:
+    app.add_middleware(IdempotencyMiddleware, store=_idempotency_store)
+# 命中缓存的请求不再转发给 Worker
+_response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL_SECONDS, max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+if RESPONSE_CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware, cache=_response_cache)
+# 流式响应的事件 id 与续传由网关分配和处理 (覆盖 Worker 的事件 id)，重连不必回到同一个 Worker
+_stream_log = IdempotencyStore(
+    ttl=STREAM_RESUME_WINDOW_SECONDS,
+    max_bytes=STREAM_RESUME_MAX_MB * 1024 * 1024,
+    detach_grace=STREAM_RESUME_GRACE_SECONDS,
+)
+if STREAM_RESUME_ENABLED:
+    app.add_middleware(ResumableStreamMiddleware, store=_stream_log)
+
 
 @app.get("/", tags=["System"], summary="网关状态")
 async def root():
@@ -132,48 +459,175 @@ async def root():
 
 
 @app.get("/v1/models", tags=["Chat"], summary="获取模型列表")
-async def models():
-    await refresh_workers()
-    worker = get_next_worker()
-    if not worker:
-        raise HTTPException(status_code=503, detail="No workers available")
+async def models(request: Request):
+    try:
+        body, etag = await _model_catalog.get()
+    except LookupError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except Exception as exc:
+        logger.error(f"Fetch /v1/models failed: {exc}")
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
 
-    url = f"http://127.0.0.1:{worker['port']}/v1/models"
-    session = await get_session()
+    headers = {"ETag": etag, "Cache-Control": f"max-age={GATEWAY_MODELS_CACHE_SECONDS}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class UpstreamAttemptFailed(Exception):
+    """一次转发在向客户端发送任何数据前失败，可以换 Worker 重试"""
+
+    def __init__(self, reason: str, status: int = 502, rate_limited: bool = False):
+        super().__init__(reason)
+        self.status = status
+        self.rate_limited = rate_limited
+
+
+class UpstreamRejected(Exception):
+    """Worker 以不可重试的状态 (如 400/401/422) 拒绝了请求: 原样转给客户端，不换 Worker 也不计入熔断"""
+
+    def __init__(self, status: int, content: bytes, content_type: str):
+        super().__init__(f"worker returned {status}")
+        self.status = status
+        self.content = content
+        self.content_type = content_type
+
+    def to_response(self) -> Response:
+        return Response(content=self.content, status_code=self.status, media_type=self.content_type)
+
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+async def _open_stream(
+    session: aiohttp.ClientSession,
+    url: str,
+    body: bytes,
+    headers: Dict[str, str],
+    first_byte_timeout: float,
+) -> Tuple[aiohttp.ClientResponse, AsyncGenerator, List[bytes], RateLimitDetector]:
+    """发起流式请求并缓冲到首个完整的 SSE 数据帧 (心跳注释不算)；此前的失败抛出 UpstreamAttemptFailed，
+    不可重试的错误状态抛出 UpstreamRejected
+    """
+    timeout = aiohttp.ClientTimeout(total=600, sock_read=300)
     try:
-        async with session.get(
-            url, timeout=aiohttp.ClientTimeout(total=30)
+        response = await asyncio.wait_for(
+            session.post(url, data=body, headers=headers, timeout=timeout),
+            timeout=first_byte_timeout,
+        )
+    except asyncio.TimeoutError as exc:
+        raise UpstreamAttemptFailed("timed out waiting for response headers", 504) from exc
+    except aiohttp.ClientError as exc:
+        raise UpstreamAttemptFailed(f"connection failed: {exc}") from exc
+
+    if response.status != 200:
+        try:
+            content = await asyncio.wait_for(response.read(), timeout=first_byte_timeout)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as exc:
+            raise UpstreamAttemptFailed(f"worker returned {response.status}", response.status) from exc
+        finally:
+            response.close()
+        _check_complete_response(response.status, content)
+        raise UpstreamRejected(response.status, content, response.content_type)
+
+    chunks = response.content.iter_any()
+    try:
+        buffered, detector = await _buffer_first_frame(chunks, first_byte_timeout)
+    except BaseException:
+        response.close()
+        raise
+    return response, chunks, buffered, detector
+
+
+async def _buffer_first_frame(
+    chunks: AsyncIterator[bytes], first_byte_timeout: float
+) -> Tuple[List[bytes], RateLimitDetector]:
+    """读取上游流直到首个完整的 SSE 数据帧；此前的失败或限流抛出 UpstreamAttemptFailed"""
+    detector = RateLimitDetector()
+    buffered: List[bytes] = []
+    deadline = time.monotonic() + first_byte_timeout
+    try:
+        while not detector.data_frames and not detector.detected:
+            data = await asyncio.wait_for(
+                chunks.__anext__(), timeout=max(0.0, deadline - time.monotonic())
+            )
+            if data:
+                buffered.append(data)
+                detector.feed(data)
+    except StopAsyncIteration as exc:
+        if not detector.close() and not detector.data_frames:
+            raise UpstreamAttemptFailed("stream closed before first byte") from exc
+    except asyncio.TimeoutError as exc:
+        raise UpstreamAttemptFailed("timed out waiting for first byte", 504) from exc
+    except (aiohttp.ClientError, ClientDisconnect) as exc:
+        raise UpstreamAttemptFailed(f"stream failed before first byte: {exc}") from exc
+
+    if detector.detected:
+        raise UpstreamAttemptFailed("rate limited", 429, rate_limited=True)
+    return buffered, detector
+
+
+async def _post_once(
+    session: aiohttp.ClientSession,
+    url: str,
+    body: bytes,
+    headers: Dict[str, str],
+    timeout_s: float,
+) -> Tuple[bytes, int, str]:
+    try:
+        async with session.post(
+            url,
+            data=body,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=timeout_s),
         ) as response:
             content = await response.read()
-            return Response(
-                content=content,
-                status_code=response.status,
-                media_type=response.content_type,
-            )
-    except Exception as exc:
-        logger.error(f"Forward /v1/models failed: {exc}")
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
+            status, content_type = response.status, response.content_type
+    except asyncio.TimeoutError as exc:
+        raise UpstreamAttemptFailed("timed out", 504) from exc
+    except aiohttp.ClientError as exc:
+        raise UpstreamAttemptFailed(f"connection failed: {exc}") from exc
+    _check_complete_response(status, content)
+    return content, status, content_type
+
+
+def _check_complete_response(status: int, content: bytes) -> None:
+    if is_rate_limited_response(status, content):
+        raise UpstreamAttemptFailed("rate limited", 429, rate_limited=True)
+    if status in RETRYABLE_STATUSES:
+        raise UpstreamAttemptFailed(f"worker returned {status}", status)
+
+
+def _client_deadline(request: Request, arrived: float) -> float:
+    budget = float(GATEWAY_FAILOVER_BUDGET)
+    try:
+        requested = float(request.headers.get("x-request-timeout", "") or 0)
+    except ValueError:
+        requested = 0
+    if requested > 0:
+        budget = min(budget, requested)
+    return arrived + budget
 
 
 @app.post("/v1/chat/completions", tags=["Chat"], summary="聊天对话")
 async def chat_completions(request: Request):
-    await refresh_workers()
+    arrived = time.monotonic()
     body = await request.body()
     if not body:
         raise HTTPException(status_code=400, detail="Request body is empty")
-    body_json = json.loads(body)
-    is_stream = body_json.get("stream", False)
-    model_id = body_json.get("model", "")
-
-    worker = get_next_worker(model_id)
-    if not worker:
-        raise HTTPException(status_code=503, detail="No workers available")
-
-    port = worker["port"]
-    worker_id = worker.get("id", "")
-    url = f"http://127.0.0.1:{port}/v1/chat/completions"
-    req_id = f"gw-{worker_id}"
-    logger.info(f"[{req_id}] POST -> worker:{port} (stream={is_stream})")
+    # 请求体 (可能含数 MB 的 base64 图片) 以原始字节转发，重试时复用；只扫描出路由所需的字段
+    fields = extract_routing_fields(body)
+    if fields is None:
+        try:
+            fields = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        if not isinstance(fields, dict):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+    is_stream = fields.get("stream", False)
+    model_id = fields.get("model") or ""
+    if not isinstance(model_id, str):
+        model_id = ""
 
     forward_headers = {"Content-Type": "application/json"}
     for key, value in request.headers.items():
@@ -185,78 +639,368 @@ async def chat_completions(request: Request):
         ):
             forward_headers[key] = value
 
-    session = await get_session()
+    deadline = _client_deadline(request, arrived)
+    if GATEWAY_DISPATCH_MODE == "pull":
+        return await _dispatch_pull(request, body, dispatch_headers(request.headers), model_id, is_stream, deadline)
+
+    tried: List[str] = []
+    last_failure: Optional[UpstreamAttemptFailed] = None
+
+    # 首字节之前的失败对客户端不可见: 换一个 Worker 重试，直到次数或时间预算用尽
+    for attempt in range(1, max(1, GATEWAY_MAX_ATTEMPTS) + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (attempt > 1 and await request.is_disconnected()):
+            break
+        worker = get_next_worker(model_id, exclude=tried)
+        if not worker:
+            break
+
+        port = worker["port"]
+        worker_id = worker.get("id", "")
+        tried.append(worker_id)
+        session, base_url = await get_worker_session(worker)
+        url = f"{base_url}/v1/chat/completions"
+        req_id = f"gw-{worker_id}"
+        logger.info(
+            f"[{req_id}] POST -> worker:{port} (stream={is_stream}, model={model_id or '-'}, attempt={attempt})"
+        )
 
-    if is_stream:
-
-        async def stream_proxy() -> AsyncGenerator[bytes, None]:
-            rate_limited = False
-            try:
-                timeout = aiohttp.ClientTimeout(total=600, sock_read=300)
-                async with session.post(
-                    url, data=body, headers=forward_headers, timeout=timeout
-                ) as response:
-                    async for chunk in response.content.iter_chunks():
-                        data, _ = chunk
-                        if not data:
-                            continue
-                        if not rate_limited and check_rate_limit_in_response(data):
-                            rate_limited = True
-                        yield data
-
-                    if rate_limited and worker_id and model_id:
-                        asyncio.create_task(report_rate_limit(worker_id, model_id))
-            except asyncio.CancelledError:
-                logger.info(f"[{req_id}] Stream cancelled")
-                raise
-            except Exception as exc:
-                logger.error(f"[{req_id}] Stream error: {exc}")
-
-        return StreamingResponse(
-            stream_proxy(),
-            media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        with _synced_breaker(worker_id) as breaker:
+            breaker.on_dispatch(time.monotonic())
+        started = _acquire_worker(worker_id)
+        try:
+            if is_stream:
+                response, chunks, buffered, detector = await _open_stream(
+                    session,
+                    url,
+                    body,
+                    forward_headers,
+                    min(GATEWAY_FIRST_BYTE_TIMEOUT, remaining),
+                )
+            else:
+                content, status, content_type = await _post_once(
+                    session, url, body, forward_headers, min(300, remaining)
+                )
+        except UpstreamAttemptFailed as failure:
+            _release_worker(worker_id, started)
+            last_failure = failure
+            _record_attempt_failure(req_id, worker_id, model_id, attempt, failure)
+            continue
+        except UpstreamRejected as rejected:
+            _release_worker(worker_id, started)
+            with _synced_breaker(worker_id) as breaker:
+                breaker.abandon()
+            logger.info(f"[{req_id}] {rejected}, relaying to client")
+            return rejected.to_response()
+        except BaseException:
+            _release_worker(worker_id, started)
+            with _synced_breaker(worker_id) as breaker:
+                breaker.abandon()
+            raise
+
+        first_byte = time.monotonic()
+        with _synced_breaker(worker_id) as breaker:
+            breaker.record_success()
+        if not is_stream:
+            _release_worker(worker_id, started, ok=status == 200)
+            return Response(content=content, status_code=status, media_type=content_type)
+        return _stream_response(
+            req_id, worker_id, model_id, started, first_byte, response.close, chunks, buffered, detector
         )
 
+    raise _attempts_exhausted(tried, last_failure)
+
+
+def _record_attempt_failure(
+    req_id: str, worker_id: str, model_id: str, attempt: int, failure: UpstreamAttemptFailed
+) -> None:
+    with _synced_breaker(worker_id) as breaker:
+        if failure.rate_limited:
+            # 限流不代表 Worker 故障，交由 Manager 标记该模型，不计入熔断
+            breaker.abandon()
+        else:
+            breaker.record_failure(time.monotonic())
+    if failure.rate_limited and worker_id and model_id:
+        _note_rate_limit(worker_id, model_id)
+    logger.warning(f"[{req_id}] Attempt {attempt} failed before first byte: {failure}")
+
+
+def _attempts_exhausted(tried: List[str], last_failure: Optional[UpstreamAttemptFailed]) -> HTTPException:
+    if last_failure is None:
+        return HTTPException(status_code=503, detail="No workers available")
+    status = 429 if last_failure.rate_limited else last_failure.status
+    return HTTPException(
+        status_code=status if status in RETRYABLE_STATUSES else 502,
+        detail=f"All attempts failed ({len(tried)} workers): {last_failure}",
+    )
+
+
+def _stream_response(
+    req_id: str,
+    worker_id: str,
+    model_id: str,
+    started: float,
+    first_byte: float,
+    close: Callable[[], None],
+    chunks: AsyncIterator[bytes],
+    buffered: List[bytes],
+    detector: RateLimitDetector,
+) -> StreamingResponse:
+    return StreamingResponse(
+        _relay_stream(req_id, worker_id, model_id, started, first_byte, close, chunks, buffered, detector),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _wait_for_job(job: DispatchJob, request: Request, deadline: float):
+    """等待 Worker 领取任务并开始上传响应: 排队时间受总期限约束，领取后另受首字节超时约束"""
+    while True:
+        limit = deadline
+        if job.assigned_at is not None:
+            limit = min(limit, job.assigned_at + GATEWAY_FIRST_BYTE_TIMEOUT)
+        remaining = limit - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.response), min(remaining, 1.0))
+        except asyncio.TimeoutError:
+            if await request.is_disconnected():
+                _dispatch_queue.withdraw(job)
+                job.finish(False)
+                raise HTTPException(status_code=499, detail="Client disconnected while queued")
+    _dispatch_queue.withdraw(job)
+    job.finish(False)
+    if job.worker_id is None:
+        return None
+    raise UpstreamAttemptFailed("timed out waiting for worker response", 504)
+
+
+async def _dispatch_pull(
+    request: Request,
+    body: bytes,
+    headers: Dict[str, str],
+    model_id: str,
+    is_stream: bool,
+    deadline: float,
+):
+    """拉取模式: 请求进入中心队列，由页面空闲的 Worker 领取并把响应上传回来；
+    首字节前失败时以更高优先级重新入队，并排除已失败的 Worker。
+    """
+    tried: List[str] = []
+    last_failure: Optional[UpstreamAttemptFailed] = None
+    for attempt in range(1, max(1, GATEWAY_MAX_ATTEMPTS) + 1):
+        if deadline - time.monotonic() <= 0 or (attempt > 1 and await request.is_disconnected()):
+            break
+        job = DispatchJob(body, headers, model_id, bool(is_stream), excluded=frozenset(tried))
+        await _dispatch_queue.submit(job, front=attempt > 1)
+        try:
+            attached = await _wait_for_job(job, request, deadline)
+        except UpstreamAttemptFailed as failure:
+            tried.append(job.worker_id)
+            last_failure = failure
+            _record_attempt_failure(f"gw-{job.worker_id}", job.worker_id, model_id, attempt, failure)
+            continue
+        if attached is None:
+            break
+
+        status, content_type, chunks = attached
+        worker_id = job.worker_id
+        tried.append(worker_id)
+        req_id = f"gw-{worker_id}"
+        logger.info(
+            f"[{req_id}] {job.id} pulled (stream={is_stream}, model={model_id or '-'}, "
+            f"queued={job.assigned_at - job.created:.2f}s, attempt={attempt})"
+        )
+        with _synced_breaker(worker_id) as breaker:
+            breaker.on_dispatch(time.monotonic())
+        started = _acquire_worker(worker_id)
+        try:
+            if is_stream and status == 200:
+                buffered, detector = await _buffer_first_frame(
+                    chunks, min(GATEWAY_FIRST_BYTE_TIMEOUT, max(0.0, deadline - time.monotonic()))
+                )
+            else:
+                try:
+                    content = b"".join([data async for data in chunks])
+                except ClientDisconnect as exc:
+                    raise UpstreamAttemptFailed("worker upload aborted") from exc
+                _check_complete_response(status, content)
+                if is_stream:
+                    raise UpstreamRejected(status, content, content_type)
+        except UpstreamAttemptFailed as failure:
+            _release_worker(worker_id, started)
+            job.finish(False)
+            last_failure = failure
+            _record_attempt_failure(req_id, worker_id, model_id, attempt, failure)
+            continue
+        except UpstreamRejected as rejected:
+            _release_worker(worker_id, started)
+            job.finish(True)
+            with _synced_breaker(worker_id) as breaker:
+                breaker.abandon()
+            logger.info(f"[{req_id}] {rejected}, relaying to client")
+            return rejected.to_response()
+        except BaseException:
+            _release_worker(worker_id, started)
+            job.finish(False)
+            with _synced_breaker(worker_id) as breaker:
+                breaker.abandon()
+            raise
+
+        first_byte = time.monotonic()
+        with _synced_breaker(worker_id) as breaker:
+            breaker.record_success()
+        if not is_stream:
+            _release_worker(worker_id, started, ok=status == 200)
+            job.finish(True)
+            return Response(content=content, status_code=status, media_type=content_type)
+        return _stream_response(
+            req_id, worker_id, model_id, started, first_byte, lambda: job.finish(True), chunks, buffered, detector
+        )
+
+    if last_failure is None:
+        raise HTTPException(status_code=504, detail="No idle worker picked up the request in time")
+    raise _attempts_exhausted(tried, last_failure)
+
+
+def _require_worker(request: Request, worker_id: str) -> None:
+    """分发端点只对持有本 Worker 派生密钥的调用方开放 (本机连接同样需要)"""
+    if not verify_dispatch_secret(_dispatch_key, worker_id, request.headers.get(DISPATCH_SECRET_HEADER, "")):
+        raise HTTPException(status_code=403, detail="Dispatch endpoints are only available to registered workers")
+
+
+@app.get("/internal/dispatch/next", include_in_schema=False)
+async def dispatch_next(request: Request, worker_id: str, wait: float = 25):
+    """Worker 长轮询领取下一个任务: 请求体原样返回，任务 id 与转发头放在响应头中；超时返回 204"""
+    _require_worker(request, worker_id)
+
+    def eligible(job: DispatchJob) -> bool:
+        worker = next((w for w in _worker_cache["workers"] if w.get("id") == worker_id), None)
+        return worker is not None and _worker_eligible(worker, job.model, time.monotonic(), time.time())
+
+    job = await _dispatch_queue.next_job(worker_id, eligible, min(max(wait, 0.0), 60.0))
+    if job is None:
+        return Response(status_code=204)
+    if job.model:
+        _worker_models[worker_id] = normalize_model_id(job.model)
+    return Response(
+        content=job.body,
+        media_type="application/json",
+        headers={"X-Dispatch-Job": job.id, "X-Dispatch-Headers": json.dumps(job.headers)},
+    )
+
+
+@app.post("/internal/dispatch/{job_id}/result", include_in_schema=False)
+async def dispatch_result(job_id: str, request: Request):
+    """Worker 以流式请求体上传任务响应；转发结束前保持请求打开，客户端已离开时返回 410"""
+    worker_id = request.headers.get("x-dispatch-worker", "")
+    _require_worker(request, worker_id)
+    job = _dispatch_queue.assigned(job_id, worker_id)
+    if job is None:
+        return Response(status_code=410)
+    upload = {"complete": False}
+
+    async def chunks():
+        async for data in request.stream():
+            if data:
+                yield data
+        upload["complete"] = True
+
+    status = int(request.headers.get("x-dispatch-status", "200"))
+    content_type = request.headers.get("x-dispatch-content-type", "application/json")
+    if job.attach(status, content_type, chunks()):
+        await job.finished.wait()
+    _dispatch_queue.withdraw(job)
+    return Response(status_code=200 if upload["complete"] and job.delivered else 410)
+
+
+async def _relay_stream(
+    req_id: str,
+    worker_id: str,
+    model_id: str,
+    started: float,
+    first_byte: float,
+    close: Callable[[], None],
+    chunks: AsyncIterator[bytes],
+    buffered: List[bytes],
+    detector: RateLimitDetector,
+) -> AsyncGenerator[bytes, None]:
+    ok = False
     try:
-        async with session.post(
-            url,
-            data=body,
-            headers=forward_headers,
-            timeout=aiohttp.ClientTimeout(total=300),
-        ) as response:
-            content = await response.read()
-            if check_rate_limit_in_response(content) and worker_id and model_id:
-                asyncio.create_task(report_rate_limit(worker_id, model_id))
-            return Response(
-                content=content,
-                status_code=response.status,
-                media_type=response.content_type,
-            )
+        for data in buffered:
+            yield data
+        async for data in chunks:
+            if not data:
+                continue
+            detector.feed(data)
+            yield data
+
+        ok = not detector.close()
+        if detector.detected and worker_id and model_id:
+            _note_rate_limit(worker_id, model_id)
+    except asyncio.CancelledError:
+        logger.info(f"[{req_id}] Stream cancelled")
+        raise
     except Exception as exc:
-        logger.error(f"[{req_id}] Forward failed: {exc}")
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
+        logger.error(f"[{req_id}] Stream error: {exc}")
+    finally:
+        close()
+        _release_worker(worker_id, started, first_byte, ok)
 
 
 @app.get("/health", tags=["System"], summary="健康检查")
 async def health():
-    return {"status": "ok", "workers": len(_worker_cache["workers"])}
+    return {
+        "status": "ok",
+        "workers": len(_worker_cache["workers"]),
+        "registry": {
+            **_registry_state,
+            "age_s": round(time.time() - _worker_cache["last_update"], 1)
+            if _worker_cache["last_update"]
+            else None,
+        },
+        "balancing": GATEWAY_BALANCING_STRATEGY,
+        "breakers": {
+            worker_id: breaker.to_dict()
+            for worker_id, breaker in _breakers.items()
+            if breaker.failures or breaker.trips
+        },
+        "workerLoads": {
+            worker_id: load.to_dict() for worker_id, load in _worker_loads.items()
+        },
+        "workerModels": dict(_worker_models),
+        "modelCatalog": _model_catalog.to_dict(),
+        "dispatch": {"mode": GATEWAY_DISPATCH_MODE, **_dispatch_queue.to_dict()},
+        "connections": {
+            "limit": GATEWAY_CONNECTION_LIMIT,
+            "per_worker": GATEWAY_CONNECTIONS_PER_WORKER,
+            "unix_sockets": sorted(_unix_sessions),
+        },
+        "idempotency": _idempotency_store.to_dict() if IDEMPOTENCY_ENABLED else None,
+        "streamResume": _stream_log.to_dict() if STREAM_RESUME_ENABLED else None,
+        "responseCache": _response_cache.to_dict() if RESPONSE_CACHE_ENABLED else None,
+        "process": {
+            "pid": os.getpid(),
+            "index": _shared_state.process_index if _shared_state is not None else 0,
+            "shared_state": _shared_state is not None,
+        },
+    }
 
 
 async def forward_media_request(request: Request, path: str):
-    await refresh_workers()
     worker = get_next_worker()
     if not worker:
         raise HTTPException(status_code=503, detail="No workers available")
 
-    url = f"http://127.0.0.1:{worker['port']}{path}"
+    session, base_url = await get_worker_session(worker)
+    url = f"{base_url}{path}"
     body = await request.body()
     forward_headers = {}
     for key, value in request.headers.items():
         if key.lower() not in ("host", "content-length", "transfer-encoding"):
             forward_headers[key] = value
 
-    session = await get_session()
     try:
         async with session.post(
             url,
@@ -321,15 +1065,88 @@ def configure_logging() -> None:
     )
 
 
+def _bind_reuseport(port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", port))
+    return sock
+
+
+def _serve_process(index: int, port: int, manager_url: str, shared_state: SharedRoutingState) -> None:
+    """单个网关进程: 各自绑定 SO_REUSEPORT 监听套接字，由内核在进程间分配新连接"""
+    global MANAGER_URL, _shared_state
+    MANAGER_URL = manager_url
+    shared_state.process_index = index
+    _shared_state = shared_state
+    configure_logging()
+    sock = _bind_reuseport(port)
+    logger.info(f"Gateway process {index} (pid {os.getpid()}) listening on :{port}")
+    uvicorn.Server(uvicorn.Config(app, log_level="warning")).run(sockets=[sock])
+
+
+def run_processes(port: int, count: int, manager_url: str) -> None:
+    """启动多个网关进程并监督它们，进程退出时清零其在途计数后重启"""
+    shared_state = SharedRoutingState()
+    processes: Dict[int, multiprocessing.Process] = {}
+
+    def start(index: int) -> None:
+        process = multiprocessing.Process(
+            target=_serve_process,
+            args=(index, port, manager_url, shared_state),
+            name=f"gateway-{index}",
+            daemon=True,
+        )
+        process.start()
+        processes[index] = process
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for index in range(count):
+            start(index)
+        logger.info(f"Gateway started with {count} processes on :{port}")
+        while True:
+            time.sleep(1)
+            for index, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                logger.warning(f"Gateway process {index} exited ({process.exitcode}), restarting")
+                shared_state.reset_process(index)
+                start(index)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(5)
+        shared_state.close()
+
+
 def main() -> None:
     import argparse
 
+    global MANAGER_URL
+
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=2048)
+    parser.add_argument("--processes", type=int, default=GATEWAY_PROCESSES)
+    parser.add_argument("--manager-url", default=MANAGER_URL)
     args = parser.parse_args()
 
     configure_logging()
-    uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning")
+    MANAGER_URL = args.manager_url.rstrip("/")
+    processes = min(max(1, args.processes), MAX_GATEWAY_PROCESSES)
+    if processes > 1 and GATEWAY_DISPATCH_MODE == "pull":
+        logger.warning("Pull dispatch keeps its queue in one process, running a single gateway process")
+        processes = 1
+    if processes > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        logger.warning("SO_REUSEPORT is not supported on this platform, running a single gateway process")
+        processes = 1
+    if processes == 1:
+        uvicorn.run(app, host="0.0.0.0", port=args.port, log_level="warning")
+        return
+    run_processes(args.port, processes, MANAGER_URL)
 
 
 if __name__ == "__main__":
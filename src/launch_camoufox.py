@@ -20,6 +20,7 @@ from dotenv import load_dotenv
 load_dotenv()
 import uvicorn
 from server import app
+from worker.transport import bind_tcp_socket, bind_unix_socket
 try:
     from camoufox.server import launch_server
     from camoufox import DefaultAddons
@@ -376,6 +377,23 @@ def get_proxy_from_gsettings():
                 pass
     return None
 
+def run_uvicorn_with_unix_socket(port: int, socket_path: str):
+    """同一个 Uvicorn 服务器同时监听 TCP 端口和 Unix 域套接字，退出时删除套接字文件"""
+    sockets = [bind_tcp_socket('0.0.0.0', port)]
+    try:
+        sockets.append(bind_unix_socket(socket_path))
+        logger.info(f'  Unix 域套接字: {socket_path}')
+    except OSError as e:
+        logger.warning(f'  绑定 Unix 域套接字 {socket_path} 失败 ({e})，仅监听 TCP 端口。')
+        socket_path = None
+    try:
+        uvicorn.Server(uvicorn.Config(app, log_config=None)).run(sockets=sockets)
+    finally:
+        for sock in sockets:
+            sock.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
 def determine_proxy_configuration(internal_camoufox_proxy_arg=None):
     result = {'camoufox_proxy': None, 'stream_proxy': None, 'source': '无代理'}
     if internal_camoufox_proxy_arg is not None:
@@ -423,6 +441,7 @@ if __name__ == '__main__':
     parser.add_argument('--internal-camoufox-proxy', type=str, default=None, help=argparse.SUPPRESS)
     parser.add_argument('--internal-camoufox-os', type=str, default='random', help=argparse.SUPPRESS)
     parser.add_argument('--server-port', type=int, default=DEFAULT_SERVER_PORT, help=f'FastAPI 服务器监听的端口号 (默认: {DEFAULT_SERVER_PORT})')
+    parser.add_argument('--server-socket', type=str, default=None, help='除 TCP 端口外，FastAPI 服务器额外监听的 Unix 域套接字路径 (多 Worker 模式下供网关转发使用)')
     parser.add_argument('--stream-port', type=int, default=DEFAULT_STREAM_PORT, help=f'流式代理服务器使用端口提供来禁用此功能 --stream-port=0 . 默认: {DEFAULT_STREAM_PORT}')
     parser.add_argument('--helper', type=str, default=DEFAULT_HELPER_ENDPOINT, help=f"Helper 服务器的 getStreamResponse 端点地址 (例如: http://127.0.0.1:3121/getStreamResponse). 提供空字符串 (例如: --helper='') 来禁用此功能. 默认: {DEFAULT_HELPER_ENDPOINT}")
     parser.add_argument('--camoufox-debug-port', type=int, default=DEFAULT_CAMOUFOX_PORT, help=f'内部 Camoufox 实例监听的调试端口号 (默认: {DEFAULT_CAMOUFOX_PORT})')
@@ -518,6 +537,10 @@ if __name__ == '__main__':
                 # Reduce WebSocket connection limit
                 'network.websocket.max-connections': 10,
             }
+            if os.environ.get('LEAN_RENDERING_ENABLED', '').lower() in ('true', '1', 'yes'):
+                from browser.lean_rendering import LEAN_FIREFOX_PREFS
+                memory_optimization_prefs.update(LEAN_FIREFOX_PREFS)
+                print('  精简渲染模式: 已追加降低合成开销的 Firefox 首选项', flush=True)
             launch_args_for_internal_camoufox = {'port': camoufox_port_internal, 'addons': [], 'exclude_addons': [DefaultAddons.UBO], 'window': (1024, 600), 'firefox_user_prefs': memory_optimization_prefs}
             if camoufox_proxy_internal:
                 launch_args_for_internal_camoufox['proxy'] = {'server': camoufox_proxy_internal}
@@ -907,7 +930,10 @@ if __name__ == '__main__':
             logger.info(f'    {key}= (未设置)')
     logger.info(f'--- 步骤 5: 启动集成的 FastAPI 服务器 (监听端口: {args.server_port}) ---')
     try:
-        uvicorn.run(app, host='0.0.0.0', port=args.server_port, log_config=None)
+        if args.server_socket:
+            run_uvicorn_with_unix_socket(args.server_port, args.server_socket)
+        else:
+            uvicorn.run(app, host='0.0.0.0', port=args.server_port, log_config=None)
         logger.info('Uvicorn 服务器已停止。')
     except SystemExit as e_sysexit:
         logger.info(f'Uvicorn 或其子系统通过 sys.exit({e_sysexit.code}) 退出。')
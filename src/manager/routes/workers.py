@@ -1,17 +1,31 @@
+import asyncio
+import hmac
+import json
 import os
+import re
+import time
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 try:
-    from ...config.settings import SAVED_AUTH_DIR
+    from ...config.settings import SAVED_AUTH_DIR, WORKER_REGISTRY_SECRET
 except ImportError:
-    from config.settings import SAVED_AUTH_DIR
+    from config.settings import SAVED_AUTH_DIR, WORKER_REGISTRY_SECRET
 
-from ..service import WORKER_POOL_AVAILABLE, manager, worker_pool
+from ..service import (
+    WORKER_EVENT_SNAPSHOT_INTERVAL,
+    WORKER_POOL_AVAILABLE,
+    manager,
+    worker_pool,
+)
 
 
 router = APIRouter(prefix="/api/workers", tags=["Workers"])
 
+WORKER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
 
 def _require_worker_pool():
     if not WORKER_POOL_AVAILABLE or worker_pool is None:
@@ -31,8 +45,9 @@ async def add_worker(profile: str = Body(..., embed=True)):
     next_id = max(existing_ids, default=0) + 1
     worker_id = f"w{next_id}"
 
-    existing_ports = [worker.port for worker in pool.workers.values()]
-    existing_camoufox_ports = [worker.camoufox_port for worker in pool.workers.values()]
+    local_workers = [worker for worker in pool.workers.values() if not worker.remote]
+    existing_ports = [worker.port for worker in local_workers]
+    existing_camoufox_ports = [worker.camoufox_port for worker in local_workers]
     port = max(existing_ports, default=3000) + 1
     camoufox_port = max(existing_camoufox_ports, default=40221) + 1
 
@@ -72,7 +87,7 @@ async def remove_worker(worker_id: str):
 
     worker = pool.workers[worker_id]
     process = worker.process
-    if worker.status == "running":
+    if worker.status == "running" and not worker.remote:
         success, message = await pool.stop_worker(worker_id)
         if not success:
             raise HTTPException(status_code=500, detail=message)
@@ -93,6 +108,49 @@ async def list_workers():
     return worker_pool.get_status()
 
 
+def _sse_message(payload: Dict[str, Any]) -> str:
+    event = "snapshot" if payload.get("type") == "worker_snapshot" else "worker"
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@router.get("/events")
+async def worker_events(request: Request):
+    """SSE 推送 Worker 注册表: 连接时先发完整快照，之后推送 Worker 上线/下线/限流等增量事件。
+
+    空闲时按 WORKER_EVENT_SNAPSHOT_INTERVAL 周期补发快照，同步健康检查更新的
+    队列长度和当前模型，也作为心跳供订阅方检测断线。
+    """
+    pool = _require_worker_pool()
+    if not pool.workers:
+        pool.init_from_config()
+    queue = manager.subscribe_worker_events()
+
+    def snapshot() -> Dict[str, Any]:
+        return {"type": "worker_snapshot", "workers": pool.get_status()}
+
+    async def event_stream():
+        try:
+            yield _sse_message(snapshot())
+            last_snapshot = time.monotonic()
+            while not await request.is_disconnected():
+                timeout = WORKER_EVENT_SNAPSHOT_INTERVAL - (time.monotonic() - last_snapshot)
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    payload = snapshot()
+                if payload.get("type") == "worker_snapshot":
+                    last_snapshot = time.monotonic()
+                yield _sse_message(payload)
+        finally:
+            manager.unsubscribe_worker_events(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/init")
 async def init_workers():
     pool = _require_worker_pool()
@@ -118,7 +176,7 @@ async def get_next_available_worker(model: str = ""):
     worker = pool.get_worker_for_model(model)
     if worker:
         worker.request_count += 1
-        return {"port": worker.port, "worker_id": worker.id}
+        return {"host": worker.host, "port": worker.port, "worker_id": worker.id}
 
     all_limited = all(
         worker.is_model_limited(model)
@@ -133,6 +191,65 @@ async def get_next_available_worker(model: str = ""):
     return {"error": "no_workers", "message": "No available workers"}
 
 
+def _require_registry_secret(request: Request) -> None:
+    if not WORKER_REGISTRY_SECRET:
+        raise HTTPException(status_code=403, detail="未设置 WORKER_REGISTRY_SECRET，不接受远程 Worker 注册")
+    secret = request.headers.get("X-Worker-Secret", "")
+    if not hmac.compare_digest(secret.encode(), WORKER_REGISTRY_SECRET.encode()):
+        raise HTTPException(status_code=401, detail="Invalid worker secret")
+
+
+@router.post("/register")
+async def register_remote_worker(
+    request: Request,
+    worker_id: str = Body(..., embed=True),
+    port: int = Body(..., embed=True),
+    host: str = Body("", embed=True),
+    profile: str = Body("", embed=True),
+):
+    """其他主机上的 Worker 注册自身地址；host 为空时使用连接来源地址。重复注册会更新地址并重新上线"""
+    _require_registry_secret(request)
+    pool = _require_worker_pool()
+    if not WORKER_ID_PATTERN.match(worker_id):
+        raise HTTPException(status_code=422, detail="Invalid worker id")
+    if not 0 < port < 65536:
+        raise HTTPException(status_code=422, detail="Invalid port")
+    host = host or (request.client.host if request.client else "")
+    if not host:
+        raise HTTPException(status_code=422, detail="Unable to determine worker host")
+    try:
+        worker = pool.register_remote_worker(worker_id, host, port, profile)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    await manager.broadcast_worker_snapshot()
+    return {"success": True, "worker": worker.to_dict()}
+
+
+@router.post("/{worker_id}/heartbeat")
+async def remote_worker_heartbeat(
+    worker_id: str,
+    request: Request,
+    queue_length: Optional[int] = Body(None, embed=True),
+    current_model: Optional[str] = Body(None, embed=True),
+):
+    """远程 Worker 心跳；返回 404 表示 Manager 不认识该 Worker (例如重启过)，Worker 应重新注册"""
+    _require_registry_secret(request)
+    pool = _require_worker_pool()
+    if not pool.record_heartbeat(worker_id, queue_length, current_model):
+        raise HTTPException(status_code=404, detail="Worker not registered")
+    return {"success": True}
+
+
+@router.post("/{worker_id}/deregister")
+async def deregister_remote_worker(worker_id: str, request: Request):
+    _require_registry_secret(request)
+    pool = _require_worker_pool()
+    if not pool.deregister_remote_worker(worker_id):
+        raise HTTPException(status_code=404, detail="Worker not registered")
+    await manager.broadcast_worker_snapshot()
+    return {"success": True}
+
+
 @router.post("/{worker_id}/rate-limit")
 async def mark_worker_rate_limited(worker_id: str, model: str = Body(..., embed=True)):
     pool = _require_worker_pool()
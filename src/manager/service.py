@@ -37,6 +37,8 @@ CONFIG_FILE_PATH = os.path.join(DATA_DIR, "gui_config.json")
 LAUNCH_CAMOUFOX_PY = os.path.join(SOURCE_DIR, "launch_camoufox.py")
 GATEWAY_ENTRYPOINT = os.path.join(SOURCE_DIR, "gateway.py")
 PYTHON_EXECUTABLE = sys.executable
+WORKER_EVENT_QUEUE_SIZE = 256
+WORKER_EVENT_SNAPSHOT_INTERVAL = 5
 
 
 class ServiceManager:
@@ -44,6 +46,7 @@ class ServiceManager:
         self.process: Optional[subprocess.Popen] = None
         self.log_queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
         self.active_connections: List[WebSocket] = []
+        self.worker_event_subscribers: List[asyncio.Queue] = []
         self.output_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
         self.service_status = "stopped"
@@ -74,6 +77,7 @@ class ServiceManager:
             "helper_endpoint": "",
             "launch_mode": "headless",
             "script_injection_enabled": False,
+            "lean_rendering_enabled": False,
             "worker_mode_enabled": False,
             "worker_startup_interval": 5,
             "log_enabled": True,
@@ -180,6 +184,28 @@ class ServiceManager:
             if connection in self.active_connections:
                 self.active_connections.remove(connection)
 
+    def subscribe_worker_events(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WORKER_EVENT_QUEUE_SIZE)
+        self.worker_event_subscribers.append(queue)
+        return queue
+
+    def unsubscribe_worker_events(self, queue: asyncio.Queue) -> None:
+        if queue in self.worker_event_subscribers:
+            self.worker_event_subscribers.remove(queue)
+
+    def _publish_worker_event(self, payload: Dict[str, Any]) -> None:
+        for queue in list(self.worker_event_subscribers):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # 订阅方消费过慢: 丢弃积压的增量，改为推送一次完整快照
+                while not queue.empty():
+                    queue.get_nowait()
+                if worker_pool is not None:
+                    queue.put_nowait(
+                        {"type": "worker_snapshot", "workers": worker_pool.get_status()}
+                    )
+
     def refresh_worker_service_info(self) -> None:
         if not self.is_worker_mode or not WORKER_POOL_AVAILABLE or worker_pool is None:
             return
@@ -197,6 +223,7 @@ class ServiceManager:
 
     async def broadcast_worker_event(self, event: Dict[str, Any]) -> None:
         self.refresh_worker_service_info()
+        self._publish_worker_event(event)
         await self._broadcast_message(event)
         await self.broadcast_status()
 
@@ -204,9 +231,9 @@ class ServiceManager:
         if not WORKER_POOL_AVAILABLE or worker_pool is None:
             return
         self.refresh_worker_service_info()
-        await self._broadcast_message(
-            {"type": "worker_snapshot", "workers": worker_pool.get_status()}
-        )
+        snapshot = {"type": "worker_snapshot", "workers": worker_pool.get_status()}
+        self._publish_worker_event(snapshot)
+        await self._broadcast_message(snapshot)
 
     def handle_worker_status_event(self, event: Dict[str, Any]) -> None:
         if not self.loop or self.loop.is_closed():
@@ -337,6 +364,8 @@ class ServiceManager:
         env["ENABLE_SCRIPT_INJECTION"] = (
             "true" if config.get("script_injection_enabled", False) else "false"
         )
+        if config.get("lean_rendering_enabled", False):
+            env["LEAN_RENDERING_ENABLED"] = "true"
 
         creationflags = (
             subprocess.CREATE_NEW_PROCESS_GROUP if platform.system() == "Windows" else 0
@@ -474,7 +503,7 @@ class ServiceManager:
                 gateway_cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                env=env,
+                env={**env, "GATEWAY_DISPATCH_KEY": worker_pool.dispatch_key},
                 cwd=SOURCE_DIR,
                 creationflags=creationflags,
             )
@@ -33,8 +33,14 @@ excluded_model_ids: Set[str] = set()
 request_queue: Optional[Queue] = None
 processing_lock: Optional[Lock] = None
 worker_task: Optional[Task] = None
+dispatch_task: Optional[Task] = None
+registry_task: Optional[Task] = None
 page_params_cache: Dict[str, Any] = {}
 params_cache_lock: Optional[Lock] = None
+conversation_state: Dict[str, Any] = {}
+generate_content_template: Optional[Dict[str, Any]] = None
+generate_content_template_pending: Optional[Dict[str, Any]] = None
+last_direct_rpc_req_id: Optional[str] = None
 logger = logging.getLogger('AIStudioProxyServer')
 log_ws_manager: Optional[WebSocketConnectionManager] = None
 app = create_app()
@@ -55,6 +55,8 @@ const locales = {
             proxyAddress: '代理地址',
             scriptInjection: '模型注入脚本',
             scriptInjectionDesc: '启用后可添加 AI Studio 未列出的模型（已被弃用）',
+            leanRendering: '精简渲染模式',
+            leanRenderingDesc: '禁用动画、缩小视口并折叠历史对话渲染，降低无头 Worker 的 CPU 占用',
             logEnabled: '启用日志',
             logEnabledDesc: '禁用日志可提升性能（需重启服务生效）',
             workerStartupInterval: 'Worker 启动间隔（秒）',
@@ -209,6 +211,8 @@ const locales = {
             proxyAddress: '代理位址',
             scriptInjection: '模型注入腳本',
             scriptInjectionDesc: '啟用後可添加 AI Studio 未列出的模型（已被棄用）',
+            leanRendering: '精簡渲染模式',
+            leanRenderingDesc: '停用動畫、縮小視窗並摺疊歷史對話渲染，降低無頭 Worker 的 CPU 佔用',
             logEnabled: '啟用日誌',
             logEnabledDesc: '禁用日誌可提升性能（需重啟服務生效）',
             workerStartupInterval: 'Worker 啟動間隔（秒）',
@@ -363,6 +367,8 @@ const locales = {
             proxyAddress: 'Proxy Address',
             scriptInjection: 'Model Injection Script',
             scriptInjectionDesc: 'Enable to add unlisted models in AI Studio (Deprecated)',
+            leanRendering: 'Lean Rendering',
+            leanRenderingDesc: 'Disable animations, shrink the viewport and collapse rendered history to cut CPU usage of headless workers',
             logEnabled: 'Enable Logging',
             logEnabledDesc: 'Disabling logs improves performance (requires service restart)',
             workerStartupInterval: 'Worker Startup Interval (seconds)',
@@ -517,6 +523,8 @@ const locales = {
             proxyAddress: 'プロキシアドレス',
             scriptInjection: 'モデル注入スクリプト',
             scriptInjectionDesc: '有効にするとAI Studioに未掲載のモデルを追加できます（非推奨）',
+            leanRendering: '軽量レンダリング',
+            leanRenderingDesc: 'アニメーション無効化・ビューポート縮小・履歴の描画折りたたみでヘッドレス Worker の CPU 使用量を削減',
             logEnabled: 'ログを有効にする',
             logEnabledDesc: 'ログを無効にするとパフォーマンスが向上します（サービス再起動が必要）',
             workerStartupInterval: 'Worker起動間隔（秒）',
@@ -671,6 +679,8 @@ const locales = {
             proxyAddress: '프록시 주소',
             scriptInjection: '모델 주입 스크립트',
             scriptInjectionDesc: '활성화하면 AI Studio에 나열되지 않은 모델 추가 가능 (더 이상 사용되지 않음)',
+            leanRendering: '경량 렌더링',
+            leanRenderingDesc: '애니메이션 비활성화, 뷰포트 축소, 대화 기록 렌더링 접기로 헤드리스 Worker의 CPU 사용량 절감',
             logEnabled: '로깅 활성화',
             logEnabledDesc: '로그 비활성화 시 성능 향상 (서비스 재시작 필요)',
             workerStartupInterval: 'Worker 시작 간격 (초)',
@@ -825,6 +835,8 @@ const locales = {
             proxyAddress: 'Adresse Proxy',
             scriptInjection: 'Script d\'injection de modèle',
             scriptInjectionDesc: 'Activer pour ajouter des modèles non listés dans AI Studio (Obsolète)',
+            leanRendering: 'Rendu allégé',
+            leanRenderingDesc: 'Désactive les animations, réduit la fenêtre et replie l\'historique affiché pour réduire le CPU des workers headless',
             logEnabled: 'Activer les journaux',
             logEnabledDesc: 'Désactiver améliore les performances (redémarrage requis)',
             save: 'Enregistrer'
@@ -977,6 +989,8 @@ const locales = {
             proxyAddress: 'Proxy Adresse',
             scriptInjection: 'Modell-Injektionsskript',
             scriptInjectionDesc: 'Aktivieren, um nicht aufgelistete Modelle in AI Studio hinzuzufügen (Veraltet)',
+            leanRendering: 'Schlankes Rendering',
+            leanRenderingDesc: 'Deaktiviert Animationen, verkleinert den Viewport und klappt den gerenderten Verlauf ein, um die CPU-Last headless Worker zu senken',
             logEnabled: 'Protokollierung aktivieren',
             logEnabledDesc: 'Deaktivieren verbessert die Leistung (Neustart erforderlich)',
             save: 'Speichern'
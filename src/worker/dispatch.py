@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Collection, Deque, Dict, FrozenSet, Mapping, Optional
+
+# Worker 长轮询时即使没有新任务提交，也按该间隔重新检查可领取的任务 (熔断恢复、限流解除等)
+DISPATCH_RECHECK_INTERVAL = 1.0
+DISPATCH_SECRET_HEADER = "X-Worker-Secret"
+KEY_DIGEST_HEADER = "X-Dispatch-Key-Digest"
+# 交给 Worker 的请求头只保留处理请求用到的几项；客户端的 API 密钥不离开网关，只传摘要
+DISPATCH_FORWARD_HEADERS = frozenset({"accept", "cache-control", "idempotency-key", "last-event-id", "x-request-timeout"})
+
+_job_ids = itertools.count(1)
+
+
+def dispatch_secret(key: str, worker_id: str) -> str:
+    """由分发主密钥按 Worker 派生的密钥: 每个 Worker 只能以自己的身份领取和上传任务"""
+    return hmac.new(key.encode(), worker_id.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_dispatch_secret(key: str, worker_id: str, secret: str) -> bool:
+    if not key or not worker_id or not secret:
+        return False
+    return hmac.compare_digest(secret.encode(), dispatch_secret(key, worker_id).encode())
+
+
+def key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def dispatch_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """拉取模式交给 Worker 的请求头: 白名单中的头原样保留，API 密钥换成摘要"""
+    forwarded = {key: value for key, value in headers.items() if key.lower() in DISPATCH_FORWARD_HEADERS}
+    lowered = {key.lower(): value for key, value in headers.items()}
+    api_key = ""
+    authorization = lowered.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        api_key = authorization[7:]
+    api_key = api_key or lowered.get("x-api-key", "")
+    if api_key:
+        forwarded[KEY_DIGEST_HEADER] = key_digest(api_key)
+    return forwarded
+
+
+def restore_api_key(headers: Dict[str, str], local_keys: Collection[str]) -> Dict[str, str]:
+    """Worker 侧: 按摘要找回本机配置的同一个密钥，用它向本机接口发起请求；找不到时不带密钥 (由本机鉴权拒绝)"""
+    restored = {key: value for key, value in headers.items() if key != KEY_DIGEST_HEADER}
+    digest = headers.get(KEY_DIGEST_HEADER)
+    if digest:
+        for api_key in local_keys:
+            if hmac.compare_digest(key_digest(api_key), digest):
+                restored["Authorization"] = f"Bearer {api_key}"
+                break
+    return restored
+
+
+class DispatchJob:
+    """中心队列中的一次转发尝试。
+
+    Worker 领取后把响应以流式请求体上传回网关，网关据此向客户端转发；
+    失败重试时创建新的 DispatchJob，并排除已失败的 Worker。
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        headers: Dict[str, str],
+        model: str = "",
+        stream: bool = False,
+        excluded: FrozenSet[str] = frozenset(),
+    ):
+        self.id = f"job-{next(_job_ids)}"
+        self.body = body
+        self.headers = headers
+        self.model = model
+        self.stream = stream
+        self.excluded = excluded
+        self.created = time.monotonic()
+        self.worker_id: Optional[str] = None
+        self.assigned_at: Optional[float] = None
+        self.response: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.finished = asyncio.Event()
+        self.delivered = False
+
+    def attach(self, status: int, content_type: str, chunks: AsyncIterator[bytes]) -> bool:
+        """Worker 开始上传响应；任务已被放弃 (超时、客户端断开) 时返回 False"""
+        if self.response.done():
+            return False
+        self.response.set_result((status, content_type, chunks))
+        return True
+
+    def finish(self, delivered: bool) -> None:
+        """网关转发结束 (或放弃)，让仍在上传的 Worker 请求返回"""
+        self.delivered = delivered
+        if not self.response.done():
+            self.response.cancel()
+        self.finished.set()
+
+
+class DispatchQueue:
+    """网关中心任务队列: 空闲的 Worker 长轮询领取任务，按提交顺序取第一个该 Worker 可以处理的任务"""
+
+    def __init__(self):
+        self._jobs: Deque[DispatchJob] = deque()
+        self._assigned: Dict[str, DispatchJob] = {}
+        self._changed = asyncio.Condition()
+        self.waiting_workers: Dict[str, float] = {}
+        self.dispatched = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    async def submit(self, job: DispatchJob, front: bool = False) -> None:
+        # 重试的任务放在队首，避免因失败而重新排到所有新请求之后
+        if front:
+            self._jobs.appendleft(job)
+        else:
+            self._jobs.append(job)
+        async with self._changed:
+            self._changed.notify_all()
+
+    def withdraw(self, job: DispatchJob) -> None:
+        """撤回尚未领取的任务，或放弃已领取任务的归属"""
+        try:
+            self._jobs.remove(job)
+        except ValueError:
+            pass
+        self._assigned.pop(job.id, None)
+
+    def assigned(self, job_id: str, worker_id: str) -> Optional[DispatchJob]:
+        job = self._assigned.get(job_id)
+        return job if job is not None and job.worker_id == worker_id else None
+
+    def _take(self, worker_id: str, eligible: Callable[[DispatchJob], bool]) -> Optional[DispatchJob]:
+        for job in self._jobs:
+            if worker_id not in job.excluded and eligible(job):
+                self._jobs.remove(job)
+                job.worker_id, job.assigned_at = worker_id, time.monotonic()
+                self._assigned[job.id] = job
+                self.dispatched += 1
+                return job
+        return None
+
+    async def next_job(
+        self, worker_id: str, eligible: Callable[[DispatchJob], bool], timeout: float
+    ) -> Optional[DispatchJob]:
+        deadline = time.monotonic() + timeout
+        self.waiting_workers[worker_id] = time.time()
+        try:
+            while True:
+                job = self._take(worker_id, eligible)
+                remaining = deadline - time.monotonic()
+                if job is not None or remaining <= 0:
+                    return job
+                async with self._changed:
+                    try:
+                        await asyncio.wait_for(
+                            self._changed.wait(), min(remaining, DISPATCH_RECHECK_INTERVAL)
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self.waiting_workers.pop(worker_id, None)
+
+    def to_dict(self) -> dict:
+        now = time.monotonic()
+        return {
+            "queued": len(self._jobs),
+            "oldest_wait_s": round(now - self._jobs[0].created, 1) if self._jobs else None,
+            "assigned": {job.id: job.worker_id for job in self._assigned.values()},
+            "idle_workers": sorted(self.waiting_workers),
+            "dispatched": self.dispatched,
+        }
+
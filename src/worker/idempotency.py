@@ -0,0 +1,379 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 支持 Idempotency-Key 的路由 (前缀匹配): 聊天与各类媒体生成
+IDEMPOTENT_PATHS = (
+    "/v1/chat/completions",
+    "/generate-speech",
+    "/generate-image",
+    "/generate-video",
+    "/nano/generate",
+    "/v1beta/models/",
+)
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+_END = None
+_DISCONNECTED = object()
+
+
+class IdempotencyConflict(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Execution:
+    """一次带幂等键的执行: 记录发出的 ASGI 响应消息，供执行中途接入的重复请求追赶，完成后供重放。
+
+    只要还有客户端 (原始请求或接入的重复请求) 在等待，执行就不会因原始连接断开而中止；
+    所有客户端都离开后再等待 detach_grace 秒，期间的重试仍可接上。
+    """
+
+    def __init__(self, fingerprint: str, max_bytes: int, detach_grace: float):
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.detach_grace = detach_grace
+        self.messages: List[dict] = []
+        self.size = 0
+        self.truncated = False
+        self.status: Optional[int] = None
+        self.done = False
+        self.replayable = False
+        self.finished_at = 0.0
+        self.clients = 1
+        self.abandoned = asyncio.Event()
+        self._subscribers: List[asyncio.Queue] = []
+        self._grace: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        if not self.truncated:
+            self.size += len(message.get("body", b""))
+            if self.size > self.max_bytes:
+                # 超出保存上限: 已接入的客户端继续实时接收，之后的重复请求无法再追赶
+                self.truncated = True
+                self.messages = []
+            else:
+                self.messages.append(message)
+        for queue in self._subscribers:
+            queue.put_nowait(message)
+
+    def close(self, replayable: bool) -> None:
+        self.done = True
+        self.replayable = replayable and not self.truncated
+        self.finished_at = time.monotonic()
+        self._cancel_grace()
+        for queue in self._subscribers:
+            queue.put_nowait(_END)
+        self._subscribers = []
+        if not self.replayable:
+            self.messages = []
+
+    def subscribe(self) -> Optional[Tuple[List[dict], Optional[asyncio.Queue]]]:
+        """返回已记录的消息和后续消息的队列 (执行已结束时为 None)；记录已被截断时返回 None"""
+        if self.truncated or (self.done and not self.replayable):
+            return None
+        if self.done:
+            return list(self.messages), None
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        self.attach()
+        return list(self.messages), queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+            self.detach()
+
+    def attach(self) -> None:
+        self.clients += 1
+        self._cancel_grace()
+
+    def detach(self) -> None:
+        self.clients -= 1
+        if self.clients > 0 or self.done:
+            return
+        if self.detach_grace <= 0:
+            self.abandoned.set()
+        else:
+            self._grace = asyncio.get_running_loop().call_later(self.detach_grace, self.abandoned.set)
+
+    def _cancel_grace(self) -> None:
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+
+
+class IdempotencyStore:
+    """按 (调用方, 路径, 幂等键) 索引的执行记录；已完成的响应保留 ttl 秒，总大小超过 max_bytes 时淘汰最旧的记录"""
+
+    def __init__(self, ttl: float = 3600, max_bytes: int = 256 * 1024 * 1024, detach_grace: float = 30):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.detach_grace = detach_grace
+        self._entries: "OrderedDict[tuple, Execution]" = OrderedDict()
+        self.stored_bytes = 0
+        self.stats: Dict[str, int] = {"executed": 0, "attached": 0, "replayed": 0, "conflicts": 0, "evicted": 0}
+
+    def begin(self, key: tuple, fingerprint: str) -> Tuple[Execution, bool]:
+        """返回该键的执行记录；第二个值为 True 表示调用方需要执行请求"""
+        self._evict(time.monotonic())
+        execution = self._entries.get(key)
+        if execution is not None:
+            if execution.fingerprint != fingerprint:
+                self.stats["conflicts"] += 1
+                raise IdempotencyConflict(422, "Idempotency-Key 已用于内容不同的请求")
+            self.stats["replayed" if execution.done else "attached"] += 1
+            return execution, False
+        execution = Execution(fingerprint, self.max_bytes, self.detach_grace)
+        self._entries[key] = execution
+        self.stats["executed"] += 1
+        return execution, True
+
+    def get(self, key: tuple) -> Optional[Execution]:
+        """查找已有的执行记录 (不创建)，用于断线续传"""
+        self._evict(time.monotonic())
+        execution = self._entries.get(key)
+        if execution is not None:
+            self.stats["replayed" if execution.done else "attached"] += 1
+        return execution
+
+    def finish(self, key: tuple, execution: Execution, completed: bool) -> None:
+        """执行结束: 完整且可安全重放的响应保存下来，其余情况释放该键，让重试重新执行"""
+        replayable = completed and execution.status is not None and self.replayable_status(execution.status)
+        execution.close(replayable)
+        if self._entries.get(key) is not execution:
+            return
+        if not execution.replayable:
+            del self._entries[key]
+            return
+        self._entries.move_to_end(key)
+        self.stored_bytes += execution.size
+        self._evict(time.monotonic())
+
+    @staticmethod
+    def replayable_status(status: int) -> bool:
+        # 服务端错误、限流和客户端取消都是暂时性的，重试时应重新执行
+        return status < 500 and status not in (408, 409, 429, 499)
+
+    def _evict(self, now: float) -> None:
+        for key in list(self._entries):
+            execution = self._entries[key]
+            if not execution.done:
+                continue
+            if self.stored_bytes <= self.max_bytes and now - execution.finished_at < self.ttl:
+                continue
+            del self._entries[key]
+            self.stored_bytes -= execution.size
+            self.stats["evicted"] += 1
+
+    def discard(self, key: tuple) -> None:
+        """丢弃已完成的记录 (执行中的记录保留)，之后同一个键重新执行"""
+        execution = self._entries.get(key)
+        if execution is not None and execution.done:
+            del self._entries[key]
+            self.stored_bytes -= execution.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_dict(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": sum(1 for execution in self._entries.values() if not execution.done),
+            "stored_mb": round(self.stored_bytes / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "ttl_s": self.ttl,
+            **self.stats,
+        }
+
+
+async def send_error(send, status: int, message: str, headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    body = json.dumps(
+        {"error": {"message": message, "type": "idempotency_error", "code": status}}, ensure_ascii=False
+    ).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *(headers or [])],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive) -> Optional[bytes]:
+    """读取完整请求体；客户端在此期间断开时返回 None"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def replay_body(body: bytes, receive):
+    """已读取请求体后交给下游应用的 receive: 先返回完整请求体，之后透传原始消息 (断开通知等)"""
+    delivered = False
+
+    async def replay():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+def caller_id(headers: Dict[bytes, bytes]) -> str:
+    return hashlib.sha256(
+        headers.get(b"authorization", b"") + b"\0" + headers.get(b"x-api-key", b"")
+    ).hexdigest()
+
+
+async def run_execution(
+    app, scope, receive, send, body: bytes, execution: Execution,
+    transform: Optional[Callable[[dict], List[dict]]] = None,
+) -> bool:
+    """执行请求并把响应消息记录到 execution；返回响应是否完整 (应用正常返回且未被告知客户端断开)。
+
+    transform 可把应用发出的一条消息改写为若干条 (例如按 SSE 事件拆分)，记录和发送的都是改写后的消息。
+    """
+    body_delivered = False
+    client_gone = False
+
+    def leave() -> None:
+        nonlocal client_gone
+        if not client_gone:
+            client_gone = True
+            execution.detach()
+
+    async def app_receive():
+        nonlocal body_delivered
+        if not body_delivered:
+            body_delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # 原始客户端断开不会传递给应用，直到所有等待该结果的客户端都已离开
+        await execution.abandoned.wait()
+        return {"type": "http.disconnect"}
+
+    async def app_send(message):
+        for out in transform(message) if transform else (message,):
+            execution.publish(out)
+            if client_gone:
+                continue
+            try:
+                await send(out)
+            except OSError:
+                leave()
+
+    async def watch_client():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        leave()
+
+    watcher = asyncio.create_task(watch_client())
+    try:
+        await app(scope, app_receive, app_send)
+    finally:
+        watcher.cancel()
+    # 应用已被告知客户端断开时，即使正常返回，响应也可能不完整
+    return not execution.abandoned.is_set()
+
+
+async def follow_execution(
+    receive, send, subscription: Tuple[List[dict], Optional[asyncio.Queue]], execution: Execution,
+    skip: int = 0, extra_headers: Tuple[Tuple[bytes, bytes], ...] = (),
+) -> None:
+    """向接入的客户端发送已记录的消息并实时跟随后续消息；skip 为响应头之后跳过的消息数"""
+    backlog, queue = subscription
+    watcher = None
+    if queue is not None:
+
+        async def watch_client():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            queue.put_nowait(_DISCONNECTED)
+
+        watcher = asyncio.create_task(watch_client())
+
+    async def forward(message):
+        nonlocal skip
+        if message["type"] == "http.response.start":
+            await send({**message, "headers": [*message.get("headers", []), *extra_headers]})
+        elif skip > 0 and message.get("more_body"):
+            skip -= 1
+        else:
+            await send(message)
+
+    try:
+        for message in backlog:
+            await forward(message)
+        while queue is not None:
+            message = await queue.get()
+            if message is _END or message is _DISCONNECTED:
+                break
+            await forward(message)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+            execution.unsubscribe(queue)
+
+
+class IdempotencyMiddleware:
+    """ASGI 中间件: 带 Idempotency-Key 头的 POST 请求只执行一次。
+
+    执行中的重复请求接入原执行的响应流 (从头追赶后实时接收)，已完成的请求直接重放保存的响应，
+    同一个键搭配不同的请求体返回 422。幂等键按调用方凭据 (Authorization / X-API-Key) 和路径隔离。
+    """
+
+    def __init__(self, app, store: IdempotencyStore, paths: Tuple[str, ...] = IDEMPOTENT_PATHS):
+        self.app = app
+        self.store = store
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        raw_key = headers.get(b"idempotency-key")
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await send_error(send, 400, f"Idempotency-Key 长度必须在 1 到 {MAX_KEY_LENGTH} 之间")
+            return
+
+        body = await read_body(receive)
+        if body is None:
+            return
+        store_key = (caller_id(headers), scope["path"], key)
+        try:
+            execution, created = self.store.begin(store_key, hashlib.sha256(body).hexdigest())
+        except IdempotencyConflict as exc:
+            await send_error(send, exc.status, exc.message)
+            return
+        if created:
+            completed = False
+            try:
+                completed = await run_execution(self.app, scope, receive, send, body, execution)
+            finally:
+                self.store.finish(store_key, execution, completed)
+            return
+        subscription = execution.subscribe()
+        if subscription is None:
+            # 响应过大未能保存，或原执行已失败 (该键已释放，稍后重试会重新执行)
+            await send_error(
+                send, 409, "该 Idempotency-Key 的请求仍在处理或结果不可重放，请稍后重试", [(b"retry-after", b"1")]
+            )
+            return
+        await follow_execution(receive, send, subscription, execution, extra_headers=(REPLAYED_HEADER,))
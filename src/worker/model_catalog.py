@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+
+def merge_model_lists(model_lists: Iterable[List[dict]]) -> List[dict]:
+    """合并各 Worker 的模型列表: 按 id 去重，保留首次出现的顺序"""
+    merged, seen = [], set()
+    for models in model_lists:
+        for model in models:
+            model_id = model.get("id") if isinstance(model, dict) else None
+            if model_id and model_id not in seen:
+                seen.add(model_id)
+                merged.append(model)
+    return merged
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ModelCatalog:
+    """网关侧的全局模型目录缓存。
+
+    过期后先返回旧数据并在后台刷新 (stale-while-revalidate)，只有从未成功获取过时请求才需要等待；
+    并发的刷新合并为同一个任务 (singleflight)，请求被取消不会中断共享的刷新。
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[dict]]], ttl: float = 300):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.body: Optional[bytes] = None
+        self.etag: Optional[str] = None
+        self.count = 0
+        self.fetched_at = 0.0
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.body is not None and (time.monotonic() if now is None else now) - self.fetched_at < self.ttl
+
+    async def get(self) -> Tuple[bytes, str]:
+        if self.body is None:
+            await self.refresh()
+        elif not self.is_fresh():
+            self.refresh_in_background()
+        return self.body, self.etag
+
+    def refresh_in_background(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._consume_result)
+        return self._refresh_task
+
+    async def refresh(self) -> None:
+        """刷新并等待结果；失败时抛出异常 (已缓存的数据保持不变)"""
+        await asyncio.shield(self.refresh_in_background())
+
+    def invalidate(self) -> None:
+        self.fetched_at = 0.0
+
+    async def _refresh(self) -> None:
+        self.refreshes += 1
+        try:
+            models = await self.fetch()
+        except Exception as exc:
+            self.failures += 1
+            self.last_error = str(exc)
+            raise
+        body = json.dumps({"object": "list", "data": models}, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.body, self.count = body, len(models)
+        self.fetched_at = time.monotonic()
+        self.last_error = None
+
+    @staticmethod
+    def _consume_result(task: asyncio.Task) -> None:
+        # 后台刷新的异常已记录在 last_error 中，避免 "Task exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    def to_dict(self) -> dict:
+        return {
+            "models": self.count,
+            "etag": self.etag,
+            "age_s": round(time.monotonic() - self.fetched_at, 1) if self.body is not None else None,
+            "ttl_s": self.ttl,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import subprocess
 import time
 
@@ -20,6 +20,19 @@ class Worker:
     last_health_check: Optional[float] = None
     last_error: Optional[str] = None
     restart_count: int = 0
+    current_model: Optional[str] = None
+    queue_length: int = 0
+    near_limit_models: List[str] = field(default_factory=list)
+    socket_path: Optional[str] = None
+    # 远程 Worker 运行在其他主机上，由自身注册并发送心跳，本机不管理其进程
+    host: str = "127.0.0.1"
+    remote: bool = False
+    last_heartbeat: Optional[float] = None
+
+    @property
+    def base_url(self) -> str:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"http://{host}:{self.port}"
 
     def is_model_limited(self, model_id: str) -> bool:
         if model_id not in self.rate_limited_models:
@@ -46,6 +59,10 @@ class Worker:
             "profile": self.profile_name,
             "port": self.port,
             "camoufox_port": self.camoufox_port,
+            "socket": self.socket_path,
+            "host": self.host,
+            "remote": self.remote,
+            "last_heartbeat": self.last_heartbeat,
             "status": self.status,
             "display_status": self.display_status(),
             "request_count": self.request_count,
@@ -54,6 +71,9 @@ class Worker:
             "last_health_check": self.last_health_check,
             "last_error": self.last_error,
             "restart_count": self.restart_count,
+            "current_model": self.current_model,
+            "queue_length": self.queue_length,
+            "near_limit_models": list(self.near_limit_models),
             "rate_limited_models": {
                 model: recovery_time
                 for model, recovery_time in self.rate_limited_models.items()
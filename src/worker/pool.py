@@ -3,6 +3,7 @@ import json
 import logging
 import os
 import platform
+import secrets
 import subprocess
 import sys
 import time
@@ -11,19 +12,58 @@ from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
 import aiohttp
 
 try:
-    from ..config.settings import DATA_DIR, PROJECT_ROOT, SAVED_AUTH_DIR
+    from ..config.settings import (
+        DATA_DIR,
+        GATEWAY_DISPATCH_MODE,
+        GATEWAY_WORKER_TRANSPORT,
+        PROJECT_ROOT,
+        QUOTA_PROBE_ENABLED,
+        QUOTA_PROBE_INITIAL_SECONDS,
+        QUOTA_PROBE_MAX_SECONDS,
+        QUOTA_STEER_PERCENT,
+        SAVED_AUTH_DIR,
+        STREAM_RESUME_ENABLED,
+        WORKER_HEARTBEAT_TIMEOUT,
+        WORKER_REGISTRY_SECRET,
+        WORKER_SOCKET_DIR,
+    )
     from ..config.timeouts import RECOVERY_HOURS, KEEPALIVE_TIMEOUT
 except ImportError:
-    from config.settings import DATA_DIR, PROJECT_ROOT, SAVED_AUTH_DIR
+    from config.settings import (
+        DATA_DIR,
+        GATEWAY_DISPATCH_MODE,
+        GATEWAY_WORKER_TRANSPORT,
+        PROJECT_ROOT,
+        QUOTA_PROBE_ENABLED,
+        QUOTA_PROBE_INITIAL_SECONDS,
+        QUOTA_PROBE_MAX_SECONDS,
+        QUOTA_STEER_PERCENT,
+        SAVED_AUTH_DIR,
+        STREAM_RESUME_ENABLED,
+        WORKER_HEARTBEAT_TIMEOUT,
+        WORKER_REGISTRY_SECRET,
+        WORKER_SOCKET_DIR,
+    )
     from config.timeouts import RECOVERY_HOURS, KEEPALIVE_TIMEOUT
 
+from .dispatch import dispatch_secret
 from .models import Worker
+from .quota import QuotaTracker
+from .rate_limit import is_rate_limited_response
+from .routing import normalize_model_id, select_worker
+from .transport import worker_socket_path
 
 logger = logging.getLogger("WorkerPool")
 
 SOURCE_DIR = os.path.join(PROJECT_ROOT, "src")
 LAUNCH_CAMOUFOX_PY = os.path.join(SOURCE_DIR, "launch_camoufox.py")
 WORKERS_CONFIG_PATH = os.path.join(DATA_DIR, "workers.json")
+# 远程 Worker 超时未发送心跳: 不计失败次数，直接标记为崩溃
+HEARTBEAT_TIMEOUT_ERROR = "heartbeat timeout"
+# 恢复探测只发送一个极小的请求，超过该时长视为仍未恢复，避免长时间占用 Worker 页面
+QUOTA_PROBE_TIMEOUT_SECONDS = 30
+# 本机 Worker 通过 api.auth_utils 加载的 API 密钥文件；配置了密钥时探测请求需要携带其中一个
+API_KEY_FILE = os.path.join(DATA_DIR, "key.txt")
 
 
 class WorkerPool:
@@ -40,7 +80,15 @@ class WorkerPool:
         self.health_check_failure_threshold = 3
         self.auto_restart_crashed = True
         self.startup_delay_seconds = 3
+        self.heartbeat_timeout = WORKER_HEARTBEAT_TIMEOUT
         self._restart_tasks: Dict[str, asyncio.Task] = {}
+        # 拉取模式分发端点的主密钥，Manager 启动网关时传入；远程 Worker 需与之一致，因此设置了共享密钥时直接使用
+        self.dispatch_key = WORKER_REGISTRY_SECRET or secrets.token_hex(32)
+        self.quota = QuotaTracker(
+            steer_ratio=QUOTA_STEER_PERCENT / 100,
+            probe_initial=QUOTA_PROBE_INITIAL_SECONDS,
+            probe_max=QUOTA_PROBE_MAX_SECONDS,
+        )
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
@@ -84,18 +132,22 @@ class WorkerPool:
                 logger.warning(f"加载 Worker 配置失败: {exc}")
         return {"workers": [], "settings": {"recovery_hours": RECOVERY_HOURS}}
 
+    def _worker_config(self, worker: Worker) -> dict:
+        entry = {
+            "id": worker.id,
+            "profile": worker.profile_name,
+            "port": worker.port,
+            "camoufox_port": worker.camoufox_port,
+            "rate_limited_models": worker.rate_limited_models,
+            "quota_limits": self.quota.export_limits(worker.id),
+        }
+        if worker.remote:
+            entry.update({"host": worker.host, "remote": True})
+        return entry
+
     def save_config(self):
         config = {
-            "workers": [
-                {
-                    "id": w.id,
-                    "profile": w.profile_name,
-                    "port": w.port,
-                    "camoufox_port": w.camoufox_port,
-                    "rate_limited_models": w.rate_limited_models,
-                }
-                for w in self.workers.values()
-            ],
+            "workers": [self._worker_config(w) for w in self.workers.values()],
             "settings": {"recovery_hours": self.recovery_hours},
         }
         os.makedirs(DATA_DIR, exist_ok=True)
@@ -112,12 +164,14 @@ class WorkerPool:
         loaded_workers: Dict[str, Worker] = {}
         valid_workers = []
         for w_cfg in config.get("workers", []):
-            profile_path = os.path.join(SAVED_AUTH_DIR, w_cfg["profile"])
-            if not os.path.exists(profile_path):
+            remote = bool(w_cfg.get("remote"))
+            # 远程 Worker 的认证文件在其所在主机上，保留条目以便重新注册后沿用限流状态
+            profile_path = "" if remote else os.path.join(SAVED_AUTH_DIR, w_cfg["profile"])
+            if not remote and not os.path.exists(profile_path):
                 profile_path = os.path.join(
                     DATA_DIR, "auth_profiles", "workers", w_cfg["profile"]
                 )
-            if not os.path.exists(profile_path):
+            if not remote and not os.path.exists(profile_path):
                 logger.warning(
                     f"跳过Worker {w_cfg['id']}: 认证文件 {w_cfg['profile']} 不存在"
                 )
@@ -128,11 +182,14 @@ class WorkerPool:
                 profile_path=profile_path,
                 port=w_cfg["port"],
                 camoufox_port=w_cfg["camoufox_port"],
+                host=w_cfg.get("host", "127.0.0.1"),
+                remote=remote,
             )
             saved_limits = w_cfg.get("rate_limited_models", {})
             for model_id, recovery_time in saved_limits.items():
                 if recovery_time > current_time:
                     worker.rate_limited_models[model_id] = recovery_time
+            self.quota.import_limits(worker.id, w_cfg.get("quota_limits", {}))
             previous_worker = previous_workers.get(worker.id)
             if previous_worker:
                 worker.process = previous_worker.process
@@ -143,6 +200,7 @@ class WorkerPool:
                 worker.last_health_check = previous_worker.last_health_check
                 worker.last_error = previous_worker.last_error
                 worker.restart_count = previous_worker.restart_count
+                worker.last_heartbeat = previous_worker.last_heartbeat
             loaded_workers[worker.id] = worker
             valid_workers.append(w_cfg)
         self.workers = loaded_workers
@@ -209,6 +267,21 @@ class WorkerPool:
             if self._runtime_config.get("script_injection_enabled", False)
             else "false"
         )
+        if self._runtime_config.get("lean_rendering_enabled", False):
+            env["LEAN_RENDERING_ENABLED"] = "true"
+        return env
+
+    def _build_worker_env(self, worker: Worker) -> Dict[str, str]:
+        env = self._build_env()
+        if STREAM_RESUME_ENABLED:
+            # 断线续传已由网关处理；Worker 再等一轮宽限期只会让取消后的页面多空转一段时间
+            env["STREAM_RESUME_ENABLED"] = "false"
+        if GATEWAY_DISPATCH_MODE == "pull":
+            # 拉取模式: Worker 空闲时向网关的中心队列领取请求
+            gateway_port = self._runtime_config.get("fastapi_port", 2048)
+            env["GATEWAY_DISPATCH_URL"] = f"http://127.0.0.1:{gateway_port}"
+            env["WORKER_ID"] = worker.id
+            env["WORKER_DISPATCH_SECRET"] = dispatch_secret(self.dispatch_key, worker.id)
         return env
 
     def _resolve_stream_port(self, worker: Worker) -> int:
@@ -219,6 +292,14 @@ class WorkerPool:
             return stream_base + int(worker.id[1:]) - 1
         return stream_base
 
+    def _resolve_socket_path(self, worker: Worker) -> Optional[str]:
+        if GATEWAY_WORKER_TRANSPORT != "uds":
+            return None
+        path = worker_socket_path(WORKER_SOCKET_DIR, worker.id)
+        if path is None:
+            logger.warning(f"Unix socket unavailable for worker {worker.id}, falling back to TCP")
+        return path
+
     def _build_worker_command(self, worker: Worker) -> List[str]:
         cmd = [
             sys.executable,
@@ -237,6 +318,8 @@ class WorkerPool:
                 cmd.extend(["--internal-camoufox-proxy", proxy])
         stream_port = self._resolve_stream_port(worker)
         cmd.extend(["--stream-port", str(stream_port)])
+        if worker.socket_path:
+            cmd.extend(["--server-socket", worker.socket_path])
         return cmd
 
     def _cancel_restart(self, worker_id: str):
@@ -291,10 +374,81 @@ class WorkerPool:
         except Exception as e:
             logger.warning(f"Failed to free port {port}: {e}")
 
+    def register_remote_worker(
+        self, worker_id: str, host: str, port: int, profile: str = ""
+    ) -> Worker:
+        """登记 (或重新登记) 其他主机上的 Worker；与本机 Worker 的 id 冲突时抛出 ValueError"""
+        worker = self.workers.get(worker_id)
+        if worker is not None and not worker.remote:
+            raise ValueError(f"Worker id {worker_id} 已被本机 Worker 使用")
+        if worker is None:
+            worker = Worker(
+                id=worker_id,
+                profile_name=profile,
+                profile_path="",
+                port=port,
+                camoufox_port=0,
+                remote=True,
+            )
+            self.workers[worker_id] = worker
+        worker.host = host
+        worker.port = port
+        worker.profile_name = profile or worker.profile_name
+        worker.status = "running"
+        worker.active_requests = 0
+        worker.health_failures = 0
+        worker.last_error = None
+        worker.last_heartbeat = time.time()
+        self.save_config()
+        self._notify_status_change(worker, "registered")
+        logger.info(f"Remote worker {worker_id} registered at {worker.base_url}")
+        return worker
+
+    def record_heartbeat(
+        self,
+        worker_id: str,
+        queue_length: Optional[int] = None,
+        current_model: Optional[str] = None,
+    ) -> bool:
+        """记录远程 Worker 的心跳；未注册 (或已注销) 时返回 False，Worker 应重新注册"""
+        worker = self.workers.get(worker_id)
+        if (
+            worker is None
+            or not worker.remote
+            or worker.last_heartbeat is None
+            or worker.status == "stopped"
+        ):
+            return False
+        worker.last_heartbeat = time.time()
+        if queue_length is not None:
+            worker.queue_length = max(0, int(queue_length))
+        if current_model:
+            worker.current_model = current_model
+        if worker.status == "crashed":
+            worker.status = "running"
+            worker.health_failures = 0
+            worker.last_error = None
+            self._notify_status_change(worker, "recovered")
+            logger.info(f"Remote worker {worker_id} 恢复心跳，重新上线")
+        return True
+
+    def deregister_remote_worker(self, worker_id: str) -> bool:
+        worker = self.workers.get(worker_id)
+        if worker is None or not worker.remote:
+            return False
+        worker.status = "stopped"
+        worker.active_requests = 0
+        worker.last_heartbeat = None
+        self._notify_status_change(worker, "deregistered")
+        logger.info(f"Remote worker {worker_id} deregistered")
+        return True
+
     def start_worker(self, worker_id: str) -> tuple[bool, str]:
         if worker_id not in self.workers:
             return False, "Worker not found"
         worker = self.workers[worker_id]
+        if worker.remote:
+            return False, "远程 Worker 由其所在主机启动"
         if (
             worker.status == "running"
             and worker.process
@@ -307,12 +461,13 @@ class WorkerPool:
         stream_port = self._resolve_stream_port(worker)
         if stream_port:
             self._free_port(stream_port)
+        worker.socket_path = self._resolve_socket_path(worker)
         try:
             worker.process = subprocess.Popen(
                 self._build_worker_command(worker),
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                env=self._build_env(),
+                env=self._build_worker_env(worker),
                 cwd=SOURCE_DIR,
                 creationflags=self._creation_flags(),
             )
@@ -361,6 +516,8 @@ class WorkerPool:
         if worker_id not in self.workers:
             return False, "Worker not found"
         worker = self.workers[worker_id]
+        if worker.remote:
+            return False, "远程 Worker 需在其所在主机上停止"
         if worker.process is None or worker.status not in {"running", "crashed"}:
             worker.status = "stopped"
             worker.process = None
@@ -422,14 +579,22 @@ class WorkerPool:
             for w in self.workers.values()
             if w.status == "running" and not w.is_model_limited(model_id)
         ]
-        if not available:
-            return None
-        return min(available, key=lambda w: (w.active_requests, w.request_count))
+        available.sort(key=lambda w: w.request_count)
+        # 接近已学习限额的 Worker 仅在没有其他选择时使用
+        target = normalize_model_id(model_id)
+        fresh = [w for w in available if target not in w.near_limit_models]
+        return select_worker(
+            fresh or available,
+            model_id,
+            load=lambda w: w.active_requests,
+            current_model=lambda w: w.current_model,
+        )
 
     def mark_rate_limited(self, worker_id: str, model_id: str):
         if worker_id in self.workers:
             worker = self.workers[worker_id]
             worker.mark_model_limited(model_id, self.recovery_hours)
+            self.quota.on_rate_limited(worker_id, normalize_model_id(model_id))
             logger.warning(f"Worker {worker_id} rate limited for model {model_id}")
             self.save_config()
             self._notify_status_change(worker, "rate_limited")
@@ -444,11 +609,17 @@ class WorkerPool:
         return False
 
     def get_status(self) -> List[dict]:
-        return [w.to_dict() for w in self.workers.values()]
+        return [
+            {**w.to_dict(), "quota": self.quota.to_dict(w.id)}
+            for w in self.workers.values()
+        ]
 
-    def _begin_request(self, worker: Worker):
+    def _begin_request(self, worker: Worker, body: Optional[dict] = None):
         worker.request_count += 1
         worker.active_requests += 1
+        model = normalize_model_id((body or {}).get("model"))
+        if model:
+            worker.current_model = model
 
     def _finish_request(self, worker: Worker):
         worker.active_requests = max(0, worker.active_requests - 1)
@@ -456,9 +627,9 @@ class WorkerPool:
     async def forward_request(
         self, worker: Worker, path: str, body: dict, headers: dict = None
     ) -> dict:
-        url = f"http://127.0.0.1:{worker.port}{path}"
+        url = f"{worker.base_url}{path}"
         session = await self._get_session()
-        self._begin_request(worker)
+        self._begin_request(worker, body)
         try:
             async with session.post(url, json=body, headers=headers or {}) as resp:
                 return await resp.json()
@@ -468,7 +639,7 @@ class WorkerPool:
     async def forward_get(
         self, worker: Worker, path: str, headers: dict = None
     ) -> dict:
-        url = f"http://127.0.0.1:{worker.port}{path}"
+        url = f"{worker.base_url}{path}"
         session = await self._get_session()
         async with session.get(url, headers=headers or {}) as resp:
             return await resp.json()
@@ -476,9 +647,9 @@ class WorkerPool:
     async def forward_stream(
         self, worker: Worker, path: str, body: dict, headers: dict = None
     ) -> AsyncGenerator[bytes, None]:
-        url = f"http://127.0.0.1:{worker.port}{path}"
+        url = f"{worker.base_url}{path}"
         session = await self._get_session()
-        self._begin_request(worker)
+        self._begin_request(worker, body)
         try:
             async with session.post(url, json=body, headers=headers or {}) as resp:
                 async for chunk in resp.content.iter_any():
@@ -501,23 +672,116 @@ class WorkerPool:
             await self.stop_worker(worker_id, graceful_timeout=graceful_timeout)
 
     async def _probe_worker_health(self, worker: Worker) -> tuple[bool, Optional[str]]:
-        if worker.process is None:
+        if worker.remote:
+            if worker.last_heartbeat is None or time.time() - worker.last_heartbeat > self.heartbeat_timeout:
+                return False, HEARTBEAT_TIMEOUT_ERROR
+        elif worker.process is None:
             return False, "worker process missing"
-        exit_code = worker.process.poll()
-        if exit_code is not None:
+        elif (exit_code := worker.process.poll()) is not None:
             return False, f"process exited with code {exit_code}"
-        url = f"http://127.0.0.1:{worker.port}/health"
+        url = f"{worker.base_url}/health"
         session = await self._get_session()
         try:
             timeout = aiohttp.ClientTimeout(total=5, connect=2)
             async with session.get(url, timeout=timeout) as response:
                 if response.status != 200:
                     return False, f"/health returned {response.status}"
-                await response.read()
+                try:
+                    payload = await response.json(content_type=None)
+                    details = payload.get("details", {})
+                    current_model = details.get("currentModel")
+                    if current_model:
+                        worker.current_model = current_model
+                    worker.queue_length = max(0, int(details.get("queueLength", 0)))
+                    self._update_quota(worker, details.get("usage") or {})
+                except (ValueError, TypeError, AttributeError, aiohttp.ContentTypeError):
+                    pass
                 return True, None
         except Exception as exc:
             return False, str(exc)
 
+    def _update_quota(self, worker: Worker, usage: Dict[str, Dict[str, int]]):
+        self.quota.record_usage_totals(worker.id, usage)
+        near_limit = self.quota.near_limit_models(worker.id)
+        if near_limit != worker.near_limit_models:
+            worker.near_limit_models = near_limit
+            if near_limit:
+                logger.info(f"Worker {worker.id} 接近已学习的配额上限: {', '.join(near_limit)}")
+            self._notify_status_change(worker, "quota_pressure")
+
+    @staticmethod
+    def _probe_headers() -> Dict[str, str]:
+        try:
+            with open(API_KEY_FILE, "r") as f:
+                api_key = next((line.strip() for line in f if line.strip()), "")
+        except OSError:
+            api_key = ""
+        return {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    async def _probe_model_recovery(self, worker: Worker, model_id: str) -> Optional[bool]:
+        """发送一个极小的非流式请求，判断被限流的模型是否已恢复；
+        返回 None 表示探测本身失败 (鉴权失败、Worker 异常)，不代表模型仍被限流
+        """
+        url = f"{worker.base_url}/v1/chat/completions"
+        body = {
+            "model": model_id,
+            "messages": [{"role": "user", "content": "ping"}],
+            "stream": False,
+            "max_tokens": 16,
+        }
+        session = await self._get_session()
+        self._begin_request(worker, body)
+        try:
+            timeout = aiohttp.ClientTimeout(total=QUOTA_PROBE_TIMEOUT_SECONDS)
+            async with session.post(
+                url, json=body, headers=self._probe_headers(), timeout=timeout
+            ) as response:
+                content = await response.read()
+                if response.status == 429 or is_rate_limited_response(response.status, content):
+                    return False
+                if response.status != 200:
+                    logger.warning(
+                        f"Worker {worker.id} 恢复探测返回 HTTP {response.status} ({model_id})，"
+                        f"无法判断限流状态: {content[:200].decode('utf-8', 'replace')}"
+                    )
+                    return None
+                return True
+        except Exception as exc:
+            logger.debug(f"Worker {worker.id} 恢复探测失败 ({model_id}): {exc}")
+            return False
+        finally:
+            self._finish_request(worker)
+
+    async def _probe_worker_limits(self, worker: Worker, model_id: str):
+        recovered = await self._probe_model_recovery(worker, model_id)
+        self.quota.on_probe_result(worker.id, model_id, recovered)
+        if recovered is None:
+            return
+        if not recovered:
+            logger.info(f"Worker {worker.id} 模型 {model_id} 仍处于限流状态")
+            return
+        worker.rate_limited_models.pop(model_id, None)
+        logger.info(f"✅ Worker {worker.id} 模型 {model_id} 探测成功，提前解除限流")
+        self.save_config()
+        self._notify_status_change(worker, "limit_recovered")
+
+    async def probe_rate_limited_models(self):
+        probes = []
+        for worker in list(self.workers.values()):
+            if worker.status != "running" or worker.active_requests or worker.queue_length:
+                continue
+            limited = [
+                model_id
+                for model_id in list(worker.rate_limited_models)
+                if worker.is_model_limited(model_id)
+            ]
+            due = self.quota.due_probes(worker.id, limited)
+            # 每轮每个 Worker 最多探测一个模型，避免占用页面过久；不同 Worker 的探测并发进行
+            if due:
+                probes.append(self._probe_worker_limits(worker, due[0]))
+        if probes:
+            await asyncio.gather(*probes)
+
     def _mark_worker_crashed(self, worker: Worker, error: Optional[str]):
         if worker.process is not None:
             self._terminate_worker_process(worker.process)
@@ -591,10 +855,11 @@ class WorkerPool:
             logger.warning(
                 f"Worker {worker.id} 健康检查失败 {worker.health_failures}/{threshold}: {error}"
             )
-            if worker.health_failures < threshold:
+            if worker.health_failures < threshold and error != HEARTBEAT_TIMEOUT_ERROR:
                 continue
             self._mark_worker_crashed(worker, error)
-            if restart_enabled:
+            # 远程 Worker 无法由本机重启，恢复心跳后自动上线
+            if restart_enabled and not worker.remote:
                 self._schedule_restart(worker.id)
 
     async def health_check_loop(self):
@@ -608,5 +873,19 @@ class WorkerPool:
                 logger.error(f"Worker health check loop error: {exc}")
             await asyncio.sleep(self.health_check_interval)
 
+    async def quota_probe_loop(self):
+        """恢复探测独立于健康检查运行，探测耗时不会推迟崩溃检测"""
+        if not QUOTA_PROBE_ENABLED:
+            return
+        await asyncio.sleep(90)
+        while True:
+            try:
+                await self.probe_rate_limited_models()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Quota probe loop error: {exc}")
+            await asyncio.sleep(self.health_check_interval)
+
 
 worker_pool = WorkerPool()
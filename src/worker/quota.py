@@ -0,0 +1,184 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 滑动窗口 (秒): AI Studio 的免费额度同时按分钟和按天限制
+QUOTA_WINDOWS: Dict[str, int] = {"minute": 60, "day": 86400}
+# 窗口内请求数少于该值时不从限流事件中学习阈值，避免把偶发限流误学成极低的上限
+MIN_LEARN_REQUESTS = 2
+
+
+@dataclass
+class ModelQuota:
+    """单个账号 (Worker) + 模型的用量与学习到的限额"""
+
+    events: Deque[Tuple[float, int, int]] = field(default_factory=deque)
+    learned: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    limited_events: int = 0
+    probe_interval: float = 0.0
+    next_probe_at: Optional[float] = None
+
+    def record(self, now: float, requests: int, tokens: int) -> None:
+        if requests <= 0 and tokens <= 0:
+            return
+        self.events.append((now, requests, tokens))
+        self._trim(now)
+        # 用量超过学习值却没有被限流，说明真实限额更高，上调学习值
+        for window, limit in self.learned.items():
+            used_requests, used_tokens = self.usage(window, now)
+            if used_requests > limit["requests"]:
+                self.learned[window] = {"requests": used_requests, "tokens": max(used_tokens, limit["tokens"])}
+
+    def usage(self, window: str, now: float) -> Tuple[int, int]:
+        cutoff = now - QUOTA_WINDOWS[window]
+        requests = tokens = 0
+        for timestamp, count, used_tokens in reversed(self.events):
+            if timestamp < cutoff:
+                break
+            requests += count
+            tokens += used_tokens
+        return requests, tokens
+
+    def learn_limit(self, now: float) -> None:
+        """发生限流时，把窗口当前的用量记为该窗口的观测上限 (取历次观测的最大值)。
+
+        一次限流无法区分是哪个窗口触发的: 较大窗口的用量与较小窗口相同时，
+        归因于较小的窗口，否则刚触发分钟限额就会把当天剩余时间也判为接近上限。
+        """
+        self.limited_events += 1
+        smaller_usage = 0
+        for window in sorted(QUOTA_WINDOWS, key=QUOTA_WINDOWS.get):
+            requests, tokens = self.usage(window, now)
+            attributable = requests >= MIN_LEARN_REQUESTS and requests > smaller_usage
+            smaller_usage = requests
+            if not attributable:
+                continue
+            previous = self.learned.get(window)
+            if previous is None or requests > previous["requests"]:
+                self.learned[window] = {"requests": requests, "tokens": tokens}
+
+    def pressure(self, now: float) -> float:
+        """当前用量占已学习限额的最大比例，无学习数据时为 0"""
+        ratio = 0.0
+        for window, limit in self.learned.items():
+            requests, tokens = self.usage(window, now)
+            if limit.get("requests"):
+                ratio = max(ratio, requests / limit["requests"])
+            if limit.get("tokens"):
+                ratio = max(ratio, tokens / limit["tokens"])
+        return ratio
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - max(QUOTA_WINDOWS.values())
+        while self.events and self.events[0][0] < cutoff:
+            self.events.popleft()
+
+
+class QuotaTracker:
+    """按 (Worker, 模型) 维护用量窗口、限流时学习限额、接近限额时提前引流，并安排恢复探测"""
+
+    def __init__(self, steer_ratio: float = 0.9, probe_initial: float = 300, probe_max: float = 3600):
+        self.steer_ratio = steer_ratio
+        self.probe_initial = probe_initial
+        self.probe_max = probe_max
+        self._quotas: Dict[Tuple[str, str], ModelQuota] = {}
+        self._last_totals: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    def quota(self, worker_id: str, model: str) -> ModelQuota:
+        key = (worker_id, model)
+        if key not in self._quotas:
+            self._quotas[key] = ModelQuota()
+        return self._quotas[key]
+
+    def record_usage_totals(self, worker_id: str, totals: Dict[str, Dict[str, int]], now: Optional[float] = None) -> None:
+        """根据 Worker /health 上报的累计用量计算增量；累计值变小说明 Worker 已重启，按新值计"""
+        now = time.time() if now is None else now
+        previous = self._last_totals.get(worker_id, {})
+        for model, counters in totals.items():
+            last = previous.get(model, {})
+            requests = int(counters.get("requests", 0))
+            tokens = int(counters.get("tokens", 0))
+            delta_requests = requests - last.get("requests", 0)
+            delta_tokens = tokens - last.get("tokens", 0)
+            if delta_requests < 0 or delta_tokens < 0:
+                delta_requests, delta_tokens = requests, tokens
+            self.quota(worker_id, model).record(now, delta_requests, delta_tokens)
+        self._last_totals[worker_id] = {
+            model: {"requests": int(c.get("requests", 0)), "tokens": int(c.get("tokens", 0))}
+            for model, c in totals.items()
+        }
+
+    def on_rate_limited(self, worker_id: str, model: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        quota = self.quota(worker_id, model)
+        quota.learn_limit(now)
+        quota.probe_interval = self.probe_initial
+        quota.next_probe_at = now + quota.probe_interval
+
+    def on_probe_result(self, worker_id: str, model: str, recovered: Optional[bool], now: Optional[float] = None) -> None:
+        """recovered 为 None 表示探测本身出错 (鉴权失败等)，不能说明模型仍被限流: 按当前间隔重试，不翻倍"""
+        now = time.time() if now is None else now
+        quota = self.quota(worker_id, model)
+        if recovered:
+            quota.probe_interval = 0.0
+            quota.next_probe_at = None
+            return
+        if recovered is None:
+            quota.probe_interval = max(self.probe_initial, quota.probe_interval)
+            quota.next_probe_at = now + quota.probe_interval
+            return
+        quota.probe_interval = min(self.probe_max, max(self.probe_initial, quota.probe_interval * 2))
+        quota.next_probe_at = now + quota.probe_interval
+
+    def due_probes(self, worker_id: str, models: List[str], now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        due = []
+        for model in models:
+            quota = self.quota(worker_id, model)
+            if quota.next_probe_at is None:
+                quota.probe_interval = self.probe_initial
+                quota.next_probe_at = now + quota.probe_interval
+            elif quota.next_probe_at <= now:
+                due.append(model)
+        return due
+
+    def near_limit_models(self, worker_id: str, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        return sorted(
+            model
+            for (owner, model), quota in self._quotas.items()
+            if owner == worker_id and quota.pressure(now) >= self.steer_ratio
+        )
+
+    def export_limits(self, worker_id: str) -> Dict[str, Dict[str, Dict[str, int]]]:
+        return {
+            model: dict(quota.learned)
+            for (owner, model), quota in self._quotas.items()
+            if owner == worker_id and quota.learned
+        }
+
+    def import_limits(self, worker_id: str, limits: Dict[str, Dict[str, Dict[str, int]]]) -> None:
+        for model, learned in (limits or {}).items():
+            self.quota(worker_id, model).learned.update(
+                {window: dict(limit) for window, limit in learned.items() if window in QUOTA_WINDOWS}
+            )
+
+    def forget_worker(self, worker_id: str) -> None:
+        for key in [key for key in self._quotas if key[0] == worker_id]:
+            del self._quotas[key]
+        self._last_totals.pop(worker_id, None)
+
+    def to_dict(self, worker_id: str, now: Optional[float] = None) -> Dict[str, dict]:
+        now = time.time() if now is None else now
+        result = {}
+        for (owner, model), quota in self._quotas.items():
+            if owner != worker_id:
+                continue
+            result[model] = {
+                "usage": {window: dict(zip(("requests", "tokens"), quota.usage(window, now))) for window in QUOTA_WINDOWS},
+                "learned": dict(quota.learned),
+                "pressure": round(quota.pressure(now), 2),
+                "next_probe_at": quota.next_probe_at,
+            }
+        return result
@@ -0,0 +1,116 @@
+import json
+from typing import Any
+
+# 只在 Worker 的错误/状态帧中查找限流关键字，模型生成的正文 (可能提到 "quota") 不参与匹配
+RATE_LIMIT_KEYWORDS = ("exceeded quota", "out of free generations", "rate limit")
+# 状态帧的字节特征: OpenAI 风格的 error 对象，或 Worker 以 "[System: ...]" 结束流的提示
+STATUS_FRAME_MARKERS = (b'"error"', b"[System:")
+STATUS_CONTENT_PREFIX = "[System:"
+FRAME_SEPARATOR = b"\n\n"
+# 未闭合帧的缓冲上限；超过时丢弃该帧剩余部分 (状态帧都很短)
+MAX_PENDING_FRAME_BYTES = 64 * 1024
+
+
+def mentions_rate_limit(text: Any) -> bool:
+    lowered = str(text).lower()
+    return any(keyword in lowered for keyword in RATE_LIMIT_KEYWORDS)
+
+
+def _status_payload_is_rate_limit(data: Any) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if "error" in data:
+        return mentions_rate_limit(data["error"]) or mentions_rate_limit(data.get("detail", ""))
+    for choice in data.get("choices") or []:
+        if not isinstance(choice, dict) or not choice.get("finish_reason"):
+            continue
+        content = (choice.get("delta") or choice.get("message") or {}).get("content")
+        if isinstance(content, str) and content.lstrip().startswith(STATUS_CONTENT_PREFIX):
+            return mentions_rate_limit(content)
+    return False
+
+
+def is_rate_limit_frame(frame: bytes) -> bool:
+    """判断单个完整的 SSE 帧是否为限流状态帧"""
+    if not any(marker in frame for marker in STATUS_FRAME_MARKERS):
+        return False
+    for line in frame.split(b"\n"):
+        if not line.startswith(b"data:"):
+            continue
+        try:
+            data = json.loads(line[5:].strip())
+        except ValueError:
+            continue
+        if _status_payload_is_rate_limit(data):
+            return True
+    return False
+
+
+def is_rate_limited_response(status: int, content: bytes) -> bool:
+    """非流式响应: 429 直接视为限流；其他错误响应检查错误信息；成功响应只看顶层 error 对象"""
+    if status == 429:
+        return True
+    if status != 200:
+        return mentions_rate_limit(content[:MAX_PENDING_FRAME_BYTES].decode("utf-8", "ignore"))
+    if not any(marker in content for marker in STATUS_FRAME_MARKERS):
+        return False
+    try:
+        return _status_payload_is_rate_limit(json.loads(content))
+    except ValueError:
+        return False
+
+
+class RateLimitDetector:
+    """按 SSE 帧增量扫描上游流: 帧可以跨越任意多个 TCP 分片，
+    只有完整且带状态帧特征的帧才会被解析，正文帧仅做一次字节查找。
+    """
+
+    def __init__(self):
+        self.detected = False
+        self.data_frames = 0
+        self._pending = b""
+        self._skipping = False
+
+    def feed(self, data: bytes) -> bool:
+        if self.detected or not data:
+            return self.detected
+        # 常见情况: 分片恰好由完整的正文帧组成，只做几次 C 层面的字节查找
+        if not self._pending and not self._skipping and data.endswith(FRAME_SEPARATOR):
+            if not any(marker in data for marker in STATUS_FRAME_MARKERS):
+                self.data_frames += data.count(b"data:")
+                return False
+        buffer = self._pending + data if self._pending else data
+        start = 0
+        while True:
+            end = buffer.find(FRAME_SEPARATOR, start)
+            if end < 0:
+                break
+            if self._skipping:
+                self._skipping = False
+            else:
+                self._inspect(buffer, start, end)
+                if self.detected:
+                    self._pending = b""
+                    return True
+            start = end + len(FRAME_SEPARATOR)
+        rest = buffer[start:]
+        if len(rest) > MAX_PENDING_FRAME_BYTES:
+            # 超长帧只可能是正文，跳过到下一个分隔符；保留末字节以免分隔符被截断
+            self._skipping = True
+            rest = rest[-1:]
+        self._pending = rest
+        return False
+
+    def close(self) -> bool:
+        """上游流结束: 检查最后一个没有以空行结尾的帧"""
+        if not self.detected and self._pending and not self._skipping:
+            self._inspect(self._pending, 0, len(self._pending))
+        self._pending = b""
+        return self.detected
+
+    def _inspect(self, buffer: bytes, start: int, end: int) -> None:
+        if buffer.find(b"data:", start, end) < 0:
+            return
+        self.data_frames += 1
+        if any(buffer.find(marker, start, end) >= 0 for marker in STATUS_FRAME_MARKERS):
+            self.detected = is_rate_limit_frame(buffer[start:end])
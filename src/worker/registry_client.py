@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+
+SECRET_HEADER = "X-Worker-Secret"
+REQUEST_TIMEOUT_SECONDS = 10
+RETRY_MAX_SECONDS = 60
+
+logger = logging.getLogger("WorkerRegistry")
+
+
+class RegistryClient:
+    """远程 Worker 侧: 向 Manager 注册本 Worker 的地址，并按间隔发送心跳。
+
+    Manager 重启或注销后心跳返回 404，此时自动重新注册；Manager 不可达时按退避间隔重试，
+    Worker 本身照常服务。
+    """
+
+    def __init__(
+        self,
+        manager_url: str,
+        secret: str,
+        worker_id: str,
+        port: int,
+        host: str = "",
+        profile: str = "",
+        interval: float = 10,
+        status: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        self.manager_url = manager_url.rstrip("/")
+        self.worker_id = worker_id
+        self.port = port
+        self.host = host
+        self.profile = profile
+        self.interval = interval
+        self.status = status or dict
+        self.headers = {SECRET_HEADER: secret}
+        self.registered = False
+
+    async def _post(self, session: aiohttp.ClientSession, path: str, payload: dict) -> int:
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+        async with session.post(
+            f"{self.manager_url}/api/workers{path}", json=payload, headers=self.headers, timeout=timeout
+        ) as response:
+            if response.status in (401, 403, 409, 422):
+                detail = await response.text()
+                raise PermissionError(f"Manager 拒绝了 Worker {self.worker_id}: HTTP {response.status} {detail}")
+            return response.status
+
+    async def register(self, session: aiohttp.ClientSession) -> None:
+        payload = {"worker_id": self.worker_id, "port": self.port, "host": self.host, "profile": self.profile}
+        status = await self._post(session, "/register", payload)
+        if status != 200:
+            raise RuntimeError(f"/api/workers/register returned {status}")
+        self.registered = True
+        logger.info(f"Worker {self.worker_id} 已注册到 {self.manager_url}")
+
+    async def heartbeat(self, session: aiohttp.ClientSession) -> None:
+        status = await self._post(session, f"/{self.worker_id}/heartbeat", self.status())
+        if status == 404:
+            logger.info(f"Manager 不认识 Worker {self.worker_id}，重新注册")
+            self.registered = False
+            await self.register(session)
+        elif status != 200:
+            raise RuntimeError(f"heartbeat returned {status}")
+
+    async def deregister(self, session: aiohttp.ClientSession) -> None:
+        if self.registered:
+            self.registered = False
+            await self._post(session, f"/{self.worker_id}/deregister", {})
+
+    async def run(self) -> None:
+        delay = self.interval
+        async with aiohttp.ClientSession() as session:
+            try:
+                while True:
+                    try:
+                        if self.registered:
+                            await self.heartbeat(session)
+                        else:
+                            await self.register(session)
+                        delay = self.interval
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as exc:
+                        logger.warning(f"Worker 注册/心跳失败: {exc}，{delay} 秒后重试")
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, RETRY_MAX_SECONDS)
+                        continue
+                    await asyncio.sleep(self.interval)
+            finally:
+                # 正常关闭时主动注销，网关立即停止转发，不必等待心跳超时
+                try:
+                    await self.deregister(session)
+                except Exception:
+                    pass
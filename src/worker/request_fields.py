@@ -0,0 +1,116 @@
+import json
+import re
+from typing import Any, Dict, Iterable, Optional
+
+# 网关只需要 model / stream 两个字段来路由，请求体本身原样转发给 Worker
+ROUTING_FIELDS = ("model", "stream")
+# 扫描时访问的结构性标记 (引号、括号) 数量上限；超过时交由调用方完整解析
+MAX_SCAN_TOKENS = 4096
+# 只解码不超过该长度的目标字段值，model/stream 都很短
+MAX_FIELD_VALUE_BYTES = 1024
+
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_SCALAR_END = re.compile(rb"[,}\]]")
+_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+_BACKSLASH = 0x5C
+
+
+class RequestScanError(ValueError):
+    """请求体不是可以快速扫描的 JSON 对象"""
+
+
+class _Scanner:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.tokens = 0
+
+    def skip_whitespace(self, pos: int) -> int:
+        return _WHITESPACE.match(self.body, pos).end()
+
+    def expect(self, pos: int, char: bytes) -> int:
+        if self.body[pos:pos + 1] != char:
+            raise RequestScanError(f"expected {char!r} at offset {pos}")
+        return pos + 1
+
+    def string_end(self, pos: int) -> int:
+        """pos 指向起始引号，返回结束引号之后的位置；字符串内容只做字节查找，不解码"""
+        search = pos + 1
+        while True:
+            end = self.body.find(b'"', search)
+            if end < 0:
+                raise RequestScanError("unterminated string")
+            backslashes = 0
+            while self.body[end - 1 - backslashes] == _BACKSLASH:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return end + 1
+            search = end + 1
+
+    def value_end(self, pos: int) -> int:
+        char = self.body[pos:pos + 1]
+        if char == b'"':
+            return self.string_end(pos)
+        if char not in (b"{", b"["):
+            match = _SCALAR_END.search(self.body, pos)
+            if match is None:
+                raise RequestScanError("unterminated value")
+            return match.start()
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(self.body, pos)
+            if match is None:
+                raise RequestScanError("unterminated container")
+            self.tokens += 1
+            if self.tokens > MAX_SCAN_TOKENS:
+                raise RequestScanError("request structure too large to scan")
+            token = match.group()
+            if token == b'"':
+                pos = self.string_end(match.start())
+                continue
+            pos = match.end()
+            depth += 1 if token in (b"{", b"[") else -1
+            if depth == 0:
+                return pos
+
+
+def scan_request_fields(body: bytes, fields: Iterable[str] = ROUTING_FIELDS) -> Dict[str, Any]:
+    """只解析 JSON 请求体中指定的顶层字段。
+
+    逐个跳过顶层成员的值: 字符串 (如 base64 图片) 只查找结束引号，嵌套结构只追踪括号，
+    找齐目标字段后立即停止，不为其余内容构造 Python 对象。格式不符合预期时抛出
+    RequestScanError，由调用方回退到完整解析。
+    """
+    wanted = {name.encode(): name for name in fields}
+    found: Dict[str, Any] = {}
+    scanner = _Scanner(body)
+    pos = scanner.expect(scanner.skip_whitespace(0), b"{")
+    pos = scanner.skip_whitespace(pos)
+    if body[pos:pos + 1] == b"}":
+        return found
+    while True:
+        key_end = scanner.string_end(scanner.expect(pos, b'"') - 1)
+        key = body[pos + 1:key_end - 1]
+        pos = scanner.skip_whitespace(scanner.expect(scanner.skip_whitespace(key_end), b":"))
+        end = scanner.value_end(pos)
+        name = wanted.get(key)
+        if name is not None:
+            if end - pos > MAX_FIELD_VALUE_BYTES:
+                raise RequestScanError(f"field {name!r} is unexpectedly large")
+            try:
+                found[name] = json.loads(body[pos:end])
+            except ValueError as exc:
+                raise RequestScanError(f"invalid value for {name!r}") from exc
+            if len(found) == len(wanted):
+                return found
+        pos = scanner.skip_whitespace(end)
+        if body[pos:pos + 1] == b"}":
+            return found
+        pos = scanner.skip_whitespace(scanner.expect(pos, b","))
+
+
+def extract_routing_fields(body: bytes) -> Optional[Dict[str, Any]]:
+    """快速提取路由字段；无法快速扫描时返回 None"""
+    try:
+        return scan_request_fields(body)
+    except RequestScanError:
+        return None
@@ -0,0 +1,176 @@
+import hashlib
+import json
+from typing import Dict, Optional, Set
+
+from .idempotency import (
+    IdempotencyStore,
+    caller_id,
+    follow_execution,
+    read_body,
+    replay_body,
+    run_execution,
+)
+from .rate_limit import is_rate_limited_response
+from .routing import normalize_model_id
+
+# 可缓存的路由 (前缀匹配)
+CACHEABLE_PATHS = ("/v1/chat/completions",)
+# 不影响生成结果、不参与缓存键的请求字段
+IGNORED_FIELDS = ("user", "metadata", "store", "stream_options")
+CACHE_HEADER = b"x-cache"
+# Worker 以 200 返回的限流/错误结果在正文中带有这些状态标记，不能缓存
+ERROR_CONTENT_MARKERS = ("[System:", "[错误:")
+
+
+def cache_key(body: bytes) -> Optional[str]:
+    """请求的规范化哈希；只有显式 temperature=0 的请求可缓存，其余返回 None"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    temperature = payload.get("temperature")
+    if isinstance(temperature, bool) or not isinstance(temperature, (int, float)) or temperature != 0:
+        return None
+    canonical = {name: value for name, value in payload.items() if name not in IGNORED_FIELDS}
+    canonical["stream"] = bool(canonical.get("stream"))
+    canonical["temperature"] = 0
+    if isinstance(canonical.get("model"), str):
+        canonical["model"] = normalize_model_id(canonical["model"])
+    return hashlib.sha256(
+        json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def _is_error_payload(data) -> bool:
+    if not isinstance(data, dict):
+        return False
+    if "error" in data:
+        return True
+    for choice in data.get("choices") or []:
+        message = (choice.get("delta") or choice.get("message")) if isinstance(choice, dict) else None
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str) and any(marker in content for marker in ERROR_CONTENT_MARKERS):
+            return True
+    return False
+
+
+def is_error_response(status: int, content: bytes) -> bool:
+    """状态码为 200 但实际是限流或错误的响应: 顶层 error 对象，或带 [System: ...] / [错误: ...] 状态帧的 SSE 流"""
+    if is_rate_limited_response(status, content):
+        return True
+    try:
+        return _is_error_payload(json.loads(content))
+    except ValueError:
+        pass
+    for line in content.split(b"\n"):
+        if not line.startswith(b"data:"):
+            continue
+        try:
+            data = json.loads(line[5:])
+        except ValueError:
+            continue
+        if _is_error_payload(data):
+            return True
+    return False
+
+
+def cache_directives(headers: Dict[bytes, bytes]) -> Set[str]:
+    value = headers.get(b"cache-control", b"").decode("latin-1").lower()
+    return {directive.strip().split("=", 1)[0] for directive in value.split(",") if directive.strip()}
+
+
+class ResponseCache(IdempotencyStore):
+    """精确匹配的响应缓存: 按原始分块保存完整的 200 响应 (流式响应按原样的 SSE 分块重放)"""
+
+    def __init__(self, ttl: float = 3600, max_bytes: int = 128 * 1024 * 1024):
+        super().__init__(ttl=ttl, max_bytes=max_bytes, detach_grace=0)
+        self.stats["bypassed"] = 0
+        self.stats["errors"] = 0
+
+    @staticmethod
+    def replayable_status(status: int) -> bool:
+        return status == 200
+
+    def finish(self, key: tuple, execution, completed: bool) -> None:
+        if completed and execution.status == 200 and not execution.truncated:
+            content = b"".join(
+                message.get("body", b"") for message in execution.messages if message["type"] == "http.response.body"
+            )
+            if is_error_response(execution.status, content):
+                self.stats["errors"] += 1
+                completed = False
+        super().finish(key, execution, completed)
+
+    def to_dict(self) -> dict:
+        hits = self.stats["replayed"] + self.stats["attached"]
+        lookups = hits + self.stats["executed"]
+        return {
+            "entries": len(self),
+            "stored_mb": round(self.stored_bytes / 1024 / 1024, 2),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "ttl_s": self.ttl,
+            "hits": hits,
+            "coalesced": self.stats["attached"],
+            "misses": self.stats["executed"],
+            "bypassed": self.stats["bypassed"],
+            "errors": self.stats["errors"],
+            "evicted": self.stats["evicted"],
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+class ResponseCacheMiddleware:
+    """ASGI 中间件: temperature=0 的相同请求直接返回缓存的响应，不再经过浏览器。
+
+    请求头 Cache-Control: no-cache 跳过查找并用新结果替换缓存，no-store 既不查找也不保存；
+    响应头 X-Cache 标明 HIT / MISS / BYPASS。并发的相同请求合并为一次执行。缓存按调用方凭据隔离。
+    """
+
+    def __init__(self, app, cache: ResponseCache, paths=CACHEABLE_PATHS):
+        self.app = app
+        self.cache = cache
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        headers: Dict[bytes, bytes] = dict(scope["headers"])
+        body = await read_body(receive)
+        if body is None:
+            return
+        directives = cache_directives(headers)
+        digest = cache_key(body)
+        if digest is None or "no-store" in directives:
+            self.cache.stats["bypassed"] += 1
+            await self.app(scope, replay_body(body, receive), _tagged(send, b"BYPASS"))
+            return
+
+        key = (caller_id(headers), scope["path"], digest)
+        if "no-cache" in directives:
+            self.cache.discard(key)
+        execution, created = self.cache.begin(key, digest)
+        if created:
+            completed = False
+            try:
+                completed = await run_execution(self.app, scope, receive, _tagged(send, b"MISS"), body, execution)
+            finally:
+                self.cache.finish(key, execution, completed)
+            return
+        subscription = execution.subscribe()
+        if subscription is None:
+            # 合并的执行失败或响应过大未能保存: 单独执行一次
+            await self.app(scope, replay_body(body, receive), _tagged(send, b"MISS"))
+            return
+        await follow_execution(receive, send, subscription, execution, extra_headers=((CACHE_HEADER, b"HIT"),))
+
+
+def _tagged(send, status: bytes):
+    async def tagged_send(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (CACHE_HEADER, status)]}
+        await send(message)
+
+    return tagged_send
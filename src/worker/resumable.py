@@ -0,0 +1,122 @@
+import json
+import re
+import secrets
+from typing import Dict, List, Optional, Tuple
+
+from .idempotency import (
+    IdempotencyStore,
+    caller_id,
+    follow_execution,
+    read_body,
+    replay_body,
+    run_execution,
+    send_error,
+)
+from .request_fields import extract_routing_fields
+
+# 支持断线续传的路由 (前缀匹配)，只对 stream=true 的请求生效
+RESUMABLE_PATHS = ("/v1/chat/completions",)
+_EVENT_SEPARATOR = re.compile(rb"\r\n\r\n|\n\n|\r\r")
+_ID_LINE = re.compile(rb"^id(?::[^\r\n]*)?(?:\r\n|\n|\r|$)", re.M)
+
+
+def _is_stream_request(body: bytes) -> bool:
+    fields = extract_routing_fields(body)
+    if fields is None:
+        try:
+            fields = json.loads(body)
+        except ValueError:
+            return False
+    return isinstance(fields, dict) and fields.get("stream") is True
+
+
+def parse_event_id(value: str) -> Optional[Tuple[str, int]]:
+    """事件 id 的格式为 <流 id>-<序号>；格式不符时返回 None"""
+    stream_id, _, seq = value.strip().rpartition("-")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+class EventStamper:
+    """把应用输出的 SSE 字节流按事件拆分，为每个事件写入顺序的 id (替换上游已有的 id)。
+
+    每个事件对应一条 ASGI 消息，续传时按序号跳过客户端已收到的事件；非 SSE 响应原样通过。
+    """
+
+    def __init__(self, stream_id: str):
+        self.prefix = f"{stream_id}-".encode()
+        self.seq = 0
+        self.sse: Optional[bool] = None
+        self.pending = b""
+
+    def __call__(self, message: dict) -> List[dict]:
+        if message["type"] == "http.response.start":
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+            self.sse = content_type.startswith(b"text/event-stream")
+            return [message]
+        if not self.sse or message["type"] != "http.response.body":
+            return [message]
+        parts = _EVENT_SEPARATOR.split(self.pending + message.get("body", b""))
+        self.pending = parts.pop()
+        out = [self._event(part) for part in parts if part]
+        if not message.get("more_body"):
+            if self.pending.strip():
+                out.append(self._event(self.pending))
+            self.pending = b""
+            out.append({"type": "http.response.body", "body": b"", "more_body": False})
+        return out
+
+    def _event(self, event: bytes) -> dict:
+        self.seq += 1
+        body = b"id: " + self.prefix + str(self.seq).encode() + b"\n" + _ID_LINE.sub(b"", event) + b"\n\n"
+        return {"type": "http.response.body", "body": body, "more_body": True}
+
+
+class ResumableStreamMiddleware:
+    """ASGI 中间件: 流式响应的事件带顺序 id，并在短时间内保留事件日志。
+
+    客户端断线后携带 Last-Event-ID 重新发起同一请求，从下一个事件继续接收 (生成仍在进行时实时跟随)；
+    所有客户端都断开后，应用在 detach_grace 秒后才会收到断开通知，短暂的网络抖动不会中止生成。
+    """
+
+    def __init__(self, app, store: IdempotencyStore, paths: Tuple[str, ...] = RESUMABLE_PATHS):
+        self.app = app
+        self.store = store
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        headers: Dict[bytes, bytes] = dict(scope["headers"])
+        last_event_id = headers.get(b"last-event-id")
+        if last_event_id is not None:
+            await self._resume(receive, send, headers, last_event_id.decode("latin-1"))
+            return
+
+        body = await read_body(receive)
+        if body is None:
+            return
+        if not _is_stream_request(body):
+            await self.app(scope, replay_body(body, receive), send)
+            return
+        stream_id = secrets.token_hex(8)
+        key = (caller_id(headers), stream_id)
+        execution, _ = self.store.begin(key, "")
+        completed = False
+        try:
+            completed = await run_execution(
+                self.app, scope, receive, send, body, execution, EventStamper(stream_id)
+            )
+        finally:
+            self.store.finish(key, execution, completed)
+
+    async def _resume(self, receive, send, headers: Dict[bytes, bytes], last_event_id: str) -> None:
+        parsed = parse_event_id(last_event_id)
+        execution = self.store.get((caller_id(headers), parsed[0])) if parsed else None
+        subscription = execution.subscribe() if execution is not None else None
+        if subscription is None:
+            await send_error(send, 409, "无法续传: 该事件流已过期或不存在，请去掉 Last-Event-ID 重新请求")
+            return
+        await follow_execution(receive, send, subscription, execution, skip=parsed[1])
@@ -0,0 +1,194 @@
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, TypeVar
+
+try:
+    from ..config.settings import MODEL_AFFINITY_ENABLED, MODEL_AFFINITY_TOLERANCE
+except ImportError:
+    from config.settings import MODEL_AFFINITY_ENABLED, MODEL_AFFINITY_TOLERANCE
+
+T = TypeVar("T")
+
+EWMA_ALPHA = 0.3
+# 尚无样本时假定的耗时 (秒)，让新 Worker 与已有样本的 Worker 可比
+DEFAULT_TTFT_S = 3.0
+DEFAULT_DURATION_S = 15.0
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous
+
+
+def normalize_model_id(model: Optional[str]) -> str:
+    return (model or "").split("/")[-1]
+
+
+@dataclass
+class WorkerLoad:
+    """网关侧的 Worker 负载视图: 在途请求数、Worker 上报的队列长度，以及服务耗时的 EWMA。
+
+    Worker 串行处理请求，因此一次请求的服务起点取分发时间与该 Worker 上一次完成时间的较晚者，
+    EWMA 只反映服务本身的快慢，不含排队等待。
+    """
+
+    inflight: int = 0
+    queue_depth: int = 0
+    ewma_ttft: Optional[float] = None
+    ewma_duration: Optional[float] = None
+    samples: int = 0
+    last_finish: float = 0.0
+    # 多进程网关中其他进程发往该 Worker 的在途请求
+    remote_inflight: int = 0
+
+    @property
+    def outstanding(self) -> int:
+        return max(self.inflight + self.remote_inflight, self.queue_depth)
+
+    def begin(self, now: float) -> float:
+        self.inflight += 1
+        return now
+
+    def finish(self, started: float, first_byte: Optional[float], finished: float, ok: bool = True) -> None:
+        self.inflight = max(0, self.inflight - 1)
+        if not ok:
+            return
+        service_start = max(started, self.last_finish)
+        ttft = max(0.0, first_byte - service_start) if first_byte is not None else None
+        self.observe(ttft, max(0.0, finished - service_start))
+        self.last_finish = max(self.last_finish, finished)
+
+    def observe(self, ttft: Optional[float], duration: float) -> None:
+        if ttft is not None:
+            self.ewma_ttft = _ewma(self.ewma_ttft, ttft)
+        self.ewma_duration = _ewma(self.ewma_duration, duration)
+        self.samples += 1
+
+    def expected_latency(self) -> float:
+        """排在当前在途请求之后的预计首字延迟"""
+        duration = DEFAULT_DURATION_S if self.ewma_duration is None else self.ewma_duration
+        ttft = DEFAULT_TTFT_S if self.ewma_ttft is None else self.ewma_ttft
+        return self.outstanding * duration + ttft
+
+    def to_dict(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "remote_inflight": self.remote_inflight,
+            "queue_depth": self.queue_depth,
+            "ewma_ttft_ms": round(self.ewma_ttft * 1000, 1) if self.ewma_ttft is not None else None,
+            "ewma_duration_ms": round(self.ewma_duration * 1000, 1) if self.ewma_duration is not None else None,
+            "samples": self.samples,
+        }
+
+
+# 均衡策略: (候选 Worker, 负载查询, 随机源) -> 选中的 Worker，候选顺序由调用方轮转
+def _round_robin(candidates: Sequence[T], stats: Callable[[T], WorkerLoad], rng: random.Random) -> T:
+    return candidates[0]
+
+
+def _least_outstanding(candidates: Sequence[T], stats: Callable[[T], WorkerLoad], rng: random.Random) -> T:
+    return min(candidates, key=lambda worker: stats(worker).outstanding)
+
+
+def _least_latency(candidates: Sequence[T], stats: Callable[[T], WorkerLoad], rng: random.Random) -> T:
+    return min(candidates, key=lambda worker: stats(worker).expected_latency())
+
+
+def _power_of_two(candidates: Sequence[T], stats: Callable[[T], WorkerLoad], rng: random.Random) -> T:
+    """随机抽取两个候选，取预计延迟较低者；避免所有网关进程同时涌向同一个"最优" Worker"""
+    if len(candidates) <= 2:
+        return _least_latency(candidates, stats, rng)
+    first, second = rng.sample(list(candidates), 2)
+    return first if stats(first).expected_latency() <= stats(second).expected_latency() else second
+
+
+BALANCING_STRATEGIES: Dict[str, Callable] = {
+    "round_robin": _round_robin,
+    "least_outstanding": _least_outstanding,
+    "least_latency": _least_latency,
+    "p2c": _power_of_two,
+}
+
+
+def get_balancing_strategy(name: str) -> Callable:
+    return BALANCING_STRATEGIES.get((name or "").lower(), _least_latency)
+
+
+def select_worker(
+    candidates: Sequence[T],
+    model: str,
+    load: Callable[[T], float],
+    current_model: Callable[[T], Optional[str]],
+    tolerance: Optional[int] = None,
+    pick: Optional[Callable[[Sequence[T]], T]] = None,
+) -> Optional[T]:
+    """按负载选择 Worker，并在容差范围内优先选择已加载目标模型的 Worker。
+
+    pick 为在候选集合内做最终选择的均衡策略，默认取负载最小者；负载相同时保留
+    candidates 的顺序，调用方可通过轮转 candidates 实现轮询。
+    """
+    if not candidates:
+        return None
+    pick = pick or (lambda pool: min(pool, key=load))
+    target = normalize_model_id(model)
+    if not MODEL_AFFINITY_ENABLED or not target:
+        return pick(candidates)
+    limit = min(load(worker) for worker in candidates) + (MODEL_AFFINITY_TOLERANCE if tolerance is None else tolerance)
+    warm = [
+        worker
+        for worker in candidates
+        if normalize_model_id(current_model(worker)) == target and load(worker) <= limit
+    ]
+    return pick(warm or candidates)
+
+
+class CircuitBreaker:
+    """单个 Worker 的熔断器: 连续失败达到阈值后打开，冷却后放行一个探测请求 (半开)，
+    探测成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 15.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+
+    def available(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return now - self.opened_at >= self.reset_timeout
+        return not self.probing
+
+    def on_dispatch(self, now: float) -> None:
+        if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open":
+            self.probing = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = now
+
+    def abandon(self) -> None:
+        """请求在得出结论前被取消 (如客户端断开)，释放半开探测名额"""
+        self.probing = False
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+        }
@@ -0,0 +1,198 @@
+import multiprocessing
+import struct
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    from .routing import CircuitBreaker
+except ImportError:
+    from worker.routing import CircuitBreaker
+
+# 多个网关进程共享的路由状态，存放在一块固定布局的共享内存中，所有修改都在同一把进程锁内完成:
+#   头部: 轮询游标、限流标记表的版本号
+#   Worker 槽位: Worker id、熔断器状态、每个网关进程各自的在途请求数 (进程重启时清零自己那一列)
+#   限流标记: (Worker id, 模型, 截止时间)
+MAX_GATEWAY_PROCESSES = 16
+MAX_WORKER_SLOTS = 128
+MAX_RATE_LIMIT_MARKS = 256
+MAX_KEY_BYTES = 64
+
+_HEADER = struct.Struct("<qq")
+_SLOT = struct.Struct(f"<{MAX_KEY_BYTES}siiiid{MAX_GATEWAY_PROCESSES}i")
+_INFLIGHT = 6
+_MARK = struct.Struct(f"<{MAX_KEY_BYTES}s{MAX_KEY_BYTES}sd")
+_SLOTS_OFFSET = _HEADER.size
+_MARKS_OFFSET = _SLOTS_OFFSET + MAX_WORKER_SLOTS * _SLOT.size
+SHARED_STATE_SIZE = _MARKS_OFFSET + MAX_RATE_LIMIT_MARKS * _MARK.size
+
+_BREAKER_STATES = ("closed", "open", "half_open")
+
+
+def _key(value: str) -> bytes:
+    return value.encode("utf-8")[:MAX_KEY_BYTES]
+
+
+class SharedRoutingState:
+    """网关进程间共享的轮询游标、在途请求数、熔断器状态和限流标记。
+
+    由主进程创建并传给子进程 (可 pickle，子进程按名称重新挂载)。Worker id 到槽位的映射
+    在各进程内缓存；槽位用尽时相应 Worker 退化为进程本地状态。
+    """
+
+    def __init__(self, name: Optional[str] = None, lock=None):
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=SHARED_STATE_SIZE)
+            self._shm.buf[:SHARED_STATE_SIZE] = bytes(SHARED_STATE_SIZE)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.lock = lock or multiprocessing.RLock()
+        self.process_index = 0
+        self._buf = self._shm.buf
+        self._slots: Dict[str, int] = {}
+        self._marks_version = -1
+        self._marks: Dict[Tuple[str, str], float] = {}
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getstate__(self):
+        return {"name": self.name, "lock": self.lock, "process_index": self.process_index}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["lock"])
+        self.process_index = state["process_index"]
+
+    def close(self) -> None:
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    # ---- 轮询游标 ----
+    def next_cursor(self) -> int:
+        with self.lock:
+            cursor, version = _HEADER.unpack_from(self._buf, 0)
+            _HEADER.pack_into(self._buf, 0, cursor + 1, version)
+        return cursor
+
+    # ---- Worker 槽位 ----
+    def _slot(self, worker_id: str) -> Optional[int]:
+        """返回槽位偏移；调用方需持有锁"""
+        offset = self._slots.get(worker_id)
+        if offset is not None:
+            return offset
+        key = _key(worker_id)
+        free = None
+        for index in range(MAX_WORKER_SLOTS):
+            offset = _SLOTS_OFFSET + index * _SLOT.size
+            stored = bytes(self._buf[offset:offset + MAX_KEY_BYTES]).rstrip(b"\0")
+            if stored == key:
+                self._slots[worker_id] = offset
+                return offset
+            if not stored:
+                free = offset
+                break
+        if free is None:
+            return None
+        _SLOT.pack_into(self._buf, free, key, 0, 0, 0, 0, 0.0, *([0] * MAX_GATEWAY_PROCESSES))
+        self._slots[worker_id] = free
+        return free
+
+    def _read_slot(self, worker_id: str):
+        offset = self._slot(worker_id)
+        if offset is None:
+            return None, None
+        return offset, list(_SLOT.unpack_from(self._buf, offset))
+
+    def add_inflight(self, worker_id: str, delta: int) -> None:
+        """调整本进程发往该 Worker 的在途请求数"""
+        with self.lock:
+            offset, fields = self._read_slot(worker_id)
+            if offset is None:
+                return
+            column = _INFLIGHT + self.process_index
+            fields[column] = max(0, fields[column] + delta)
+            _SLOT.pack_into(self._buf, offset, *fields)
+
+    def inflight(self, worker_id: str) -> int:
+        """所有网关进程发往该 Worker 的在途请求总数"""
+        with self.lock:
+            offset, fields = self._read_slot(worker_id)
+        return sum(fields[_INFLIGHT:]) if fields else 0
+
+    def reset_process(self, index: int) -> None:
+        """清零某个网关进程的在途计数 (该进程退出后，它的请求已不再占用 Worker)"""
+        with self.lock:
+            for slot in range(MAX_WORKER_SLOTS):
+                offset = _SLOTS_OFFSET + slot * _SLOT.size
+                fields = list(_SLOT.unpack_from(self._buf, offset))
+                if not fields[0].rstrip(b"\0"):
+                    break
+                fields[_INFLIGHT + index] = 0
+                _SLOT.pack_into(self._buf, offset, *fields)
+
+    @contextmanager
+    def breaker(self, worker_id: str, breaker: CircuitBreaker) -> Iterator[CircuitBreaker]:
+        """在锁内把共享的熔断器状态载入本地对象，操作完成后写回"""
+        with self.lock:
+            offset, fields = self._read_slot(worker_id)
+            if offset is None:
+                yield breaker
+                return
+            state, failures, probing, trips, opened_at = fields[1:_INFLIGHT]
+            breaker.state = _BREAKER_STATES[state]
+            breaker.failures = failures
+            breaker.probing = bool(probing)
+            breaker.trips = trips
+            breaker.opened_at = opened_at
+            yield breaker
+            fields[1:_INFLIGHT] = [
+                _BREAKER_STATES.index(breaker.state),
+                breaker.failures,
+                int(breaker.probing),
+                breaker.trips,
+                breaker.opened_at,
+            ]
+            _SLOT.pack_into(self._buf, offset, *fields)
+
+    # ---- 限流标记 ----
+    def mark_rate_limited(self, worker_id: str, model: str, until: float) -> None:
+        key, model_key = _key(worker_id), _key(model)
+        now = time.time()
+        with self.lock:
+            target = None
+            for index in range(MAX_RATE_LIMIT_MARKS):
+                offset = _MARKS_OFFSET + index * _MARK.size
+                stored_worker, stored_model, stored_until = _MARK.unpack_from(self._buf, offset)
+                if stored_worker.rstrip(b"\0") == key and stored_model.rstrip(b"\0") == model_key:
+                    target = offset
+                    break
+                if target is None and stored_until <= now:
+                    target = offset
+            if target is None:
+                return
+            _MARK.pack_into(self._buf, target, key, model_key, until)
+            cursor, version = _HEADER.unpack_from(self._buf, 0)
+            _HEADER.pack_into(self._buf, 0, cursor, version + 1)
+
+    def rate_limit_marks(self) -> Dict[Tuple[str, str], float]:
+        """未过期的限流标记；只在其他进程写入新标记后重新读取整张表"""
+        with self.lock:
+            _, version = _HEADER.unpack_from(self._buf, 0)
+            if version != self._marks_version:
+                marks = {}
+                for index in range(MAX_RATE_LIMIT_MARKS):
+                    worker, model, until = _MARK.unpack_from(self._buf, _MARKS_OFFSET + index * _MARK.size)
+                    if until:
+                        marks[(worker.rstrip(b"\0").decode("utf-8", "ignore"), model.rstrip(b"\0").decode("utf-8", "ignore"))] = until
+                self._marks, self._marks_version = marks, version
+        return self._marks
+
+    def is_rate_limited(self, worker_id: str, model: str, now: Optional[float] = None) -> bool:
+        until = self.rate_limit_marks().get((worker_id, model))
+        return until is not None and until > (time.time() if now is None else now)
+
@@ -0,0 +1,50 @@
+import os
+import socket
+import stat
+from typing import Optional
+
+# sockaddr_un.sun_path 的长度上限 (Linux 108 字节，macOS 104 字节，取较小值并留出结尾的 \0)
+MAX_UNIX_SOCKET_PATH = 103
+
+
+def unix_sockets_supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and os.name != "nt"
+
+
+def worker_socket_path(socket_dir: str, worker_id: str) -> Optional[str]:
+    """Worker 的 Unix 域套接字路径；平台不支持或路径超出长度上限时返回 None (回退到 TCP)"""
+    if not unix_sockets_supported():
+        return None
+    path = os.path.abspath(os.path.join(socket_dir, f"{worker_id}.sock"))
+    if len(path.encode()) > MAX_UNIX_SOCKET_PATH:
+        return None
+    return path
+
+
+def bind_unix_socket(path: str) -> socket.socket:
+    """绑定 Unix 域套接字: 清理上次异常退出遗留的套接字文件，只允许当前用户访问"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+        os.chmod(path, 0o600)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def bind_tcp_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((host, port))
+    except BaseException:
+        sock.close()
+        raise
+    return sock
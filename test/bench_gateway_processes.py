@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""多进程网关压测: 用桩 Worker 和桩 Manager 启动真实的 gateway.py，对比不同进程数下的 SSE 转发吞吐。
+
+用法: python bench_gateway_processes.py [--processes 1,2,4] [--workers 4] [--concurrency 64] [--duration 10]
+桩 Worker 立即返回 --chunks 个 SSE 帧，网关的转发开销成为瓶颈；吞吐应随网关进程数近似线性增长，
+直到压测客户端、桩 Worker 与网关争用同一批 CPU 核心为止 (建议核心数 >= 网关进程数 + 2)。
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import aiohttp
+from aiohttp import web
+
+SOURCE_ROOT = Path(__file__).resolve().parents[1] / "src"
+GATEWAY_ENTRYPOINT = SOURCE_ROOT / "gateway.py"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run_stubs(manager_port: int, worker_ports: List[int], chunks: int, chunk_bytes: int) -> None:
+    frame = b"data: " + json.dumps({
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {"content": "x" * chunk_bytes}}],
+    }).encode() + b"\n\n"
+
+    async def completions(request):
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for _ in range(chunks):
+            await response.write(frame)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def workers(request):
+        return web.json_response([
+            {"id": f"w{index + 1}", "port": port, "status": "running"}
+            for index, port in enumerate(worker_ports)
+        ])
+
+    async def serve():
+        manager = web.Application()
+        manager.router.add_get("/api/workers", workers)
+        runners = [web.AppRunner(manager)]
+        for _ in worker_ports:
+            app = web.Application()
+            app.router.add_post("/v1/chat/completions", completions)
+            runners.append(web.AppRunner(app, access_log=None))
+        for runner, port in zip(runners, [manager_port, *worker_ports]):
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def _load(url: str, concurrency: int, duration: float) -> dict:
+    body = json.dumps({"model": "gemini-2.5-pro", "stream": True, "messages": [{"role": "user", "content": "hi"}]})
+    deadline = time.monotonic() + duration
+    completed = failed = received = 0
+
+    async def client(session):
+        nonlocal completed, failed, received
+        while time.monotonic() < deadline:
+            try:
+                async with session.post(url, data=body, headers={"Content-Type": "application/json"}) as response:
+                    async for data in response.content.iter_any():
+                        received += len(data)
+                    completed += response.status == 200
+                    failed += response.status != 200
+            except aiohttp.ClientError:
+                failed += 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    return {"completed": completed, "failed": failed, "bytes": received}
+
+
+def _load_process(url: str, concurrency: int, duration: float, results) -> None:
+    results.put(asyncio.run(_load(url, concurrency, duration)))
+
+
+def _wait_ready(port: int, timeout: float = 20) -> None:
+    async def probe():
+        deadline = time.monotonic() + timeout
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                try:
+                    async with session.get(f"http://127.0.0.1:{port}/") as response:
+                        if response.status == 200 and (await response.json()).get("workers"):
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError("gateway did not become ready")
+
+    asyncio.run(probe())
+
+
+def run_case(processes: int, args, manager_port: int) -> dict:
+    port = _free_port()
+    gateway = subprocess.Popen(
+        [sys.executable, str(GATEWAY_ENTRYPOINT), "--port", str(port), "--processes", str(processes),
+         "--manager-url", f"http://127.0.0.1:{manager_port}"],
+        cwd=SOURCE_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port)
+        results = multiprocessing.Queue()
+        per_client = max(1, args.concurrency // args.clients)
+        loaders = [
+            multiprocessing.Process(
+                target=_load_process,
+                args=(f"http://127.0.0.1:{port}/v1/chat/completions", per_client, args.duration, results),
+            )
+            for _ in range(args.clients)
+        ]
+        for loader in loaders:
+            loader.start()
+        totals = {"completed": 0, "failed": 0, "bytes": 0}
+        for _ in loaders:
+            for key, value in results.get().items():
+                totals[key] += value
+        for loader in loaders:
+            loader.join()
+    finally:
+        gateway.terminate()
+        gateway.wait(10)
+    return {
+        "processes": processes,
+        "req_per_s": totals["completed"] / args.duration,
+        "mib_per_s": totals["bytes"] / args.duration / 1024 / 1024,
+        "failed": totals["failed"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", default="1,2,4", help="comma separated gateway process counts")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--chunk-bytes", type=int, default=64)
+    args = parser.parse_args()
+
+    manager_port = _free_port()
+    worker_ports = [_free_port() for _ in range(args.workers)]
+    stubs = multiprocessing.Process(
+        target=_run_stubs, args=(manager_port, worker_ports, args.chunks, args.chunk_bytes), daemon=True
+    )
+    stubs.start()
+    print(f"cpu cores: {os.cpu_count()}, stub workers: {args.workers}, concurrency: {args.concurrency}")
+    print(f"{'processes':>10}{'req/s':>12}{'MiB/s':>10}{'failed':>8}")
+    baseline = None
+    try:
+        for processes in [int(value) for value in args.processes.split(",")]:
+            result = run_case(processes, args, manager_port)
+            baseline = baseline or result["req_per_s"]
+            print(
+                f"{result['processes']:>10}{result['req_per_s']:>12.1f}{result['mib_per_s']:>10.1f}"
+                f"{result['failed']:>8}   x{result['req_per_s'] / baseline:.2f}"
+            )
+    finally:
+        stubs.terminate()
+
+
+if __name__ == "__main__":
+    main()
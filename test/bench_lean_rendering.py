@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""精简渲染模式基准测试: 在本地替身页面上对比默认渲染与精简渲染的每请求 CPU 时间和 RSS。
+
+用法: python bench_lean_rendering.py [--requests 20] [--history 40] [--chunks 200]
+CPU/RSS 通过 /proc 统计浏览器进程树，仅支持 Linux。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+SOURCE_ROOT = Path(__file__).resolve().parents[1] / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+from playwright.async_api import async_playwright
+
+from browser import lean_rendering
+
+STAND_IN_URL = "http://aistudio.stand-in.local/prompts/new_chat"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+STAND_IN_HTML = """<!doctype html>
+<html><head><style>
+  body { font-family: sans-serif; margin: 0; }
+  ms-chat-turn { display: block; padding: 12px; border-bottom: 1px solid #ddd; transition: background 0.3s, transform 0.3s; }
+  ms-chat-turn:hover { background: #f5f5f5; transform: translateX(2px); }
+  ms-chat-turn .chat-turn-container { animation: fade-in 0.4s ease-out; box-shadow: 0 2px 8px rgba(0,0,0,.15); }
+  pre { background: #272822; color: #f8f8f2; padding: 8px; white-space: pre-wrap; }
+  .kw { color: #f92672; } .str { color: #e6db74; } .num { color: #ae81ff; }
+  .spinner { width: 24px; height: 24px; border: 3px solid #ccc; border-top-color: #1a73e8; border-radius: 50%;
+             animation: spin 0.8s linear infinite; }
+  @keyframes spin { to { transform: rotate(360deg); } }
+  @keyframes fade-in { from { opacity: 0; transform: translateY(8px); } to { opacity: 1; transform: none; } }
+</style></head>
+<body><div id="history"></div><div class="spinner" id="spinner" hidden></div>
+<script>
+  const highlight = (line, i) => line.replace(/(const|return|function)/g, '<span class="kw">$1</span>')
+    .replace(/('[^']*')/g, '<span class="str">$1</span>') + ` <span class="num">${i}</span>`;
+  const codeBlock = (lines) => '<ms-code-block><pre>' +
+    Array.from({length: lines}, (_, i) => highlight(`const value${i} = compute('item', ${i}); return value${i};`, i)).join('\\n') +
+    '</pre></ms-code-block>';
+  const addTurn = (role, html) => {
+    const turn = document.createElement('ms-chat-turn');
+    turn.innerHTML = `<div class="chat-turn-container ${role}"><div class="turn-content">${html}</div></div>`;
+    document.getElementById('history').appendChild(turn);
+    turn.scrollIntoView({behavior: 'smooth'});
+    return turn.querySelector('.turn-content');
+  };
+  window.seedHistory = (turns) => {
+    for (let i = 0; i < turns; i++) {
+      addTurn(i % 2 ? 'model' : 'user', i % 2 ? `<p>${'Answer text. '.repeat(80)}</p>` + codeBlock(40) : `<p>Question ${i}</p>`);
+    }
+  };
+  window.runRequest = (chunks) => new Promise((resolve) => {
+    addTurn('user', '<p>next question</p>');
+    const target = addTurn('model', '');
+    const spinner = document.getElementById('spinner');
+    spinner.hidden = false;
+    let sent = 0;
+    const tick = () => {
+      sent += 1;
+      const markdown = target.innerHTML + `<p>chunk ${sent} ${'lorem ipsum '.repeat(6)}</p>`;
+      target.innerHTML = sent % 25 === 0 ? markdown + codeBlock(10) : markdown;
+      if (sent < chunks) { setTimeout(tick, 5); } else { spinner.hidden = true; resolve(sent); }
+    };
+    tick();
+  });
+</script></body></html>"""
+
+
+def _descendant_pids(root_pid: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    result, stack = [], [root_pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+
+def _process_tree_usage() -> Dict[str, float]:
+    cpu_seconds, rss_kb = 0.0, 0
+    for pid in _descendant_pids(os.getpid()):
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/status", "r") as f:
+                rss_line = next((line for line in f if line.startswith("VmRSS:")), "VmRSS: 0 kB")
+        except OSError:
+            continue
+        cpu_seconds += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        rss_kb += int(rss_line.split()[1])
+    return {"cpu": cpu_seconds, "rss_mb": rss_kb / 1024}
+
+
+async def run_mode(playwright, lean: bool, args) -> Dict[str, float]:
+    browser = await playwright.firefox.launch(
+        headless=True, firefox_user_prefs=lean_rendering.LEAN_FIREFOX_PREFS if lean else {}
+    )
+    context_options = {
+        "viewport": {"width": 1920, "height": 1080},
+        "screen": {"width": 1920, "height": 1080},
+        "device_scale_factor": 1,
+    }
+    if lean:
+        lean_rendering.apply_lean_context_options(context_options)
+    context = await browser.new_context(**context_options)
+    if lean:
+        await context.add_init_script(lean_rendering.build_lean_init_script(args.keep_turns))
+    await context.route(
+        "**/aistudio.stand-in.local/**",
+        lambda route: route.fulfill(status=200, content_type="text/html", body=STAND_IN_HTML),
+    )
+    page = await context.new_page()
+    await page.goto(STAND_IN_URL)
+    await page.evaluate("turns => window.seedHistory(turns)", args.history)
+
+    peak_rss = 0.0
+    before = _process_tree_usage()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        await page.evaluate("chunks => window.runRequest(chunks)", args.chunks)
+        await page.locator("ms-chat-turn").last.inner_text()
+        peak_rss = max(peak_rss, _process_tree_usage()["rss_mb"])
+    elapsed = time.perf_counter() - started
+    after = _process_tree_usage()
+    await browser.close()
+    return {
+        "cpu_ms_per_request": (after["cpu"] - before["cpu"]) * 1000 / args.requests,
+        "wall_ms_per_request": elapsed * 1000 / args.requests,
+        "peak_rss_mb": peak_rss,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Lean rendering benchmark")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--history", type=int, default=40, help="预置的历史对话轮次数")
+    parser.add_argument("--chunks", type=int, default=200, help="每个请求流式追加的片段数")
+    parser.add_argument("--keep-turns", type=int, default=4)
+    args = parser.parse_args()
+    if not os.path.isdir("/proc"):
+        print("此基准测试依赖 /proc，仅支持 Linux")
+        return 1
+
+    async with async_playwright() as playwright:
+        results = {
+            "default": await run_mode(playwright, False, args),
+            "lean": await run_mode(playwright, True, args),
+        }
+
+    print(f"{'mode':<10}{'cpu ms/req':>14}{'wall ms/req':>14}{'peak RSS MB':>14}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<10}{stats['cpu_ms_per_request']:>14.1f}"
+            f"{stats['wall_ms_per_request']:>14.1f}{stats['peak_rss_mb']:>14.1f}"
+        )
+    baseline = results["default"]["cpu_ms_per_request"]
+    if baseline:
+        saved = 1 - results["lean"]["cpu_ms_per_request"] / baseline
+        print(f"\nCPU per request: {saved * 100:+.1f}% saved with lean rendering")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""网关请求体字段提取基准: 对比 json.loads 完整解析与 scan_request_fields 只扫描路由字段的耗时。
+
+用法: python bench_request_scan.py [--image-kb 2048] [--images 2] [--repeat 50]
+请求体模拟 OpenAI 格式的多图请求，model/stream 放在 messages 之后 (最不利的顺序)。
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+SOURCE_ROOT = Path(__file__).resolve().parents[1] / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+from worker.request_fields import scan_request_fields
+
+
+def build_body(image_kb: int, images: int, turns: int) -> bytes:
+    image = base64.b64encode(os.urandom(image_kb * 1024)).decode()
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " * 20} for i in range(turns)]
+    messages.append({"role": "user", "content": [{"type": "text", "text": "describe"}] + [
+        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image}"}} for _ in range(images)
+    ]})
+    return json.dumps({"messages": messages, "temperature": 0.7, "stream": True, "model": "gemini-2.5-pro"}).encode()
+
+
+def measure(func, body: bytes, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(body)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image-kb", type=int, default=2048)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    body = build_body(args.image_kb, args.images, args.turns)
+    assert scan_request_fields(body) == {"stream": True, "model": "gemini-2.5-pro"}
+    full = measure(json.loads, body, args.repeat)
+    scan = measure(scan_request_fields, body, args.repeat)
+    print(f"body size: {len(body) / 1024 / 1024:.1f} MiB")
+    print(f"{'json.loads':<22}{full:>10.3f} ms/request")
+    print(f"{'scan_request_fields':<22}{scan:>10.3f} ms/request  ({full / scan:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
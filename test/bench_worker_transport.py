@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""网关到 Worker 的传输方式压测: 桩 Worker 同时监听 TCP 端口和 Unix 域套接字，分别通过真实的 gateway.py 转发 SSE。
+
+用法: python bench_worker_transport.py [--concurrency 32] [--duration 10] [--chunks 400] [--latency-requests 300]
+每种传输方式先测顺序请求的首字节/完成延迟 (p50/p99)，再测并发下的转发吞吐；桩 Manager 只在 uds 用例中登记套接字路径。
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+import aiohttp
+from aiohttp import web
+
+from bench_gateway_processes import GATEWAY_ENTRYPOINT, SOURCE_ROOT, _free_port, _wait_ready
+
+
+def _run_stubs(manager_port: int, worker_port: int, socket_path: str, chunks: int, chunk_bytes: int, announce) -> None:
+    frame = b"data: " + json.dumps({
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {"content": "x" * chunk_bytes}}],
+    }).encode() + b"\n\n"
+
+    async def completions(request):
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for _ in range(chunks):
+            await response.write(frame)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def workers(request):
+        worker = {"id": "w1", "port": worker_port, "status": "running"}
+        if announce.value:
+            worker["socket"] = socket_path
+        return web.json_response([worker])
+
+    async def serve():
+        manager = web.Application()
+        manager.router.add_get("/api/workers", workers)
+        manager_runner = web.AppRunner(manager)
+        await manager_runner.setup()
+        await web.TCPSite(manager_runner, "127.0.0.1", manager_port).start()
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", completions)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", worker_port).start()
+        await web.UnixSite(runner, socket_path).start()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def _latency(url: str, requests: int) -> dict:
+    body = json.dumps({"model": "gemini-2.5-pro", "stream": True, "messages": [{"role": "user", "content": "hi"}]})
+    first_bytes: List[float] = []
+    totals: List[float] = []
+    async with aiohttp.ClientSession() as session:
+        for _ in range(requests):
+            started = time.perf_counter()
+            async with session.post(url, data=body, headers={"Content-Type": "application/json"}) as response:
+                first = None
+                async for _ in response.content.iter_any():
+                    first = first or time.perf_counter()
+            totals.append((time.perf_counter() - started) * 1000)
+            first_bytes.append(((first or time.perf_counter()) - started) * 1000)
+
+    def p99(values):
+        return statistics.quantiles(values, n=100)[98] if len(values) > 1 else values[0]
+
+    return {
+        "ttfb_p50": statistics.median(first_bytes),
+        "ttfb_p99": p99(first_bytes),
+        "total_p50": statistics.median(totals),
+        "total_p99": p99(totals),
+    }
+
+
+async def _throughput(url: str, concurrency: int, duration: float) -> dict:
+    body = json.dumps({"model": "gemini-2.5-pro", "stream": True, "messages": [{"role": "user", "content": "hi"}]})
+    deadline = time.monotonic() + duration
+    completed = failed = received = 0
+
+    async def client(session):
+        nonlocal completed, failed, received
+        while time.monotonic() < deadline:
+            try:
+                async with session.post(url, data=body, headers={"Content-Type": "application/json"}) as response:
+                    async for data in response.content.iter_any():
+                        received += len(data)
+                    completed += response.status == 200
+                    failed += response.status != 200
+            except aiohttp.ClientError:
+                failed += 1
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    return {
+        "req_per_s": completed / duration,
+        "mib_per_s": received / duration / 1024 / 1024,
+        "failed": failed,
+    }
+
+
+def run_case(transport: str, args, manager_port: int, announce) -> dict:
+    announce.value = transport == "uds"
+    port = _free_port()
+    gateway = subprocess.Popen(
+        [sys.executable, str(GATEWAY_ENTRYPOINT), "--port", str(port),
+         "--manager-url", f"http://127.0.0.1:{manager_port}"],
+        cwd=SOURCE_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(port)
+        url = f"http://127.0.0.1:{port}/v1/chat/completions"
+        result = asyncio.run(_latency(url, args.latency_requests))
+        result.update(asyncio.run(_throughput(url, args.concurrency, args.duration)))
+    finally:
+        gateway.terminate()
+        gateway.wait(10)
+    return {"transport": transport, **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency-requests", type=int, default=300)
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--chunk-bytes", type=int, default=64)
+    args = parser.parse_args()
+
+    manager_port, worker_port = _free_port(), _free_port()
+    socket_dir = tempfile.mkdtemp(prefix="gw-bench-")
+    socket_path = os.path.join(socket_dir, "w1.sock")
+    announce = multiprocessing.Value("b", 0)
+    stubs = multiprocessing.Process(
+        target=_run_stubs,
+        args=(manager_port, worker_port, socket_path, args.chunks, args.chunk_bytes, announce),
+        daemon=True,
+    )
+    stubs.start()
+    print(f"cpu cores: {os.cpu_count()}, chunks/request: {args.chunks}, concurrency: {args.concurrency}")
+    print(
+        f"{'transport':>10}{'ttfb p50':>10}{'ttfb p99':>10}{'total p50':>11}{'total p99':>11}"
+        f"{'req/s':>10}{'MiB/s':>8}{'failed':>8}"
+    )
+    try:
+        for transport in ("tcp", "uds"):
+            result = run_case(transport, args, manager_port, announce)
+            print(
+                f"{result['transport']:>10}{result['ttfb_p50']:>8.2f}ms{result['ttfb_p99']:>8.2f}ms"
+                f"{result['total_p50']:>9.2f}ms{result['total_p99']:>9.2f}ms"
+                f"{result['req_per_s']:>10.1f}{result['mib_per_s']:>8.1f}{result['failed']:>8}"
+            )
+    finally:
+        stubs.terminate()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        os.rmdir(socket_dir)
+
+
+if __name__ == "__main__":
+    main()
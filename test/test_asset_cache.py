@@ -0,0 +1,141 @@
+import importlib
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+asset_cache_module = importlib.import_module("browser.asset_cache")
+AssetCache = asset_cache_module.AssetCache
+
+STATIC_URL = "https://www.gstatic.com/_/mss/boq-makersuite/_/js/k=main.js"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeResponse:
+    def __init__(self, body, cache_control="public, max-age=31536000, immutable"):
+        self.status = 200
+        self.headers = {
+            "content-type": "text/javascript",
+            "cache-control": cache_control,
+            "content-encoding": "br",
+        }
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+class FakeRoute:
+    def __init__(self, url, response=None):
+        self.request = SimpleNamespace(url=url, method="GET")
+        self._response = response
+        self.fetch_count = 0
+        self.fulfilled = None
+
+    async def fetch(self):
+        self.fetch_count += 1
+        return self._response
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    async def continue_(self):
+        pass
+
+
+def _cache(tmp_path, max_bytes=1024 * 1024):
+    return AssetCache(str(tmp_path), max_bytes, r"^https://www\.gstatic\.com/")
+
+
+@pytest.mark.anyio
+async def test_miss_stores_immutable_asset_and_next_worker_hits(tmp_path):
+    first = _cache(tmp_path)
+    miss_route = FakeRoute(STATIC_URL, FakeResponse(b"console.log(1)"))
+    await first.handle_route(miss_route)
+
+    assert miss_route.fetch_count == 1
+    assert first.stats["stored"] == 1
+
+    second = _cache(tmp_path)
+    hit_route = FakeRoute(STATIC_URL)
+    await second.handle_route(hit_route)
+
+    assert hit_route.fetch_count == 0
+    assert hit_route.fulfilled["body"] == b"console.log(1)"
+    assert "content-encoding" not in hit_route.fulfilled["headers"]
+    assert second.stats["hits"] == 1
+
+
+@pytest.mark.anyio
+async def test_revalidated_assets_are_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    route = FakeRoute(STATIC_URL, FakeResponse(b"x", cache_control="no-cache"))
+
+    await cache.handle_route(route)
+
+    assert cache.stats["stored"] == 0
+    assert cache.stats["uncacheable"] == 1
+    assert cache.load(STATIC_URL) is None
+
+
+@pytest.mark.anyio
+async def test_max_age_entries_expire_but_immutable_ones_do_not(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    versioned_url = STATIC_URL + "?v=2"
+    await cache.handle_route(FakeRoute(STATIC_URL, FakeResponse(b"a", cache_control="public, max-age=86400")))
+    await cache.handle_route(FakeRoute(versioned_url, FakeResponse(b"b")))
+    assert cache.stats["stored"] == 2
+    assert cache.load(STATIC_URL) is not None
+
+    later = time.time() + 86400 + 1
+    monkeypatch.setattr(asset_cache_module, "time", SimpleNamespace(time=lambda: later))
+    assert cache.load(STATIC_URL) is None
+    assert cache.load(versioned_url) is not None
+
+    refetch = FakeRoute(STATIC_URL, FakeResponse(b"a2", cache_control="public, max-age=86400"))
+    await cache.handle_route(refetch)
+    assert refetch.fetch_count == 1
+    assert cache.load(STATIC_URL)[1] == b"a2"
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    cache = _cache(tmp_path)
+    headers = {"content-type": "text/css"}
+    for index in range(3):
+        cache.store(f"https://www.gstatic.com/{index}.css", 200, headers, b"x" * 10)
+    old_body, _ = cache._paths("https://www.gstatic.com/0.css")
+    past = time.time() - 100
+    os.utime(old_body, (past, past))
+    cache.load("https://www.gstatic.com/1.css")
+    cache.max_bytes = 25
+
+    assert cache.evict() == 1
+    assert cache.load("https://www.gstatic.com/0.css") is None
+    assert cache.load("https://www.gstatic.com/2.css") is not None
+
+
+def test_navigation_is_classified_warm_or_cold(tmp_path):
+    cache = _cache(tmp_path)
+
+    snapshot = cache.snapshot()
+    cache.stats["stored"] += 2
+    cache.record_navigation(snapshot, 1.5)
+    snapshot = cache.snapshot()
+    cache.stats["hits"] += 5
+    cache.record_navigation(snapshot, 0.5)
+
+    navigation = cache.get_stats()["navigation"]
+    assert navigation["cold"] == {"count": 1, "avg_ms": 1500.0}
+    assert navigation["warm"] == {"count": 1, "avg_ms": 500.0}
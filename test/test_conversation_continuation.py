@@ -0,0 +1,105 @@
+import importlib
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+conversation = importlib.import_module("api.conversation")
+Message = importlib.import_module("models").Message
+
+
+def _history():
+    return [
+        Message(role="system", content="You are terse."),
+        Message(role="user", content="hello"),
+    ]
+
+
+def _recorded_state(messages, model="gemini-2.5-pro", reply="hi"):
+    state = {}
+    conversation.record_conversation_state(
+        state,
+        messages,
+        None,
+        model,
+        model,
+        "https://aistudio.google.com/prompts/abc",
+        2,
+        reply,
+    )
+    return state
+
+
+def test_extension_returns_only_new_user_turn():
+    history = _history()
+    state = _recorded_state(history)
+    follow_up = history + [
+        Message(role="assistant", content="hi"),
+        Message(role="user", content="how are you?"),
+    ]
+
+    new_messages = conversation.find_continuation_messages(
+        follow_up, None, "gemini-2.5-pro", state
+    )
+
+    assert [m.content for m in new_messages] == ["how are you?"]
+
+
+def test_edited_prefix_or_other_model_falls_back_to_full_replay():
+    history = _history()
+    state = _recorded_state(history)
+    edited = [
+        Message(role="system", content="You are verbose."),
+        Message(role="user", content="hello"),
+        Message(role="assistant", content="hi"),
+        Message(role="user", content="how are you?"),
+    ]
+    follow_up = history + [
+        Message(role="assistant", content="hi"),
+        Message(role="user", content="how are you?"),
+    ]
+
+    assert conversation.find_continuation_messages(edited, None, "gemini-2.5-pro", state) is None
+    assert conversation.find_continuation_messages(follow_up, None, "gemini-2.5-flash", state) is None
+    assert conversation.find_continuation_messages(history, None, "gemini-2.5-pro", state) is None
+
+
+def test_tool_turns_are_not_continued():
+    history = _history()
+    state = _recorded_state(history)
+    follow_up = history + [
+        Message(role="assistant", content="calling"),
+        Message(role="tool", content="{}", tool_call_id="call_1"),
+        Message(role="user", content="thanks"),
+    ]
+
+    assert conversation.find_continuation_messages(follow_up, None, "gemini-2.5-pro", state) is None
+
+
+def test_state_is_not_recorded_without_page_turns():
+    state = {"prefix_hash": "stale"}
+    conversation.record_conversation_state(
+        state, _history(), None, "m", "m", "https://aistudio.google.com/prompts/abc", 0, "hi"
+    )
+    assert state == {}
+
+
+def test_edited_or_regenerated_assistant_turn_falls_back_to_full_replay():
+    history = _history()
+    state = _recorded_state(history, reply="hi there\n")
+    follow_up = history + [
+        Message(role="assistant", content="hi there"),
+        Message(role="user", content="how are you?"),
+    ]
+    edited = history + [
+        Message(role="assistant", content="hello, friend"),
+        Message(role="user", content="how are you?"),
+    ]
+
+    assert conversation.find_continuation_messages(follow_up, None, "gemini-2.5-pro", state) is not None
+    assert conversation.find_continuation_messages(edited, None, "gemini-2.5-pro", state) is None
+    # 未记录到页面回复时不保存状态
+    assert _recorded_state(history, reply=None) == {}
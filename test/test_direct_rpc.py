@@ -0,0 +1,63 @@
+import importlib
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+direct_rpc = importlib.import_module("browser.direct_rpc")
+models = importlib.import_module("models")
+Message = models.Message
+
+
+def test_build_contents_maps_roles_and_skips_system():
+    contents = direct_rpc.build_contents(
+        [
+            Message(role="system", content="be terse"),
+            Message(role="user", content=" hi "),
+            Message(role="assistant", content="hello"),
+            Message(role="user", content=[{"type": "text", "text": "again"}]),
+        ]
+    )
+
+    assert contents == [
+        [[[None, "hi"]], "user"],
+        [[[None, "hello"]], "model"],
+        [[[None, "again"]], "user"],
+    ]
+
+
+def test_build_contents_rejects_images_and_tool_messages():
+    image_message = Message(
+        role="user",
+        content=[{"type": "image_url", "image_url": {"url": "data:image/png;base64,AA=="}}],
+    )
+    tool_message = Message(role="tool", content="{}", tool_call_id="call_1")
+
+    assert direct_rpc.build_contents([image_message]) is None
+    assert direct_rpc.build_contents([Message(role="user", content="x"), tool_message]) is None
+    assert direct_rpc.build_contents([Message(role="assistant", content="x")]) is None
+
+
+def test_build_payload_keeps_template_fields():
+    template_body = ["models/old", [[[[None, "old"]], "user"]], None, [1, None, 0.5]]
+    contents = [[[[None, "new"]], "user"]]
+
+    body = direct_rpc.build_payload(template_body, "gemini-2.5-pro", contents)
+
+    assert body == ["models/gemini-2.5-pro", contents, None, [1, None, 0.5]]
+    assert template_body[0] == "models/old"
+
+
+def test_template_matches_requires_same_model_system_and_params():
+    params_key = direct_rpc.compute_params_key({"temperature": 0.2, "messages": []})
+    template = {"model_id": "m", "system_hash": "h", "params_key": params_key}
+
+    assert direct_rpc.template_matches(template, "m", "h", params_key)
+    assert not direct_rpc.template_matches(template, "m", "other", params_key)
+    assert not direct_rpc.template_matches(
+        template, "m", "h", direct_rpc.compute_params_key({"temperature": 0.3})
+    )
+    assert not direct_rpc.template_matches(None, "m", "h", params_key)
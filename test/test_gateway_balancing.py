@@ -0,0 +1,83 @@
+import importlib
+import random
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+TEST_ROOT = PROJECT_ROOT / "test"
+for path in (SOURCE_ROOT, TEST_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+routing = importlib.import_module("worker.routing")
+gateway = importlib.import_module("gateway")
+bench = importlib.import_module("bench_gateway_balancing")
+
+
+def test_worker_load_excludes_queue_wait_from_ewma():
+    load = routing.WorkerLoad()
+    first = load.begin(0.0)
+    second = load.begin(0.0)
+    assert load.outstanding == 2
+
+    load.finish(first, 2.0, 10.0)
+    # 第二个请求在第一个完成后才开始服务，排队的 10 秒不计入耗时
+    load.finish(second, 12.0, 20.0)
+
+    assert load.inflight == 0
+    assert load.samples == 2
+    assert abs(load.ewma_duration - 10.0) < 1e-9
+    assert abs(load.ewma_ttft - 2.0) < 1e-9
+
+
+def test_failed_request_releases_without_sample():
+    load = routing.WorkerLoad()
+    started = load.begin(0.0)
+    load.finish(started, None, 1.0, ok=False)
+
+    assert load.inflight == 0
+    assert load.samples == 0
+
+
+def test_least_latency_prefers_fast_worker_over_idle_slow_one():
+    fast, slow = routing.WorkerLoad(), routing.WorkerLoad()
+    fast.observe(1.0, 5.0)
+    fast.inflight = 1
+    slow.observe(8.0, 30.0)
+    loads = {"fast": fast, "slow": slow}
+    pick = routing.get_balancing_strategy("least_latency")
+
+    assert pick(["slow", "fast"], loads.get, random.Random(0)) == "fast"
+    assert routing.get_balancing_strategy("least_outstanding")(["slow", "fast"], loads.get, random.Random(0)) == "slow"
+
+
+def test_unknown_strategy_falls_back_to_default():
+    assert routing.get_balancing_strategy("bogus") is routing.BALANCING_STRATEGIES["least_latency"]
+
+
+def test_gateway_tracks_worker_load(monkeypatch):
+    monkeypatch.setitem(gateway._worker_cache, "workers", [
+        {"id": "w1", "port": 3001},
+        {"id": "w2", "port": 3002},
+    ])
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+
+    busy = gateway.get_next_worker()
+    started = gateway._acquire_worker(busy["id"])
+    other = gateway.get_next_worker()
+    assert other["id"] != busy["id"]
+
+    gateway._release_worker(busy["id"], started, started + 0.5, ok=True)
+    assert gateway._worker_loads[busy["id"]].inflight == 0
+    assert gateway._worker_loads[busy["id"]].samples == 1
+
+
+def test_simulation_is_deterministic_and_beats_round_robin():
+    speeds = bench.SCENARIOS["one slow worker"]["speeds"]
+    round_robin = bench.simulate("round_robin", speeds, requests=600)
+    latency = bench.simulate("least_latency", speeds, requests=600)
+
+    assert latency == bench.simulate("least_latency", speeds, requests=600)
+    assert latency["p99_s"] < round_robin["p99_s"]
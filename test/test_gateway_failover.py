@@ -0,0 +1,176 @@
+import asyncio
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from fastapi import HTTPException
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+routing = importlib.import_module("worker.routing")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeRequest:
+    def __init__(self, payload, headers=None):
+        self._body = json.dumps(payload).encode()
+        self.headers = headers or {}
+
+    async def body(self):
+        return self._body
+
+    async def is_disconnected(self):
+        return False
+
+
+async def _broken(request):
+    return web.Response(status=500, text="boom")
+
+
+async def _rate_limited(request):
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    frame = {
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {"content": "\n\n[System: Rate Limit Exceeded - You exceeded quota]"}, "finish_reason": "stop"}],
+    }
+    payload = f"data: {json.dumps(frame)}\n\n".encode()
+    # 状态帧被拆成两个 TCP 分片
+    await response.write(payload[:40])
+    await response.write(payload[40:])
+    return response
+
+
+async def _healthy(request):
+    payload = await request.json()
+    if not payload.get("stream"):
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await response.write(b": keepalive\n\n")
+    await response.write(b'data: {"content": "hello"}\n\n')
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+@pytest.fixture
+async def fake_workers(monkeypatch):
+    runners, workers = [], []
+    for worker_id, handler in (("w1", _broken), ("w2", _rate_limited), ("w3", _healthy)):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        runners.append(runner)
+        workers.append({"id": worker_id, "port": port, "status": "running"})
+
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": workers, "last_update": 0, "index": 0})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_breakers", {})
+    # 固定按 id 顺序选择，使尝试顺序可预测: w1 (500) -> w2 (限流) -> w3 (正常)
+    monkeypatch.setattr(gateway, "_balancing_strategy", lambda pool, stats, rng: min(pool, key=lambda w: w["id"]))
+    reported = []
+
+    async def fake_report(worker_id, model):
+        reported.append((worker_id, model))
+
+    monkeypatch.setattr(gateway, "report_rate_limit", fake_report)
+    yield reported
+    await gateway.close_session()
+    for runner in runners:
+        await runner.cleanup()
+
+
+@pytest.mark.anyio
+async def test_stream_fails_over_before_first_byte(fake_workers):
+    response = await gateway.chat_completions(
+        FakeRequest({"model": "gemini-2.5-pro", "stream": True})
+    )
+    body = b"".join([chunk async for chunk in response.body_iterator])
+
+    assert b"hello" in body
+    assert body.startswith(b": keepalive")
+    await asyncio.sleep(0)
+    assert fake_workers == [("w2", "gemini-2.5-pro")]
+    assert gateway._breakers["w1"].failures == 1
+    assert gateway._breakers["w2"].failures == 0
+    assert all(load.inflight == 0 for load in gateway._worker_loads.values())
+
+
+@pytest.mark.anyio
+async def test_non_stream_fails_over_and_reports_exhaustion(fake_workers, monkeypatch):
+    response = await gateway.chat_completions(FakeRequest({"model": "gemini-2.5-pro"}))
+    assert response.status_code == 200
+
+    monkeypatch.setattr(gateway, "GATEWAY_MAX_ATTEMPTS", 1)
+    with pytest.raises(HTTPException) as exc_info:
+        await gateway.chat_completions(FakeRequest({"model": "gemini-2.5-pro"}))
+    assert exc_info.value.status_code == 500
+
+
+@pytest.mark.anyio
+async def test_open_breaker_stops_routing_to_worker(fake_workers, monkeypatch):
+    monkeypatch.setattr(gateway, "GATEWAY_BREAKER_FAILURES", 1)
+    await gateway.chat_completions(FakeRequest({"model": "", "stream": False}))
+
+    assert gateway._breakers["w1"].state == "open"
+    assert gateway.get_next_worker()["id"] == "w2"
+
+
+async def _invalid(request):
+    return web.json_response({"error": {"message": "messages is required"}}, status=422)
+
+
+@pytest.mark.anyio
+async def test_stream_relays_client_error_without_failover(fake_workers, monkeypatch):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", _invalid)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    gateway._worker_cache["workers"].insert(0, {"id": "w0", "port": port, "status": "running"})
+    try:
+        response = await gateway.chat_completions(FakeRequest({"model": "gemini-2.5-pro", "stream": True}))
+    finally:
+        await runner.cleanup()
+
+    assert response.status_code == 422
+    assert json.loads(response.body) == {"error": {"message": "messages is required"}}
+    assert gateway._breakers["w0"].failures == 0
+    assert gateway._breakers["w1"].failures == 0
+    assert all(load.inflight == 0 for load in gateway._worker_loads.values())
+
+
+def test_circuit_breaker_half_open_probe():
+    breaker = routing.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure(0.0)
+    assert breaker.available(1.0)
+    breaker.record_failure(1.0)
+    assert breaker.state == "open" and not breaker.available(5.0)
+
+    assert breaker.available(11.0)
+    breaker.on_dispatch(11.0)
+    assert breaker.state == "half_open" and not breaker.available(11.0)
+    breaker.record_failure(12.0)
+    assert breaker.state == "open" and not breaker.available(20.0)
+
+    breaker.on_dispatch(22.0)
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.available(22.0)
@@ -0,0 +1,87 @@
+import importlib
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+routing = importlib.import_module("worker.routing")
+shared_module = importlib.import_module("worker.shared_state")
+
+
+@pytest.fixture
+def shared_state():
+    state = shared_module.SharedRoutingState()
+    yield state
+    state.close()
+
+
+def _other_process(state, index=1):
+    """模拟另一个网关进程持有的句柄: 按名称重新挂载同一块共享内存"""
+    other = shared_module.SharedRoutingState(state.name, state.lock)
+    other.process_index = index
+    return other
+
+
+def _child(state):
+    state.process_index = 1
+    state.add_inflight("w1", 2)
+    breaker = routing.CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with state.breaker("w2", breaker):
+        breaker.record_failure(time.monotonic())
+    state.mark_rate_limited("w3", "gemini-2.5-pro", time.time() + 60)
+    state.next_cursor()
+
+
+def test_state_is_visible_across_processes(shared_state):
+    process = multiprocessing.Process(target=_child, args=(shared_state,))
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+    shared_state.add_inflight("w1", 1)
+    assert shared_state.inflight("w1") == 3
+    with shared_state.breaker("w2", routing.CircuitBreaker()) as breaker:
+        assert breaker.state == "open" and breaker.trips == 1
+    assert shared_state.is_rate_limited("w3", "gemini-2.5-pro")
+    assert shared_state.next_cursor() == 1
+
+    shared_state.reset_process(1)
+    assert shared_state.inflight("w1") == 1
+
+
+def test_gateway_routes_with_shared_state(shared_state, monkeypatch):
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": [
+        {"id": "w1", "port": 3001, "status": "running"},
+        {"id": "w2", "port": 3002, "status": "running"},
+        {"id": "w3", "port": 3003, "status": "running"},
+    ], "last_update": 0, "index": 0})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_breakers", {})
+    monkeypatch.setattr(gateway, "_balancing_strategy", routing.get_balancing_strategy("least_outstanding"))
+    monkeypatch.setattr(gateway, "_shared_state", shared_state)
+    other = _other_process(shared_state)
+
+    # 另一个进程的在途请求、熔断和限流标记都会影响本进程的选择
+    other.add_inflight("w1", 1)
+    breaker = routing.CircuitBreaker(failure_threshold=1)
+    with other.breaker("w2", breaker):
+        breaker.record_failure(time.monotonic())
+    assert gateway.get_next_worker()["id"] == "w3"
+    assert gateway._load_of({"id": "w1"}).outstanding == 1
+
+    other.mark_rate_limited("w3", "gemini-2.5-pro", time.time() + 60)
+    assert gateway.get_next_worker("gemini-2.5-pro")["id"] == "w1"
+
+    started = gateway._acquire_worker("w3")
+    assert other.inflight("w3") == 1
+    gateway._release_worker("w3", started)
+    assert other.inflight("w3") == 0
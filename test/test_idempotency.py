@@ -0,0 +1,156 @@
+import asyncio
+import importlib
+import json
+import socket
+import sys
+from pathlib import Path
+
+import aiohttp
+import pytest
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+idempotency = importlib.import_module("worker.idempotency")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeGeneration:
+    """模拟耗时的生成: 流式请求在 release 之前只输出第一帧"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.disconnected = asyncio.Event()
+
+    async def completions(self, request: Request):
+        self.calls += 1
+        payload = await request.json()
+        if payload.get("fail"):
+            return JSONResponse({"error": "busy"}, status_code=503)
+        if not payload.get("stream"):
+            return JSONResponse({"call": self.calls})
+
+        async def frames():
+            yield f'data: {{"call": {self.calls}}}\n\n'.encode()
+            waiter = asyncio.create_task(self.release.wait())
+            while not waiter.done():
+                if await request.is_disconnected():
+                    self.disconnected.set()
+                    waiter.cancel()
+                    return
+                await asyncio.sleep(0.01)
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+
+@pytest.fixture
+async def served():
+    generation = FakeGeneration()
+    store = idempotency.IdempotencyStore(ttl=60, max_bytes=1024 * 1024, detach_grace=0)
+    app = Starlette(routes=[Route("/v1/chat/completions", generation.completions, methods=["POST"])])
+    app.add_middleware(idempotency.IdempotencyMiddleware, store=store)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1/chat/completions"
+    async with aiohttp.ClientSession() as session:
+        yield session, url, generation, store
+    generation.release.set()
+    server.should_exit = True
+    await task
+
+
+def _post(session, url, payload, key="key-1"):
+    headers = {"Idempotency-Key": key} if key else {}
+    return session.post(url, data=json.dumps(payload), headers=headers)
+
+
+@pytest.mark.anyio
+async def test_completed_response_is_replayed(served):
+    session, url, generation, store = served
+    async with _post(session, url, {"stream": False}) as first:
+        assert await first.json() == {"call": 1}
+        assert "Idempotent-Replayed" not in first.headers
+    async with _post(session, url, {"stream": False}) as second:
+        assert await second.json() == {"call": 1}
+        assert second.headers["Idempotent-Replayed"] == "true"
+    async with _post(session, url, {"stream": False}, key=None) as unkeyed:
+        assert await unkeyed.json() == {"call": 2}
+    assert store.stats["replayed"] == 1
+
+    async with _post(session, url, {"stream": False, "other": 1}) as conflict:
+        assert conflict.status == 422
+
+
+@pytest.mark.anyio
+async def test_in_flight_duplicate_attaches_to_original_stream(served):
+    session, url, generation, store = served
+    async with _post(session, url, {"stream": True}) as first:
+        assert (await first.content.readline()).startswith(b'data: {"call": 1}')
+        async with _post(session, url, {"stream": True}) as second:
+            assert second.headers["Idempotent-Replayed"] == "true"
+            assert (await second.content.readline()).startswith(b'data: {"call": 1}')
+            generation.release.set()
+            rest = await second.read()
+        assert b"[DONE]" in rest
+        assert b"[DONE]" in await first.read()
+    assert generation.calls == 1
+    assert store.stats["attached"] == 1
+
+
+@pytest.mark.anyio
+async def test_original_disconnect_keeps_running_for_attached_retry(served):
+    session, url, generation, store = served
+    first = await _post(session, url, {"stream": True})
+    await first.content.readline()
+    second = await _post(session, url, {"stream": True})
+    await second.content.readline()
+    first.close()
+    await asyncio.sleep(0.2)
+    assert not generation.disconnected.is_set()
+
+    second.close()
+    await asyncio.wait_for(generation.disconnected.wait(), 5)
+    await asyncio.sleep(0.05)
+    # 未完成的执行不会被保存，重试重新执行
+    assert len(store) == 0
+
+
+@pytest.mark.anyio
+async def test_server_errors_are_not_stored(served):
+    session, url, generation, store = served
+    for _ in range(2):
+        async with _post(session, url, {"fail": True}) as response:
+            assert response.status == 503
+    assert generation.calls == 2
+
+
+def test_store_evicts_oldest_when_over_budget():
+    async def scenario():
+        store = idempotency.IdempotencyStore(ttl=60, max_bytes=10, detach_grace=0)
+        for key in ("a", "b"):
+            execution, created = store.begin((key,), "fp")
+            assert created
+            execution.publish({"type": "http.response.start", "status": 200, "headers": []})
+            execution.publish({"type": "http.response.body", "body": b"123456"})
+            store.finish((key,), execution, completed=True)
+        return store
+
+    store = asyncio.run(scenario())
+    assert len(store) == 1 and store.stored_bytes == 6
@@ -0,0 +1,36 @@
+import importlib
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+lean_rendering = importlib.import_module("browser.lean_rendering")
+
+
+def test_lean_css_collapses_only_older_turns():
+    css = lean_rendering.build_lean_css(4)
+
+    assert "animation: none !important" in css
+    assert "ms-chat-turn:not(:nth-last-of-type(-n+4))" in css
+    assert "content-visibility: hidden" in css
+    assert "nth-last-of-type" not in lean_rendering.build_lean_css(0)
+
+
+def test_init_script_is_idempotent_and_embeds_css():
+    script = lean_rendering.build_lean_init_script(2)
+
+    assert f"getElementById('{lean_rendering.LEAN_STYLE_ELEMENT_ID}')" in script
+    assert "nth-last-of-type(-n+2)" in script
+
+
+def test_apply_lean_context_options_overrides_viewport():
+    options = {"viewport": {"width": 1920, "height": 1080}, "screen": {"width": 1920, "height": 1080}}
+
+    lean_rendering.apply_lean_context_options(options, 1024, 640)
+
+    assert options["viewport"] == {"width": 1024, "height": 640}
+    assert options["screen"] == {"width": 1024, "height": 640}
+    assert options["reduced_motion"] == "reduce"
@@ -0,0 +1,81 @@
+import importlib
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+TEST_ROOT = PROJECT_ROOT / "test"
+for path in (SOURCE_ROOT, TEST_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+routing = importlib.import_module("worker.routing")
+Worker = importlib.import_module("worker.models").Worker
+WorkerPool = importlib.import_module("worker.pool").WorkerPool
+gateway = importlib.import_module("gateway")
+bench = importlib.import_module("bench_model_affinity")
+
+
+def _pick(workers, model, tolerance=1):
+    return routing.select_worker(
+        workers,
+        model,
+        load=lambda w: w["load"],
+        current_model=lambda w: w["model"],
+        tolerance=tolerance,
+    )
+
+
+def test_prefers_warm_worker_within_tolerance():
+    workers = [
+        {"id": "w1", "load": 0, "model": "gemini-2.5-flash"},
+        {"id": "w2", "load": 1, "model": "gemini-2.5-pro"},
+    ]
+
+    assert _pick(workers, "models/gemini-2.5-pro")["id"] == "w2"
+    assert _pick(workers, "gemini-2.5-pro", tolerance=0)["id"] == "w1"
+
+
+def test_falls_back_to_least_loaded_without_model():
+    workers = [
+        {"id": "w1", "load": 2, "model": "gemini-2.5-pro"},
+        {"id": "w2", "load": 0, "model": None},
+    ]
+
+    assert _pick(workers, "")["id"] == "w2"
+    assert _pick(workers, "gemini-2.5-pro")["id"] == "w2"
+
+
+def test_pool_routes_to_worker_with_loaded_model():
+    pool = WorkerPool()
+    pool.workers = {
+        "w1": Worker("w1", "a", "a.json", 3001, 9001, status="running", current_model="gemini-2.5-flash"),
+        "w2": Worker("w2", "b", "b.json", 3002, 9002, status="running", current_model="gemini-2.5-pro"),
+    }
+
+    assert pool.get_worker_for_model("gemini-2.5-pro").id == "w2"
+    pool._begin_request(pool.workers["w1"], {"model": "gemini-2.5-pro"})
+    assert pool.workers["w1"].current_model == "gemini-2.5-pro"
+
+
+def test_gateway_remembers_dispatched_model(monkeypatch):
+    monkeypatch.setitem(gateway._worker_cache, "workers", [
+        {"id": "w1", "port": 3001, "current_model": None},
+        {"id": "w2", "port": 3002, "current_model": None},
+    ])
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+
+    first = gateway.get_next_worker("gemini-2.5-pro")
+    second = gateway.get_next_worker("gemini-2.5-pro")
+
+    assert first["id"] == second["id"]
+
+
+def test_simulation_affinity_reduces_switch_rate():
+    mix = bench.WORKLOADS["2 models 50/50"]
+    round_robin = bench.simulate("round_robin", mix, requests=300)
+    affinity = bench.simulate("affinity", mix, requests=300)
+
+    assert affinity["switch_rate"] < round_robin["switch_rate"] / 2
+    assert affinity["p95_s"] < round_robin["p95_s"]
@@ -0,0 +1,123 @@
+import asyncio
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+catalog_module = importlib.import_module("worker.model_catalog")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeRequest:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+class SlowFetch:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("workers unavailable")
+        return [{"id": f"model-{self.calls}", "object": "model"}]
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_share_one_fetch():
+    fetch = SlowFetch()
+    catalog = catalog_module.ModelCatalog(fetch, ttl=60)
+
+    waiters = [asyncio.create_task(catalog.get()) for _ in range(20)]
+    await asyncio.sleep(0)
+    fetch.release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert fetch.calls == 1
+    assert len({etag for _, etag in results}) == 1
+    assert json.loads(results[0][0])["data"][0]["id"] == "model-1"
+
+
+@pytest.mark.anyio
+async def test_stale_entry_is_served_while_refreshing():
+    fetch = SlowFetch()
+    fetch.release.set()
+    catalog = catalog_module.ModelCatalog(fetch, ttl=60)
+    body, etag = await catalog.get()
+
+    catalog.invalidate()
+    fetch.release.clear()
+    assert await catalog.get() == (body, etag)
+    assert await catalog.get() == (body, etag)
+    fetch.fail = True
+    fetch.release.set()
+    await asyncio.sleep(0.01)
+
+    # 后台刷新只发起一次，失败时保留旧数据
+    assert fetch.calls == 2
+    assert catalog.body == body and catalog.last_error == "workers unavailable"
+
+
+@pytest.mark.anyio
+async def test_models_endpoint_supports_etag(monkeypatch):
+    fetch = SlowFetch()
+    fetch.release.set()
+    monkeypatch.setattr(gateway, "_model_catalog", catalog_module.ModelCatalog(fetch, ttl=60))
+
+    response = await gateway.models(FakeRequest())
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert json.loads(response.body)["data"] == [{"id": "model-1", "object": "model"}]
+
+    cached = await gateway.models(FakeRequest({"if-none-match": f'W/"other", {etag}'}))
+    assert cached.status_code == 304 and not cached.body
+    assert fetch.calls == 1
+
+
+@pytest.mark.anyio
+async def test_fleet_models_merge_and_tolerate_failed_worker(monkeypatch):
+    async def first(request):
+        return web.json_response({"object": "list", "data": [{"id": "gemini-2.5-pro"}, {"id": "gemini-2.5-flash"}]})
+
+    async def second(request):
+        return web.json_response({"object": "list", "data": [{"id": "gemini-2.5-flash"}, {"id": "imagen-4"}]})
+
+    async def broken(request):
+        return web.Response(status=503)
+
+    runners, workers = [], []
+    for index, handler in enumerate((first, broken, second)):
+        app = web.Application()
+        app.router.add_get("/v1/models", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        runners.append(runner)
+        workers.append({"id": f"w{index + 1}", "port": site._server.sockets[0].getsockname()[1]})
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": workers, "last_update": 0, "index": 0})
+    try:
+        models = await gateway.fetch_fleet_models()
+    finally:
+        await gateway.close_session()
+        for runner in runners:
+            await runner.cleanup()
+
+    assert [model["id"] for model in models] == ["gemini-2.5-pro", "gemini-2.5-flash", "imagen-4"]
@@ -0,0 +1,122 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+model_management = importlib.import_module("browser.model_management")
+server = importlib.import_module("server")
+
+MODEL_LIST = [
+    {"id": "gemini-2.5-pro", "display_name": "Gemini 2.5 Pro"},
+    {"id": "gemini-2.5-flash", "display_name": "Gemini 2.5 Flash"},
+]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakePage:
+    def __init__(self, prompt_model, turns=0):
+        self.url = "https://aistudio.google.com/prompts/new_chat"
+        self.storage = {
+            "aiStudioUserPreference": json.dumps(
+                {"promptModel": prompt_model, "isAdvancedOpen": True, "areToolsOpen": True}
+            )
+        }
+        self.turns = turns
+        self.goto_calls = []
+        self.window = {}
+
+    async def evaluate(self, script, arg=None):
+        if "localStorage.getItem" in script:
+            return self.storage.get("aiStudioUserPreference")
+        if "localStorage.setItem" in script:
+            self.storage["aiStudioUserPreference"] = arg
+            return None
+        if script.startswith("(selectors)"):
+            return "link"
+        if script.startswith("(selector)"):
+            return self.turns
+        if script.startswith("([key, marker])"):
+            return None
+        raise AssertionError(f"unexpected script: {script[:40]}")
+
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        self.turns = 0
+
+    async def goto(self, url, **kwargs):
+        self.goto_calls.append(url)
+
+
+def _display(name):
+    async def read(page, selectors, timeout=0, req_id="", expected_model_name=None):
+        return name
+
+    return read
+
+
+@pytest.fixture
+def model_list(monkeypatch):
+    monkeypatch.setattr(server, "parsed_model_list", MODEL_LIST)
+
+
+@pytest.mark.anyio
+async def test_switch_applies_model_in_app_without_navigation(model_list, monkeypatch):
+    page = FakePage("models/gemini-2.5-pro", turns=4)
+    monkeypatch.setattr(model_management, "get_model_name_from_page_parallel", _display("Gemini 2.5 Flash"))
+    before = model_management.get_model_switch_stats()["in_app"]
+
+    assert await model_management.switch_ai_studio_model(page, "gemini-2.5-flash", "req1")
+
+    assert page.goto_calls == []
+    assert page.turns == 0
+    assert json.loads(page.storage["aiStudioUserPreference"])["promptModel"] == "models/gemini-2.5-flash"
+    assert model_management.get_model_switch_stats()["in_app"] == before + 1
+
+
+@pytest.mark.anyio
+async def test_in_app_switch_reports_failure_when_display_does_not_follow(model_list, monkeypatch):
+    page = FakePage("models/gemini-2.5-flash")
+    monkeypatch.setattr(model_management, "get_model_name_from_page_parallel", _display("Gemini 2.5 Pro"))
+
+    assert not await model_management._switch_model_in_app(page, "gemini-2.5-flash", "req1")
+
+
+@pytest.mark.anyio
+async def test_in_app_switch_reapplies_ui_state_and_checks_storage(model_list, monkeypatch):
+    page = FakePage("models/gemini-2.5-flash", turns=1)
+    monkeypatch.setattr(model_management, "get_model_name_from_page_parallel", _display("Gemini 2.5 Flash"))
+    ui_checks = []
+
+    async def apply_ui_state(page, req_id):
+        ui_checks.append(req_id)
+        return True
+
+    monkeypatch.setattr(model_management, "_verify_and_apply_ui_state", apply_ui_state)
+    assert await model_management._switch_model_in_app(page, "gemini-2.5-flash", "req1")
+    assert ui_checks == ["req1"]
+
+    # 新建对话时应用把 promptModel 改回了旧模型: 回退整页导航
+    page.turns = 1
+    page.storage["aiStudioUserPreference"] = json.dumps({"promptModel": "models/gemini-2.5-pro"})
+    assert not await model_management._switch_model_in_app(page, "gemini-2.5-flash", "req2")
+    assert ui_checks == ["req1", "req2"]
+
+
+@pytest.mark.anyio
+async def test_no_op_switch_still_clears_leftover_turns(model_list):
+    page = FakePage("models/gemini-2.5-pro", turns=2)
+
+    assert await model_management.switch_ai_studio_model(page, "gemini-2.5-pro", "req1")
+
+    assert page.goto_calls == []
+    assert page.turns == 0
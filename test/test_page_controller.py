@@ -0,0 +1,251 @@
+import importlib
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+page_controller_module = importlib.import_module("browser.page_controller")
+PageController = page_controller_module.PageController
+MARKER_KEY = page_controller_module.SYSTEM_INSTRUCTIONS_MARKER_KEY
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakePage:
+    def __init__(self):
+        self.window = {}
+        self.locator_calls = []
+
+    async def evaluate(self, script, arg=None):
+        if script.startswith("(key)"):
+            return self.window.get(arg)
+        if script.startswith("([key, marker])"):
+            key, marker = arg
+            if marker:
+                self.window[key] = marker
+            else:
+                self.window.pop(key, None)
+            return None
+        raise AssertionError(f"unexpected script: {script[:40]}")
+
+    def locator(self, selector):
+        self.locator_calls.append(selector)
+        raise RuntimeError("panel should not be opened")
+
+
+def _controller(page):
+    return PageController(page, logging.getLogger("test"), "req1")
+
+
+def _never_disconnected(stage):
+    return False
+
+
+@pytest.mark.anyio
+async def test_set_system_instructions_skips_when_hash_matches():
+    page = FakePage()
+    controller = _controller(page)
+    prompt = "You are a helpful agent."
+    page.window[MARKER_KEY] = {
+        "hash": PageController._hash_system_instructions(prompt),
+        "model": "gemini-2.5-pro",
+    }
+
+    await controller.set_system_instructions(
+        prompt, _never_disconnected, "gemini-2.5-pro"
+    )
+
+    assert page.locator_calls == []
+
+
+@pytest.mark.anyio
+async def test_set_system_instructions_refills_on_model_or_prompt_change():
+    page = FakePage()
+    controller = _controller(page)
+    prompt = "You are a helpful agent."
+    page.window[MARKER_KEY] = {
+        "hash": PageController._hash_system_instructions(prompt),
+        "model": "gemini-2.5-pro",
+    }
+
+    await controller.set_system_instructions(
+        prompt, _never_disconnected, "gemini-2.5-flash"
+    )
+    assert page.locator_calls
+    # 失败后标记被清除，下次请求会重新填充
+    assert MARKER_KEY not in page.window
+
+
+@pytest.mark.anyio
+async def test_empty_system_instructions_without_marker_is_noop():
+    page = FakePage()
+    controller = _controller(page)
+
+    await controller.set_system_instructions("", _never_disconnected, "gemini-2.5-pro")
+
+    assert page.locator_calls == []
+
+
+class FakeResetPage(FakePage):
+    def __init__(self, soft_reset_ok):
+        super().__init__()
+        self.url = "https://aistudio.google.com/prompts/abc123"
+        self.soft_reset_ok = soft_reset_ok
+        self.goto_calls = []
+
+    async def evaluate(self, script, arg=None):
+        if script.startswith("(selectors)"):
+            return "link"
+        return await super().evaluate(script, arg)
+
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        if not self.soft_reset_ok:
+            raise TimeoutError("chat turns still present")
+        self.url = "https://aistudio.google.com/prompts/new_chat"
+
+    async def goto(self, url, **kwargs):
+        self.goto_calls.append(url)
+        self.url = url
+
+
+@pytest.mark.anyio
+async def test_clear_chat_history_uses_soft_reset_without_navigation():
+    page = FakeResetPage(soft_reset_ok=True)
+    page.window[MARKER_KEY] = {"hash": "h", "model": "m"}
+    before = page_controller_module.get_chat_reset_stats()["soft"]["count"]
+
+    await _controller(page).clear_chat_history(_never_disconnected)
+
+    assert page.goto_calls == []
+    assert MARKER_KEY not in page.window
+    assert page_controller_module.get_chat_reset_stats()["soft"]["count"] == before + 1
+
+
+@pytest.mark.anyio
+async def test_clear_chat_history_falls_back_to_navigation(monkeypatch):
+    page = FakeResetPage(soft_reset_ok=False)
+    controller = _controller(page)
+
+    async def verified(check_client_disconnected):
+        return None
+
+    monkeypatch.setattr(controller, "_verify_chat_cleared", verified)
+    stats = page_controller_module.get_chat_reset_stats()
+
+    await controller.clear_chat_history(_never_disconnected)
+
+    assert page.goto_calls == [page_controller_module.NEW_CHAT_URL]
+    new_stats = page_controller_module.get_chat_reset_stats()
+    assert new_stats["soft_failures"] == stats["soft_failures"] + 1
+    assert new_stats["navigation"]["count"] == stats["navigation"]["count"] + 1
+
+
+@pytest.mark.anyio
+async def test_stop_generation_always_navigates(monkeypatch):
+    page = FakeResetPage(soft_reset_ok=True)
+    controller = _controller(page)
+
+    async def verified(check_client_disconnected):
+        return None
+
+    monkeypatch.setattr(controller, "_verify_chat_cleared", verified)
+
+    await controller.stop_generation(_never_disconnected)
+
+    assert page.goto_calls == [page_controller_module.NEW_CHAT_URL]
+
+
+class FakeLocator:
+    def __init__(self):
+        self.filled = []
+
+    async def count(self):
+        return 0
+
+    async def evaluate(self, script, arg=None):
+        self.filled.append(arg)
+
+
+class FakeExpectation:
+    async def to_be_visible(self, timeout=None):
+        return None
+
+    async def to_be_enabled(self, timeout=None):
+        return None
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def _submit_controller(monkeypatch, upload_ok):
+    textarea = FakeLocator()
+    page = FakePage()
+    page.locator = lambda selector: FakeLocator()
+
+    async def first_visible(page, selectors, timeout=0):
+        return textarea, selectors[0]
+
+    monkeypatch.setattr(page_controller_module, "PROMPT_FILE_UPLOAD_THRESHOLD", 100)
+    monkeypatch.setattr(page_controller_module, "get_first_visible_locator", first_visible)
+    monkeypatch.setattr(page_controller_module, "expect_async", lambda locator: FakeExpectation())
+    monkeypatch.setattr(page_controller_module, "dump_page", _noop)
+    controller = _controller(page)
+    uploads = []
+
+    async def upload(prompt, check_client_disconnected):
+        uploads.append(prompt)
+        return upload_ok
+
+    async def shortcut_submit(locator, check_client_disconnected):
+        return True
+
+    monkeypatch.setattr(controller, "_upload_prompt_as_file", upload)
+    monkeypatch.setattr(controller, "_try_shortcut_submit", shortcut_submit)
+    return controller, textarea, uploads
+
+
+@pytest.mark.anyio
+async def test_submit_prompt_uploads_long_prompt_as_file(monkeypatch):
+    controller, textarea, uploads = _submit_controller(monkeypatch, upload_ok=True)
+
+    await controller.submit_prompt("short prompt", [], _never_disconnected)
+    assert uploads == [] and textarea.filled == ["short prompt"]
+
+    long_prompt = "x" * 100
+    await controller.submit_prompt(long_prompt, [], _never_disconnected)
+    assert uploads == [long_prompt]
+    assert textarea.filled[-1] == page_controller_module.PROMPT_FILE_UPLOAD_INSTRUCTION
+
+
+@pytest.mark.anyio
+async def test_submit_prompt_types_prompt_when_upload_fails(monkeypatch):
+    controller, textarea, uploads = _submit_controller(monkeypatch, upload_ok=False)
+    long_prompt = "x" * 150
+
+    await controller.submit_prompt(long_prompt, [], _never_disconnected)
+
+    assert uploads == [long_prompt]
+    assert textarea.filled == [long_prompt]
+
+
+@pytest.mark.anyio
+async def test_prompt_file_is_not_created_after_client_disconnects(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_controller_module.tempfile, "tempdir", str(tmp_path))
+    controller = _controller(FakePage())
+
+    def disconnected(stage):
+        return True
+
+    with pytest.raises(page_controller_module.ClientDisconnectedError):
+        await controller._upload_prompt_as_file("x" * 100, disconnected)
+    assert list(tmp_path.iterdir()) == []
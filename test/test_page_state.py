@@ -0,0 +1,74 @@
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+PageReadiness = importlib.import_module("browser.page_state").PageReadiness
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_dispatch_waits_for_unfinished_background_reset():
+    readiness = PageReadiness()
+    release = asyncio.Event()
+
+    async def reset():
+        await release.wait()
+
+    readiness.schedule_reset("req1", reset)
+    assert readiness.state == "resetting"
+
+    waiter = asyncio.create_task(readiness.wait_for_reset("req2"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    release.set()
+
+    assert await waiter is True
+    stats = readiness.to_dict()
+    assert stats["state"] == "ready"
+    assert stats["background_resets"] == 1
+    assert stats["dispatch_waits"] == 1
+
+
+@pytest.mark.anyio
+async def test_finished_reset_is_not_counted_as_dispatch_wait():
+    readiness = PageReadiness()
+
+    async def reset():
+        return None
+
+    readiness.schedule_reset("req1", reset)
+    await asyncio.sleep(0.01)
+
+    assert await readiness.wait_for_reset("req2") is True
+    assert readiness.to_dict()["dispatch_waits"] == 0
+
+
+@pytest.mark.anyio
+async def test_failed_reset_moves_to_error_and_requires_sync_clear():
+    readiness = PageReadiness()
+
+    async def reset():
+        raise RuntimeError("verify failed")
+
+    readiness.schedule_reset("req1", reset)
+
+    assert await readiness.wait_for_reset("req2") is False
+    assert readiness.state == "error"
+    assert readiness.last_error == "verify failed"
+
+
+def test_unknown_state_is_rejected():
+    with pytest.raises(ValueError):
+        PageReadiness().transition("sleeping")
@@ -0,0 +1,224 @@
+import asyncio
+import importlib
+import json
+import logging
+import socket
+import sys
+from pathlib import Path
+
+import aiohttp
+import pytest
+import uvicorn
+from aiohttp import web
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+dispatch = importlib.import_module("worker.dispatch")
+dispatch_client = importlib.import_module("api.dispatch_client")
+
+logger = logging.getLogger("test_pull_dispatch")
+
+DISPATCH_KEY = "dispatch-key"
+# 模拟 Worker 最近一次收到的请求头
+_seen_headers = {}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def _broken(request):
+    return web.Response(status=500, text="boom")
+
+
+async def _streaming(request):
+    _seen_headers.clear()
+    _seen_headers.update(request.headers)
+    payload = await request.json()
+    if not payload.get("stream"):
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await response.write(b'data: {"content": "hello"}\n\n')
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+async def _serve_aiohttp(handler):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1/chat/completions"
+
+
+@pytest.fixture
+async def pull_gateway(monkeypatch):
+    monkeypatch.setattr(gateway, "GATEWAY_DISPATCH_MODE", "pull")
+    monkeypatch.setattr(gateway, "_dispatch_key", DISPATCH_KEY)
+    monkeypatch.setenv("WORKER_REGISTRY_SECRET", DISPATCH_KEY)
+    monkeypatch.delenv("WORKER_DISPATCH_SECRET", raising=False)
+    monkeypatch.setattr(gateway, "_dispatch_queue", dispatch.DispatchQueue())
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": [
+        {"id": "w1", "port": 1, "status": "running"},
+        {"id": "w2", "port": 2, "status": "running"},
+    ], "last_update": 0, "index": 0})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_breakers", {})
+    monkeypatch.setattr(gateway, "report_rate_limit", lambda *args: asyncio.sleep(0))
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(gateway.app, lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    await task
+    await gateway.close_session()
+
+
+async def _pull_once(session, gateway_url, worker_id, own_url):
+    job = await dispatch_client._poll_job(session, gateway_url, worker_id)
+    assert job is not None
+    job_id, body, headers = job
+    await dispatch_client._run_job(session, gateway_url, worker_id, own_url, job_id, body, headers, logger)
+    return json.loads(body)
+
+
+@pytest.mark.anyio
+async def test_idle_worker_pulls_job_and_streams_back(pull_gateway, monkeypatch):
+    monkeypatch.setattr(dispatch_client.auth_utils, "API_KEYS", {"secret"})
+    runner, own_url = await _serve_aiohttp(_streaming)
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = asyncio.create_task(session.post(
+                f"{pull_gateway}/v1/chat/completions",
+                json={"model": "gemini-2.5-pro", "stream": True, "messages": []},
+                headers={"Authorization": "Bearer secret", "Cookie": "session=1"},
+            ))
+            job = await dispatch_client._poll_job(session, pull_gateway, "w1")
+            job_id, raw_body, handed_out = job
+            # 交给 Worker 的只有密钥摘要，由 Worker 对照本机密钥还原后请求本地接口
+            assert "secret" not in json.dumps(handed_out)
+            assert not {"authorization", "cookie"} & {key.lower() for key in handed_out}
+            await dispatch_client._run_job(session, pull_gateway, "w1", own_url, job_id, raw_body, handed_out, logger)
+            pulled = json.loads(raw_body)
+            response = await client
+            body = await response.read()
+    finally:
+        await runner.cleanup()
+
+    assert pulled["model"] == "gemini-2.5-pro"
+    assert response.status == 200
+    assert b"hello" in body and body.endswith(b"[DONE]\n\n")
+    assert gateway._worker_models["w1"] == "gemini-2.5-pro"
+    assert gateway._worker_loads["w1"].inflight == 0
+    assert _seen_headers["Authorization"] == "Bearer secret"
+
+
+@pytest.mark.anyio
+async def test_dispatch_endpoints_require_worker_secret(pull_gateway, monkeypatch):
+    async with aiohttp.ClientSession() as session:
+        url = f"{pull_gateway}/internal/dispatch/next"
+        params = {"worker_id": "w1", "wait": "0"}
+        async with session.get(url, params=params) as response:
+            assert response.status == 403
+        # 其他 Worker 的密钥不能冒充 w1
+        headers = dispatch_client._auth_headers("w2")
+        async with session.get(url, params=params, headers=headers) as response:
+            assert response.status == 403
+        async with session.post(
+            f"{pull_gateway}/internal/dispatch/job-1/result", data=b"x", headers={"X-Dispatch-Worker": "w1", **headers}
+        ) as response:
+            assert response.status == 403
+        async with session.get(url, params=params, headers=dispatch_client._auth_headers("w1")) as response:
+            assert response.status == 204
+        monkeypatch.setattr(gateway, "_dispatch_key", "")
+        async with session.get(url, params=params, headers=dispatch_client._auth_headers("w1")) as response:
+            assert response.status == 403
+
+
+@pytest.mark.anyio
+async def test_failed_job_is_requeued_for_another_worker(pull_gateway):
+    broken_runner, broken_url = await _serve_aiohttp(_broken)
+    healthy_runner, healthy_url = await _serve_aiohttp(_streaming)
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = asyncio.create_task(session.post(
+                f"{pull_gateway}/v1/chat/completions", json={"model": "gemini-2.5-pro", "messages": []}
+            ))
+            await _pull_once(session, pull_gateway, "w1", broken_url)
+            # 重新入队的任务排除已失败的 w1
+            while not len(gateway._dispatch_queue):
+                await asyncio.sleep(0.01)
+            assert gateway._dispatch_queue._jobs[0].excluded == {"w1"}
+            await _pull_once(session, pull_gateway, "w2", healthy_url)
+            response = await client
+            payload = await response.json()
+    finally:
+        await broken_runner.cleanup()
+        await healthy_runner.cleanup()
+
+    assert response.status == 200
+    assert payload["choices"][0]["message"]["content"] == "ok"
+    assert gateway._breakers["w1"].failures == 1
+
+
+async def _invalid(request):
+    return web.json_response({"error": {"message": "messages is required"}}, status=422)
+
+
+@pytest.mark.anyio
+async def test_client_error_is_relayed_without_requeue(pull_gateway):
+    runner, own_url = await _serve_aiohttp(_invalid)
+    try:
+        async with aiohttp.ClientSession() as session:
+            client = asyncio.create_task(session.post(
+                f"{pull_gateway}/v1/chat/completions", json={"model": "gemini-2.5-pro", "stream": True}
+            ))
+            await _pull_once(session, pull_gateway, "w1", own_url)
+            response = await client
+            payload = await response.json()
+    finally:
+        await runner.cleanup()
+
+    assert response.status == 422
+    assert payload == {"error": {"message": "messages is required"}}
+    assert len(gateway._dispatch_queue) == 0
+    assert gateway._breakers["w1"].failures == 0
+
+
+@pytest.mark.anyio
+async def test_queue_hands_out_first_eligible_job():
+    queue = dispatch.DispatchQueue()
+    first = dispatch.DispatchJob(b"{}", {}, "gemini-2.5-pro", excluded=frozenset({"w1"}))
+    second = dispatch.DispatchJob(b"{}", {}, "gemini-2.5-flash")
+    await queue.submit(first)
+    await queue.submit(second)
+
+    assert await queue.next_job("w1", lambda job: True, timeout=0) is second
+    assert await queue.next_job("w1", lambda job: True, timeout=0.05) is None
+    assert await queue.next_job("w2", lambda job: True, timeout=0) is first
+    assert queue.assigned(first.id, "w2") is first and queue.assigned(first.id, "w1") is None
+
+
+@pytest.mark.anyio
+async def test_long_poll_wakes_up_on_submit():
+    queue = dispatch.DispatchQueue()
+    waiter = asyncio.create_task(queue.next_job("w1", lambda job: True, timeout=5))
+    await asyncio.sleep(0.01)
+    assert queue.to_dict()["idle_workers"] == ["w1"]
+
+    job = dispatch.DispatchJob(b"{}", {})
+    await queue.submit(job)
+    assert await asyncio.wait_for(waiter, 1) is job
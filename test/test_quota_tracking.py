@@ -0,0 +1,169 @@
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+quota_module = importlib.import_module("worker.quota")
+Worker = importlib.import_module("worker.models").Worker
+pool_module = importlib.import_module("worker.pool")
+gateway = importlib.import_module("gateway")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def _pool():
+    pool = pool_module.WorkerPool()
+    pool.save_config = lambda: None
+    pool.workers = {
+        "w1": Worker("w1", "a", "a.json", 3001, 9001, status="running"),
+        "w2": Worker("w2", "b", "b.json", 3002, 9002, status="running"),
+    }
+    return pool
+
+
+def test_learns_limit_from_rate_limit_and_steers_before_next_one():
+    tracker = quota_module.QuotaTracker(steer_ratio=0.9)
+    for minute in range(10):
+        tracker.record_usage_totals("w1", {"gemini-2.5-pro": {"requests": minute + 1, "tokens": 100 * (minute + 1)}}, now=minute * 6.0)
+    tracker.on_rate_limited("w1", "gemini-2.5-pro", now=60.0)
+
+    assert tracker.quota("w1", "gemini-2.5-pro").learned["minute"]["requests"] == 10
+    # 一分钟后窗口清空，压力归零
+    assert tracker.near_limit_models("w1", now=200.0) == []
+
+    for count in range(9):
+        tracker.record_usage_totals("w1", {"gemini-2.5-pro": {"requests": 11 + count, "tokens": 1100 + 100 * count}}, now=200.0 + count)
+    assert tracker.near_limit_models("w1", now=210.0) == ["gemini-2.5-pro"]
+
+
+def test_usage_totals_handle_worker_restart():
+    tracker = quota_module.QuotaTracker()
+    tracker.record_usage_totals("w1", {"m": {"requests": 5, "tokens": 50}}, now=0.0)
+    tracker.record_usage_totals("w1", {"m": {"requests": 2, "tokens": 20}}, now=1.0)
+
+    assert tracker.quota("w1", "m").usage("minute", 1.0) == (7, 70)
+
+
+def test_probe_backoff_doubles_until_max():
+    tracker = quota_module.QuotaTracker(probe_initial=300, probe_max=1000)
+    tracker.on_rate_limited("w1", "m", now=0.0)
+    assert tracker.due_probes("w1", ["m"], now=299.0) == []
+    assert tracker.due_probes("w1", ["m"], now=300.0) == ["m"]
+
+    tracker.on_probe_result("w1", "m", recovered=False, now=300.0)
+    assert tracker.quota("w1", "m").next_probe_at == 900.0
+    tracker.on_probe_result("w1", "m", recovered=False, now=900.0)
+    assert tracker.quota("w1", "m").next_probe_at == 1900.0
+
+
+def test_pool_prefers_worker_with_quota_headroom():
+    pool = _pool()
+    pool.workers["w1"].near_limit_models = ["gemini-2.5-pro"]
+
+    assert pool.get_worker_for_model("gemini-2.5-pro").id == "w2"
+    pool.workers["w2"].near_limit_models = ["gemini-2.5-pro"]
+    assert pool.get_worker_for_model("gemini-2.5-pro") is not None
+
+
+def test_gateway_skips_near_limit_worker(monkeypatch):
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": [
+        {"id": "w1", "port": 3001, "near_limit_models": ["gemini-2.5-pro"]},
+        {"id": "w2", "port": 3002, "near_limit_models": []},
+    ], "last_update": 0, "index": 0})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_breakers", {})
+
+    assert {gateway.get_next_worker("models/gemini-2.5-pro")["id"] for _ in range(4)} == {"w2"}
+
+
+@pytest.mark.anyio
+async def test_recovery_probe_clears_limit_early(monkeypatch):
+    pool = _pool()
+    worker = pool.workers["w1"]
+    pool.mark_rate_limited("w1", "gemini-2.5-pro")
+    assert worker.is_model_limited("gemini-2.5-pro")
+    events = []
+    pool.register_status_listener(lambda payload: events.append(payload["event"]))
+
+    async def recovered(worker, model_id):
+        return True
+
+    monkeypatch.setattr(pool, "_probe_model_recovery", recovered)
+    await pool.probe_rate_limited_models()
+    assert worker.is_model_limited("gemini-2.5-pro")
+
+    pool.quota.quota("w1", "gemini-2.5-pro").next_probe_at = 0
+    await pool.probe_rate_limited_models()
+    assert not worker.is_model_limited("gemini-2.5-pro")
+    assert events == ["limit_recovered"]
+
+
+@pytest.mark.anyio
+async def test_recovery_probes_run_concurrently_across_workers(monkeypatch):
+    pool = _pool()
+    for worker_id in ("w1", "w2"):
+        pool.mark_rate_limited(worker_id, "gemini-2.5-pro")
+        pool.quota.quota(worker_id, "gemini-2.5-pro").next_probe_at = 0
+    started = []
+    both_started = asyncio.Event()
+
+    async def slow_probe(worker, model_id):
+        started.append(worker.id)
+        if len(started) == 2:
+            both_started.set()
+        # 串行探测时第一个探测会一直等待，直到超时
+        await asyncio.wait_for(both_started.wait(), 1)
+        return False
+
+    monkeypatch.setattr(pool, "_probe_model_recovery", slow_probe)
+    await pool.probe_rate_limited_models()
+    assert sorted(started) == ["w1", "w2"]
+
+
+@pytest.mark.anyio
+async def test_recovery_probe_authenticates_and_does_not_back_off_on_auth_error(monkeypatch, tmp_path):
+    async def completions(request):
+        if request.headers.get("Authorization") != "Bearer k1":
+            return web.json_response({"error": {"code": "invalid_api_key"}}, status=401)
+        return web.json_response({"choices": [{"message": {"content": "pong"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    pool = _pool()
+    worker = pool.workers["w1"]
+    worker.host, worker.port = "127.0.0.1", site._server.sockets[0].getsockname()[1]
+    pool.mark_rate_limited("w1", "gemini-2.5-pro")
+    quota = pool.quota.quota("w1", "gemini-2.5-pro")
+    key_file = tmp_path / "key.txt"
+    monkeypatch.setattr(pool_module, "API_KEY_FILE", str(key_file))
+    try:
+        # 密钥不匹配: 探测出错，按原间隔重试，不翻倍
+        key_file.write_text("wrong\n")
+        quota.next_probe_at = 0
+        await pool.probe_rate_limited_models()
+        assert worker.is_model_limited("gemini-2.5-pro")
+        assert quota.probe_interval == pool.quota.probe_initial
+
+        key_file.write_text("\nk1\n")
+        quota.next_probe_at = 0
+        await pool.probe_rate_limited_models()
+        assert not worker.is_model_limited("gemini-2.5-pro")
+    finally:
+        await pool.close()
+        await runner.cleanup()
@@ -0,0 +1,79 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+rate_limit = importlib.import_module("worker.rate_limit")
+
+
+def _chunk_frame(content, finish_reason=None):
+    chunk = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode()
+
+
+RATE_LIMIT_FRAME = _chunk_frame(
+    "\n\n[System: Rate Limit Exceeded - You exceeded quota for this model]", "stop"
+)
+
+
+def _feed_all(pieces):
+    detector = rate_limit.RateLimitDetector()
+    for piece in pieces:
+        detector.feed(piece)
+    return detector.close()
+
+
+def test_detects_status_frame_split_at_every_byte():
+    stream = _chunk_frame("Hello") + RATE_LIMIT_FRAME
+
+    for cut in range(1, len(stream)):
+        assert _feed_all([stream[:cut], stream[cut:]]), cut
+    assert _feed_all([bytes([b]) for b in stream])
+
+
+def test_model_text_mentioning_quota_is_not_rate_limit():
+    stream = (
+        _chunk_frame("If you exceeded quota on the free tier, ")
+        + _chunk_frame("the API returns a rate limit error: \"error\": 429. ")
+        + _chunk_frame("Out of free generations? Upgrade your plan.", "stop")
+        + b"data: [DONE]\n\n"
+    )
+
+    assert not _feed_all([stream])
+    assert not _feed_all([stream[i:i + 7] for i in range(0, len(stream), 7)])
+
+
+def test_error_object_frame_is_detected():
+    frame = b'data: {"error": {"message": "Rate limit reached", "type": "rate_limit"}}\n\n'
+    assert _feed_all([frame[:10], frame[10:]])
+    assert not _feed_all([b'data: {"error": {"message": "internal failure"}}\n\n'])
+
+
+def test_oversized_content_frame_is_skipped_without_losing_next_frame():
+    huge = _chunk_frame("exceeded quota " * (rate_limit.MAX_PENDING_FRAME_BYTES // 10))
+    detector = rate_limit.RateLimitDetector()
+    for i in range(0, len(huge), 4096):
+        detector.feed(huge[i:i + 4096])
+
+    assert len(detector._pending) <= rate_limit.MAX_PENDING_FRAME_BYTES
+    assert detector.feed(RATE_LIMIT_FRAME)
+
+
+def test_non_stream_responses():
+    completion = json.dumps({
+        "choices": [{"message": {"content": "Your quota was exceeded quota-wise; rate limit applies."}, "finish_reason": "stop"}]
+    }).encode()
+
+    assert not rate_limit.is_rate_limited_response(200, completion)
+    assert rate_limit.is_rate_limited_response(429, b"")
+    assert rate_limit.is_rate_limited_response(500, b'{"detail": "Rate limit exceeded: quota"}')
+    assert not rate_limit.is_rate_limited_response(500, b'{"detail": "page crashed"}')
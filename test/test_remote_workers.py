@@ -0,0 +1,145 @@
+import asyncio
+import importlib
+import socket
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+import pytest
+import uvicorn
+from aiohttp import web
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+workers_routes = importlib.import_module("manager.routes.workers")
+create_manager_app = importlib.import_module("manager.app").create_app
+Worker = importlib.import_module("worker.models").Worker
+WorkerPool = importlib.import_module("worker.pool").WorkerPool
+RegistryClient = importlib.import_module("worker.registry_client").RegistryClient
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def _start_fake_worker(name: str):
+    """模拟另一台主机上的 Worker: 各自监听独立端口"""
+
+    async def health(request):
+        return web.json_response({"status": "OK", "details": {"queueLength": 0, "currentModel": "gemini-2.5-pro"}})
+
+    async def completions(request):
+        return web.json_response({"worker": name})
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+@pytest.fixture
+async def manager(monkeypatch):
+    pool = WorkerPool()
+    monkeypatch.setattr(pool, "save_config", lambda: None)
+    monkeypatch.setattr(workers_routes, "worker_pool", pool)
+    monkeypatch.setattr(workers_routes, "WORKER_REGISTRY_SECRET", SECRET)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(create_manager_app(), lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    yield pool, f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    await task
+    await pool.close()
+
+
+async def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.anyio
+async def test_remote_workers_register_route_and_recover(manager, monkeypatch):
+    pool, manager_url = manager
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": [], "last_update": 0, "index": 0})
+    events = []
+    pool.register_status_listener(lambda payload: events.append((payload["worker_id"], payload["event"])))
+    fakes = [await _start_fake_worker(name) for name in ("r1", "r2")]
+    clients = [
+        RegistryClient(manager_url, SECRET, name, port, host="127.0.0.1", interval=0.05)
+        for name, (_, port) in zip(("r1", "r2"), fakes)
+    ]
+    tasks = [asyncio.create_task(client.run()) for client in clients]
+    try:
+        await _wait_for(lambda: len(pool.workers) == 2)
+        assert all(worker.remote and worker.status == "running" for worker in pool.workers.values())
+
+        # 网关按注册的地址转发，与本机 Worker 走同一路径
+        gateway._apply_worker_snapshot(pool.get_status())
+        for worker in gateway._worker_cache["workers"]:
+            session, base_url = await gateway.get_worker_session(worker)
+            async with session.post(f"{base_url}/v1/chat/completions", json={}) as response:
+                assert (await response.json())["worker"] == worker["id"]
+
+        await pool.health_check()
+        assert pool.workers["r1"].current_model == "gemini-2.5-pro"
+
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{manager_url}/api/workers/r1/rate-limit", json={"model": "gemini-2.5-pro"}):
+                pass
+        assert pool.get_worker_for_model("gemini-2.5-pro").id == "r2"
+
+        # 心跳超时标记为崩溃且不尝试本地重启，恢复心跳后自动上线
+        tasks[1].cancel()
+        await asyncio.gather(tasks[1], return_exceptions=True)
+        assert pool.workers["r2"].status == "stopped"
+        pool.heartbeat_timeout = 0.2
+        pool.workers["r1"].last_heartbeat -= 10
+        await pool.health_check()
+        await _wait_for(lambda: ("r1", "recovered") in events)
+        assert events.index(("r1", "crashed")) < events.index(("r1", "recovered"))
+        assert pool.workers["r1"].status == "running"
+        assert not pool._restart_tasks
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for runner, _ in fakes:
+            await runner.cleanup()
+        await gateway.close_session()
+
+
+@pytest.mark.anyio
+async def test_registration_requires_secret_and_unique_id(manager):
+    pool, manager_url = manager
+    pool.workers["w1"] = Worker("w1", "a.json", "a.json", 3001, 9222)
+    payload = {"worker_id": "w1", "port": 3101, "host": "10.0.0.2"}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{manager_url}/api/workers/register", json=payload) as response:
+            assert response.status == 401
+        headers = {"X-Worker-Secret": SECRET}
+        async with session.post(f"{manager_url}/api/workers/register", json=payload, headers=headers) as response:
+            assert response.status == 409
+        async with session.post(f"{manager_url}/api/workers/r9/heartbeat", json={}, headers=headers) as response:
+            assert response.status == 404
+        payload["worker_id"] = "r9"
+        async with session.post(f"{manager_url}/api/workers/register", json=payload, headers=headers) as response:
+            assert (await response.json())["worker"]["host"] == "10.0.0.2"
+    assert pool.workers["r9"].base_url == "http://10.0.0.2:3101"
+    assert pool.start_worker("r9")[0] is False
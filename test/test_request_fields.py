@@ -0,0 +1,71 @@
+import base64
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+request_fields = importlib.import_module("worker.request_fields")
+
+
+def _image_body(model_last=True):
+    image = base64.b64encode(bytes(range(256)) * 4096).decode()
+    payload = {
+        "messages": [
+            {"role": "system", "content": 'quote " and {brace} [bracket] \\\\ inside'},
+            {"role": "user", "content": [
+                {"type": "text", "text": 'describe "model": "fake"'},
+                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image}"}},
+            ]},
+        ],
+        "temperature": 0.2,
+    }
+    if model_last:
+        payload.update({"stream": True, "model": "gemini-2.5-pro"})
+    else:
+        payload = {"model": "gemini-2.5-pro", "stream": True, **payload}
+    return json.dumps(payload, indent=2).encode()
+
+
+@pytest.mark.parametrize("model_last", [True, False])
+def test_scan_matches_full_parse(model_last):
+    body = _image_body(model_last)
+    full = json.loads(body)
+
+    fields = request_fields.scan_request_fields(body)
+
+    assert fields == {"model": full["model"], "stream": full["stream"]}
+
+
+def test_scan_ignores_nested_and_escaped_keys():
+    body = json.dumps({
+        "messages": [{"role": "user", "content": '\\"model": "inner"', "model": "nested"}],
+        "model": "outer",
+    }).encode()
+
+    assert request_fields.scan_request_fields(body) == {"model": "outer"}
+
+
+def test_scan_stops_after_routing_fields():
+    # 找齐字段后不再检查后面的内容，即使它是截断的
+    body = b'{"model": "gemini-2.5-flash", "stream": false, "messages": [{"content": "unterminated'
+
+    assert request_fields.scan_request_fields(body) == {"model": "gemini-2.5-flash", "stream": False}
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'{"model": ', b'{"model" "x"}', b"not json"])
+def test_malformed_bodies_fall_back(body):
+    assert request_fields.extract_routing_fields(body) is None
+
+
+def test_deeply_structured_body_falls_back(monkeypatch):
+    monkeypatch.setattr(request_fields, "MAX_SCAN_TOKENS", 10)
+    body = json.dumps({"messages": [{"content": str(i)} for i in range(20)], "model": "m"}).encode()
+
+    assert request_fields.extract_routing_fields(body) is None
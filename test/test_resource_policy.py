@@ -0,0 +1,100 @@
+import importlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+resource_policy_module = importlib.import_module("browser.resource_policy")
+ResourcePolicy = resource_policy_module.ResourcePolicy
+RESOURCE_CATEGORIES = resource_policy_module.RESOURCE_CATEGORIES
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeRoute:
+    def __init__(self, url, post_data=b""):
+        self.request = SimpleNamespace(url=url, post_data_buffer=post_data)
+        self.fulfilled = None
+        self.aborted = False
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    async def abort(self, error_code=None):
+        self.aborted = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+
+def test_parse_policy_ignores_unknown_entries():
+    policy = ResourcePolicy("analytics=stub, fonts=abort, videos=abort, avatars=explode")
+
+    assert policy.actions == {"analytics": "stub", "fonts": "abort", "avatars": "allow"}
+
+
+@pytest.mark.anyio
+async def test_default_policy_allows_everything(monkeypatch):
+    monkeypatch.delenv("RESOURCE_BLOCKING_POLICY", raising=False)
+    constants = importlib.reload(importlib.import_module("config.constants"))
+    policy = ResourcePolicy(constants.RESOURCE_BLOCKING_POLICY)
+    context = FakeContext()
+
+    await policy.install(context)
+    assert set(policy.actions.values()) == {"allow"}
+    assert context.routes == []
+
+
+def test_category_patterns_do_not_capture_rpc_or_jserror():
+    urls = [
+        "https://alkalimakersuite-pa.clients6.google.com/$rpc/google.internal.alkali.applications.makersuite.v1.MakerSuiteService/GenerateContent",
+        "https://aistudio.google.com/_/jserror?error=quota",
+        "https://aistudio.google.com/prompts/new_chat",
+    ]
+    for url in urls:
+        assert not any(c["pattern"].search(url) for c in RESOURCE_CATEGORIES.values())
+    assert RESOURCE_CATEGORIES["analytics"]["pattern"].search("https://play.google.com/log?format=json")
+    assert RESOURCE_CATEGORIES["fonts"]["pattern"].search("https://fonts.gstatic.com/s/googlesans/v58/a.woff2")
+    assert RESOURCE_CATEGORIES["avatars"]["pattern"].search("https://lh3.googleusercontent.com/a/abc=s64")
+
+
+@pytest.mark.anyio
+async def test_install_routes_only_enabled_categories_and_counts_savings():
+    policy = ResourcePolicy("analytics=stub,fonts=abort")
+    context = FakeContext()
+
+    await policy.install(context)
+    handlers = {pattern.pattern: handler for pattern, handler in context.routes}
+    assert len(handlers) == 2
+
+    beacon = FakeRoute("https://play.google.com/log?format=json", b"x" * 100)
+    await handlers[RESOURCE_CATEGORIES["analytics"]["pattern"].pattern](beacon)
+    font = FakeRoute("https://fonts.gstatic.com/s/a.woff2")
+    await handlers[RESOURCE_CATEGORIES["fonts"]["pattern"].pattern](font)
+
+    assert beacon.fulfilled["status"] == 204
+    assert font.aborted
+    stats = policy.get_stats()
+    assert stats["analytics"]["requests"] == 1
+    assert stats["analytics"]["upload_bytes"] == 100
+    assert stats["fonts"]["estimated_download_bytes"] == RESOURCE_CATEGORIES["fonts"]["estimated_bytes"]
+    assert stats["avatars"] == {
+        "action": "allow",
+        "requests": 0,
+        "upload_bytes": 0,
+        "estimated_download_bytes": 0,
+    }
@@ -0,0 +1,140 @@
+import asyncio
+import importlib
+import json
+import socket
+import sys
+from pathlib import Path
+
+import aiohttp
+import pytest
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+response_cache = importlib.import_module("worker.response_cache")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def test_cache_key_is_canonical_and_requires_zero_temperature():
+    base = {"model": "gemini-2.5-pro", "temperature": 0, "messages": [{"role": "user", "content": "hi"}]}
+    key = response_cache.cache_key(json.dumps(base).encode())
+    reordered = {"messages": base["messages"], "user": "ci-42", "temperature": 0.0, "model": "gemini-2.5-pro"}
+    assert response_cache.cache_key(json.dumps(reordered).encode()) == key
+    assert response_cache.cache_key(json.dumps({**base, "stream": True}).encode()) != key
+    assert response_cache.cache_key(json.dumps({**base, "tools": [{"type": "function"}]}).encode()) != key
+    assert response_cache.cache_key(json.dumps({**base, "temperature": 0.7}).encode()) is None
+    assert response_cache.cache_key(json.dumps({k: v for k, v in base.items() if k != "temperature"}).encode()) is None
+    assert response_cache.cache_key(b"not json") is None
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def handle(self, request: Request):
+        self.calls += 1
+        payload = await request.json()
+        if payload.get("fail"):
+            return JSONResponse({"error": "busy"}, status_code=503)
+        if payload.get("limited"):
+            frame = {
+                "choices": [{"index": 0, "delta": {"content": "\n\n[System: Rate Limit Exceeded - quota]"}, "finish_reason": "stop"}]
+            }
+
+            async def limited():
+                yield f"data: {json.dumps(frame)}\n\ndata: [DONE]\n\n".encode()
+
+            return StreamingResponse(limited(), media_type="text/event-stream")
+        if not payload.get("stream"):
+            return JSONResponse({"call": self.calls})
+        call = self.calls
+
+        async def frames():
+            yield f'data: {{"call": {call}, "part": 1}}\n\n'.encode()
+            await asyncio.sleep(0.01)
+            yield f'data: {{"call": {call}, "part": 2}}\n\ndata: [DONE]\n\n'.encode()
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+
+@pytest.fixture
+async def served():
+    completions = FakeCompletions()
+    cache = response_cache.ResponseCache(ttl=60, max_bytes=1024 * 1024)
+    app = Starlette(routes=[Route("/v1/chat/completions", completions.handle, methods=["POST"])])
+    app.add_middleware(response_cache.ResponseCacheMiddleware, cache=cache)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1/chat/completions"
+    async with aiohttp.ClientSession() as session:
+        yield session, url, completions, cache
+    server.should_exit = True
+    await task
+
+
+async def _post(session, url, payload, headers=None):
+    async with session.post(url, data=json.dumps(payload), headers=headers or {}) as response:
+        chunks = [chunk async for chunk, _ in response.content.iter_chunks()]
+        return response.status, response.headers.get("X-Cache"), chunks
+
+
+@pytest.mark.anyio
+async def test_stream_is_replayed_with_original_chunks(served):
+    session, url, completions, cache = served
+    payload = {"model": "m", "temperature": 0, "stream": True}
+    status, first_state, first = await _post(session, url, payload)
+    status, second_state, second = await _post(session, url, payload)
+
+    assert (first_state, second_state) == ("MISS", "HIT")
+    assert b"".join(second) == b"".join(first)
+    assert completions.calls == 1
+
+    _, refreshed_state, refreshed = await _post(session, url, payload, {"Cache-Control": "no-cache"})
+    assert refreshed_state == "MISS" and b'"call": 2' in b"".join(refreshed)
+    _, hit_state, hit = await _post(session, url, payload)
+    assert hit_state == "HIT" and b'"call": 2' in b"".join(hit)
+
+    stats = cache.to_dict()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["hit_rate"] == 0.5
+
+
+@pytest.mark.anyio
+async def test_bypass_and_errors_are_not_cached(served):
+    session, url, completions, cache = served
+    for headers in ({"Cache-Control": "no-store"}, {"Cache-Control": "no-store"}):
+        _, state, _ = await _post(session, url, {"model": "m", "temperature": 0}, headers)
+        assert state == "BYPASS"
+    _, state, _ = await _post(session, url, {"model": "m", "temperature": 1})
+    assert state == "BYPASS"
+    for _ in range(2):
+        status, state, _ = await _post(session, url, {"model": "m", "temperature": 0, "fail": True})
+        assert (status, state) == (503, "MISS")
+    assert completions.calls == 5
+    assert cache.to_dict()["bypassed"] == 3 and len(cache) == 0
+
+
+@pytest.mark.anyio
+async def test_rate_limited_stream_is_not_cached(served):
+    session, url, completions, cache = served
+    payload = {"model": "m", "temperature": 0, "stream": True, "limited": True}
+    for _ in range(2):
+        status, state, chunks = await _post(session, url, payload)
+        assert (status, state) == (200, "MISS")
+        assert b"Rate Limit Exceeded" in b"".join(chunks)
+    assert completions.calls == 2
+    assert len(cache) == 0 and cache.to_dict()["errors"] == 2
@@ -0,0 +1,152 @@
+import asyncio
+import importlib
+import json
+import socket
+import sys
+from pathlib import Path
+
+import aiohttp
+import pytest
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+idempotency = importlib.import_module("worker.idempotency")
+resumable = importlib.import_module("worker.resumable")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def _stamp(stamper, *chunks):
+    messages = stamper({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+    for index, chunk in enumerate(chunks):
+        messages += stamper({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return messages
+
+
+def test_event_stamper_numbers_events_across_chunk_boundaries():
+    messages = _stamp(
+        resumable.EventStamper("abc"),
+        b": keepalive\n\nid: upstream-1\ndata: {\"a\"",
+        b": 1}\n\ndata: [DONE]",
+    )
+    bodies = [message["body"] for message in messages[1:]]
+    assert bodies == [
+        b"id: abc-1\n: keepalive\n\n",
+        b"id: abc-2\ndata: {\"a\": 1}\n\n",
+        b"id: abc-3\ndata: [DONE]\n\n",
+        b"",
+    ]
+    assert [message["more_body"] for message in messages[1:]] == [True, True, True, False]
+    assert resumable.parse_event_id("abc-2") == ("abc", 2)
+    assert resumable.parse_event_id("abc") is None
+
+
+class FakeStream:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.disconnected = asyncio.Event()
+
+    async def completions(self, request: Request):
+        self.calls += 1
+        if not (await request.json()).get("stream"):
+            return JSONResponse({"ok": True})
+
+        async def frames():
+            yield b'data: {"part": 1}\n\n'
+            yield b'data: {"part": 2}\n\n'
+            waiter = asyncio.create_task(self.release.wait())
+            while not waiter.done():
+                if await request.is_disconnected():
+                    self.disconnected.set()
+                    waiter.cancel()
+                    return
+                await asyncio.sleep(0.01)
+            yield b'data: {"part": 3}\n\ndata: [DONE]\n\n'
+
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+
+@pytest.fixture
+async def served():
+    stream = FakeStream()
+    store = idempotency.IdempotencyStore(ttl=60, max_bytes=1024 * 1024, detach_grace=0.5)
+    app = Starlette(routes=[Route("/v1/chat/completions", stream.completions, methods=["POST"])])
+    app.add_middleware(resumable.ResumableStreamMiddleware, store=store)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1/chat/completions"
+    async with aiohttp.ClientSession() as session:
+        yield session, url, stream, store
+    stream.release.set()
+    server.should_exit = True
+    await task
+
+
+async def _read_event(response) -> bytes:
+    lines = []
+    while True:
+        line = await response.content.readline()
+        if line in (b"\n", b""):
+            return b"".join(lines)
+        lines.append(line)
+
+
+@pytest.mark.anyio
+async def test_reconnect_resumes_after_last_event_id(served):
+    session, url, stream, store = served
+    body = json.dumps({"stream": True})
+    first = await session.post(url, data=body)
+    event = await _read_event(first)
+    event_id = event.split(b"\n")[0][len(b"id: "):].decode()
+    assert event.endswith(b'data: {"part": 1}\n')
+    first.close()
+    await asyncio.sleep(0.1)
+    assert not stream.disconnected.is_set()
+
+    async with session.post(url, data=body, headers={"Last-Event-ID": event_id}) as second:
+        stream.release.set()
+        rest = await second.read()
+    assert b'{"part": 1}' not in rest
+    assert b'{"part": 2}' in rest and b"[DONE]" in rest
+    assert stream.calls == 1
+
+    # 流结束后仍可在保留窗口内续传
+    async with session.post(url, data=body, headers={"Last-Event-ID": event_id}) as replay:
+        assert await replay.read() == rest
+
+
+@pytest.mark.anyio
+async def test_generation_stops_after_grace_without_reconnect(served):
+    session, url, stream, store = served
+    first = await session.post(url, data=json.dumps({"stream": True}))
+    await _read_event(first)
+    first.close()
+    await asyncio.wait_for(stream.disconnected.wait(), 5)
+    await asyncio.sleep(0.05)
+    assert len(store) == 0
+
+
+@pytest.mark.anyio
+async def test_unknown_event_id_and_non_stream_requests(served):
+    session, url, stream, store = served
+    async with session.post(url, data=json.dumps({"stream": True}), headers={"Last-Event-ID": "missing-3"}) as gone:
+        assert gone.status == 409
+    async with session.post(url, data=json.dumps({"stream": False})) as plain:
+        assert await plain.json() == {"ok": True}
+    assert len(store) == 0
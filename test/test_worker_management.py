@@ -17,7 +17,8 @@ if str(SOURCE_ROOT) not in sys.path:
 service_module = importlib.import_module("manager.service")
 ServiceManager = service_module.ServiceManager
 Worker = importlib.import_module("worker.models").Worker
-WorkerPool = importlib.import_module("worker.pool").WorkerPool
+pool_module = importlib.import_module("worker.pool")
+WorkerPool = pool_module.WorkerPool
 create_manager_app = importlib.import_module("manager.app").create_app
 
 
@@ -193,3 +194,11 @@ def test_websocket_logs_sends_worker_snapshot(monkeypatch):
     assert status_message["type"] == "status"
     assert snapshot_message["type"] == "worker_snapshot"
     assert snapshot_message["workers"][0]["id"] == "w1"
+
+
+def test_pool_managed_workers_leave_stream_resume_to_gateway(monkeypatch):
+    pool = WorkerPool()
+    monkeypatch.setattr(pool_module, "STREAM_RESUME_ENABLED", True)
+    worker = Worker("w1", "a", "a.json", 3001, 9001)
+
+    assert pool._build_worker_env(worker)["STREAM_RESUME_ENABLED"] == "false"
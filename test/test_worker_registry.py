@@ -0,0 +1,130 @@
+import asyncio
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+service_module = importlib.import_module("manager.service")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": [], "last_update": 0, "index": 0})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_registry_state", {"source": "none", "connected": False, "events": 0, "last_error": None})
+    return gateway._worker_cache
+
+
+def _worker(worker_id, status="running", **extra):
+    return {"id": worker_id, "port": 3000 + int(worker_id[1:]), "status": status, **extra}
+
+
+class FakeStream:
+    def __init__(self, lines):
+        self.status = 200
+        self.content = self._iterate(lines)
+
+    async def _iterate(self, lines):
+        for line in lines:
+            yield line
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def get(self, url, timeout=None):
+        return FakeStream(self.lines)
+
+
+def _sse(event, payload):
+    return [f"event: {event}\n".encode(), f"data: {json.dumps(payload)}\n".encode(), b"\n"]
+
+
+def test_worker_events_update_registry_in_place(registry):
+    gateway._apply_worker_snapshot([_worker("w1"), _worker("w2"), _worker("w3", status="stopped")])
+    assert [w["id"] for w in registry["workers"]] == ["w1", "w2"]
+
+    gateway._apply_worker_event(_worker("w1", rate_limited_models={"gemini-2.5-pro": 9e12}))
+    gateway._apply_worker_event(_worker("w3"))
+    assert [w["id"] for w in registry["workers"]] == ["w1", "w2", "w3"]
+    assert gateway.get_next_worker("gemini-2.5-pro")["id"] != "w1"
+
+    gateway._apply_worker_event(_worker("w2", status="stopped"))
+    assert [w["id"] for w in registry["workers"]] == ["w1", "w3"]
+
+
+@pytest.mark.anyio
+async def test_consume_worker_events_applies_snapshot_and_deltas(monkeypatch, registry):
+    lines = _sse("snapshot", {"type": "worker_snapshot", "workers": [_worker("w1", queue_length=2)]})
+    lines += _sse("worker", {"type": "worker_status", "event": "started", "worker": _worker("w2")})
+
+    async def fake_session():
+        return FakeSession(lines)
+
+    monkeypatch.setattr(gateway, "get_session", fake_session)
+
+    with pytest.raises(ConnectionError):
+        await gateway._consume_worker_events()
+
+    assert [w["id"] for w in registry["workers"]] == ["w1", "w2"]
+    assert gateway._worker_loads["w1"].queue_depth == 2
+    assert gateway._registry_state["events"] == 2
+
+
+@pytest.mark.anyio
+async def test_registry_keeps_serving_stale_data_when_manager_is_down(monkeypatch, registry):
+    gateway._apply_worker_snapshot([_worker("w1")])
+
+    async def unavailable():
+        raise ConnectionError("manager down")
+
+    async def failed_refresh():
+        return False
+
+    monkeypatch.setattr(gateway, "_consume_worker_events", unavailable)
+    monkeypatch.setattr(gateway, "refresh_workers", failed_refresh)
+    monkeypatch.setattr(gateway, "REGISTRY_RETRY_MIN", 0)
+
+    task = asyncio.create_task(gateway.watch_worker_registry())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert gateway._registry_state["connected"] is False
+    assert gateway.get_next_worker()["id"] == "w1"
+
+
+def test_slow_subscriber_gets_snapshot_instead_of_backlog(monkeypatch):
+    manager = service_module.ServiceManager()
+    monkeypatch.setattr(service_module, "WORKER_EVENT_QUEUE_SIZE", 2)
+    queue = manager.subscribe_worker_events()
+
+    for index in range(3):
+        manager._publish_worker_event({"type": "worker_status", "worker_id": f"w{index}"})
+
+    assert queue.qsize() == 1
+    assert queue.get_nowait()["type"] == "worker_snapshot"
+    manager.unsubscribe_worker_events(queue)
+    assert manager.worker_event_subscribers == []
@@ -0,0 +1,107 @@
+import importlib
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_ROOT = PROJECT_ROOT / "src"
+if str(SOURCE_ROOT) not in sys.path:
+    sys.path.insert(0, str(SOURCE_ROOT))
+
+gateway = importlib.import_module("gateway")
+transport = importlib.import_module("worker.transport")
+
+pytestmark = pytest.mark.skipif(
+    not transport.unix_sockets_supported(), reason="Unix domain sockets are not available"
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def socket_dir():
+    # tmp_path 可能超出 sun_path 长度上限，使用短路径
+    with tempfile.TemporaryDirectory(prefix="gw-") as path:
+        yield path
+
+
+class FakeRequest:
+    def __init__(self, payload):
+        self._body = json.dumps(payload).encode()
+        self.headers = {}
+
+    async def body(self):
+        return self._body
+
+    async def is_disconnected(self):
+        return False
+
+
+def test_worker_socket_path_falls_back_when_too_long(socket_dir):
+    assert transport.worker_socket_path(socket_dir, "w1") == os.path.join(socket_dir, "w1.sock")
+    assert transport.worker_socket_path("/" + "x" * 120, "w1") is None
+
+
+def test_bind_unix_socket_replaces_stale_socket(socket_dir):
+    path = os.path.join(socket_dir, "nested", "w1.sock")
+    stale = transport.bind_unix_socket(path)
+    stale.close()
+    assert os.path.exists(path)
+
+    sock = transport.bind_unix_socket(path)
+    try:
+        assert sock.family == socket.AF_UNIX
+        assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+    finally:
+        sock.close()
+
+
+@pytest.mark.anyio
+async def test_gateway_streams_over_unix_socket(socket_dir, monkeypatch):
+    seen = []
+
+    async def completions(request):
+        seen.append(request.transport.get_extra_info("socket").family)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b'data: {"content": "hello"}\n\n')
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    path = os.path.join(socket_dir, "w1.sock")
+    await web.UnixSite(runner, path).start()
+    # 端口 1 不可连接: 请求只能经 Unix 域套接字到达
+    workers = [
+        {"id": "w1", "port": 1, "socket": path, "status": "running"},
+    ]
+    monkeypatch.setattr(gateway, "_worker_cache", {"workers": workers, "last_update": 0, "index": 0})
+    monkeypatch.setattr(gateway, "_worker_loads", {})
+    monkeypatch.setattr(gateway, "_worker_models", {})
+    monkeypatch.setattr(gateway, "_breakers", {})
+    try:
+        response = await gateway.chat_completions(FakeRequest({"model": "gemini-2.5-pro", "stream": True}))
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        assert b"hello" in body
+        assert seen == [socket.AF_UNIX]
+        assert list(gateway._unix_sessions) == [path]
+
+        session, base_url = await gateway.get_worker_session({"id": "w2", "port": 1234, "socket": path + ".missing"})
+        assert base_url == "http://127.0.0.1:1234"
+        assert session is await gateway.get_session()
+    finally:
+        await gateway.close_session()
+        await runner.cleanup()
+    assert gateway._unix_sessions == {}